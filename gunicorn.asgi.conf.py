@@ -0,0 +1,20 @@
+## ASGI deployment profile:
+##     gunicorn -c gunicorn.asgi.conf.py core.asgi:application
+## Each uvicorn worker runs an event loop, so one process overlaps many I/O-bound requests
+## on the `async/` read endpoints instead of blocking on each query.
+import multiprocessing
+from os import environ
+
+from dotenv import read_dotenv
+
+read_dotenv()
+
+## Django advises against persistent connections under ASGI: close each one after its request.
+## `DB_USE_POOL=True` (Django 5.1+, see `requirements.in`) reuses pooled connections instead.
+environ.setdefault("DB_CONN_MAX_AGE", "0")
+
+bind: str = "0.0.0.0:8000"
+workers: int = int(environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+worker_class: str = "uvicorn.workers.UvicornWorker"
+accesslog: str = "-"  # Use stdout for access logs
+errorlog: str = "-"  # Use stdout for error logs
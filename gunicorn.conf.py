@@ -1,10 +1,37 @@
 import multiprocessing
+from os import environ
 
 from dotenv import read_dotenv
 
 read_dotenv()
 
 bind: str = "0.0.0.0:8000"
-workers: int = int(multiprocessing.cpu_count())
+workers: int = int(environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count()))
 accesslog: str = "-"  # Use stdout for access logs
-errorlog: str = "-"  # Use stdout for error logs
\ No newline at end of file
+errorlog: str = "-"  # Use stdout for error logs
+
+## Import the app once in the master and fork warm workers that share its memory pages.
+preload_app: bool = environ.get("GUNICORN_PRELOAD", "True").strip().lower() in ("true", "yes", "on", "1")
+## Recycle workers to cap slow leaks; the jitter keeps them from all restarting at once.
+max_requests: int = int(environ.get("GUNICORN_MAX_REQUESTS", 5000))
+max_requests_jitter: int = int(environ.get("GUNICORN_MAX_REQUESTS_JITTER", 500))
+
+
+def when_ready(server):
+    if preload_app:
+        from core.warmup import WorkerWarmup
+
+        WorkerWarmup.preload()
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        from core.warmup import WorkerWarmup
+
+        WorkerWarmup.before_fork()
+
+
+def post_worker_init(worker):
+    from core.warmup import WorkerWarmup
+
+    WorkerWarmup.warm()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Check that integer-cent billing arithmetic (`utils.money.MoneyUtils`) gives exactly the
+results of the `Decimal` code it replaced, then time both.
+
+The check draws random lines and bills (fixed seed, so failures reproduce) and compares:
+    - line totals: price * quantity with compound or simple taxes, less the discount;
+    - bill totals: the sum of line totals less the additional discount, and the due amount.
+
+The `Decimal` side is a transcription of the old code, rounding half away from zero like the
+`numeric(32, 2)` columns that rounded its exact results; `billing_app.tests.TestBillTotalsMatchTheSaveBasedPath`
+checks the engine against totals actually written that way. Inputs stay within what the columns
+hold and what `Decimal`'s default 28-digit context computes exactly, so any difference is a bug.
+The script exits with status 1 on the first mismatch:
+
+    python .scripts/benchmark_money.py --samples 100000 --lines 1000
+"""
+
+import argparse
+import random
+import sys
+import time
+from decimal import Decimal, ROUND_HALF_UP
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.money import MoneyUtils  # noqa: E402
+
+CENT = Decimal("0.01")
+
+
+def random_amount(rng: random.Random, max_cents: int) -> Decimal:
+    return Decimal(rng.randrange(0, max_cents)) / 100
+
+
+def random_line(rng: random.Random) -> tuple:
+    price = random_amount(rng, 10**8)
+    quantity = rng.randrange(1, 1000)
+    percentages = [random_amount(rng, 10**4) for _ in range(rng.randrange(0, 4))]
+    discount = random_amount(rng, 10**5)
+    return price, quantity, percentages, discount
+
+
+def decimal_line_total(price, quantity, percentages, discount, compound: bool) -> Decimal:
+    """
+    `BillItem.save()` before integer cents, rounded the way the column stored it.
+    """
+    total = price * quantity
+    if compound:
+        for percentage in percentages:
+            total += (total * percentage) / 100
+    else:
+        total += (total * sum(percentages, Decimal(0))) / 100
+    total -= discount
+    return total.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def decimal_bill_totals(line_totals, discount_percentage, paid_amount) -> tuple[Decimal, Decimal]:
+    total = sum(line_totals, Decimal(0))
+    total -= (total * discount_percentage) / 100
+    total = total.quantize(CENT, rounding=ROUND_HALF_UP)
+    return total, total - paid_amount
+
+
+def cents_line_total(price, quantity, percentages, discount, compound: bool) -> Decimal:
+    basis_points = [MoneyUtils.to_basis_points(percentage) for percentage in percentages]
+    ratio = MoneyUtils.compound_ratio(basis_points) if compound else MoneyUtils.simple_ratio(basis_points)
+    cents = MoneyUtils.apply_ratio(MoneyUtils.to_cents(price) * quantity, ratio, less=MoneyUtils.to_cents(discount))
+    return MoneyUtils.from_cents(cents)
+
+
+def cents_bill_totals(line_totals, discount_percentage, paid_amount) -> tuple[Decimal, Decimal]:
+    total = MoneyUtils.discount(
+        sum(MoneyUtils.to_cents(line_total) for line_total in line_totals),
+        MoneyUtils.to_basis_points(discount_percentage),
+    )
+    return MoneyUtils.from_cents(total), MoneyUtils.from_cents(total - MoneyUtils.to_cents(paid_amount))
+
+
+def check(samples: int, seed: int) -> None:
+    rng = random.Random(seed)
+    for sample in range(samples):
+        line = random_line(rng)
+        for compound in (True, False):
+            expected = decimal_line_total(*line, compound=compound)
+            actual = cents_line_total(*line, compound=compound)
+            if expected != actual:
+                raise SystemExit(
+                    f"FAIL (sample {sample}, compound={compound}): line {line} gave {actual}, expected {expected}."
+                )
+
+        line_totals = [random_amount(rng, 10**10) for _ in range(rng.randrange(1, 20))]
+        discount_percentage = random_amount(rng, 10**4 + 1)
+        paid_amount = random_amount(rng, 10**11)
+        expected = decimal_bill_totals(line_totals, discount_percentage, paid_amount)
+        actual = cents_bill_totals(line_totals, discount_percentage, paid_amount)
+        if expected != actual:
+            raise SystemExit(
+                f"FAIL (sample {sample}): bill of {line_totals} with {discount_percentage}% off "
+                f"and {paid_amount} paid gave {actual}, expected {expected}."
+            )
+    print(f"OK: {samples} random lines (both tax modes) and bills match the Decimal results.")
+
+
+def benchmark(lines: int, repeat: int, seed: int) -> None:
+    """
+    Time a bulk recompute the way the billing engine runs it: amounts converted once at the
+    storage boundary, tax ratios computed once per tax set, then pure arithmetic per line.
+
+    Converting `Decimal` amounts to cents costs about as much as the `Decimal` arithmetic it
+    replaces, so "incl. conversion" is typically no faster (often slower) than `Decimal`; the
+    speed-up only holds for input that is already in cents, such as the engine's `load_lines()`,
+    which has the database cast the columns.
+    """
+    rng = random.Random(seed)
+    tax_sets = [[random_amount(rng, 3000) for _ in range(rng.randrange(0, 4))] for _ in range(8)]
+    batch = [
+        (random_amount(rng, 10**6), rng.randrange(1, 20), rng.choice(tax_sets), random_amount(rng, 500))
+        for _ in range(lines)
+    ]
+
+    def run_decimal():
+        totals = [decimal_line_total(price, qty, taxes, discount, True) for price, qty, taxes, discount in batch]
+        return decimal_bill_totals(totals, Decimal("2.50"), Decimal(0))
+
+    def run_cents():
+        ratios = {}
+        totals = []
+        for price, quantity, taxes, discount in batch:
+            key = id(taxes)
+            if (ratio := ratios.get(key)) is None:
+                ratio = ratios[key] = MoneyUtils.compound_ratio(MoneyUtils.to_basis_points(tax) for tax in taxes)
+            totals.append(
+                MoneyUtils.apply_ratio(MoneyUtils.to_cents(price) * quantity, ratio, less=MoneyUtils.to_cents(discount))
+            )
+        total = MoneyUtils.discount(sum(totals), 250)
+        return MoneyUtils.from_cents(total), MoneyUtils.from_cents(total)
+
+    def run_cents_preconverted():
+        ## What the engine does once amounts are already held in cents (e.g. a report job).
+        ratios = {}
+        totals = []
+        for price, quantity, taxes, discount in converted:
+            if (ratio := ratios.get(taxes)) is None:
+                ratio = ratios[taxes] = MoneyUtils.compound_ratio(taxes)
+            totals.append(MoneyUtils.apply_ratio(price * quantity, ratio, less=discount))
+        return MoneyUtils.discount(sum(totals), 250)
+
+    converted = [
+        (
+            MoneyUtils.to_cents(price),
+            quantity,
+            tuple(MoneyUtils.to_basis_points(tax) for tax in taxes),
+            MoneyUtils.to_cents(discount),
+        )
+        for price, quantity, taxes, discount in batch
+    ]
+
+    results = {}
+    for name, func in (
+        ("Decimal", run_decimal),
+        ("int cents (incl. conversion)", run_cents),
+        ("int cents (pre-converted)", run_cents_preconverted),
+    ):
+        best = min(timed(func) for _ in range(max(repeat, 1)))
+        results[name] = best
+        print(f"  {name:30s} {best * 1000:9.2f} ms  ({best * 1e6 / max(lines, 1):6.2f} µs/line)")
+
+    if run_decimal() != run_cents():
+        raise SystemExit("FAIL: benchmark totals differ between Decimal and integer cents.")
+    print(f"Speed-up (pre-converted): {results['Decimal'] / results['int cents (pre-converted)']:.1f}x")
+    print(f"Speed-up (incl. conversion): {results['Decimal'] / results['int cents (incl. conversion)']:.1f}x")
+
+
+def timed(func) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=20000, help="Random cases to check against Decimal.")
+    parser.add_argument("--lines", type=int, default=10000, help="Lines in the benchmark batch.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per strategy; the best one is reported.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    check(args.samples, args.seed)
+    print(f"\nRecomputing {args.lines} line(s) and the bill total:")
+    benchmark(args.lines, args.repeat, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Load-test a read endpoint and report throughput and latency percentiles.
+
+Compare the sync and async stacks at the same core count by pinning the worker count:
+
+    GUNICORN_WORKERS=4 gunicorn -c gunicorn.conf.py core.wsgi:application
+    python .scripts/benchmark_read_endpoints.py --path "/api/inventory/items/?query=soap" --token <jwt>
+
+    GUNICORN_WORKERS=4 gunicorn -c gunicorn.asgi.conf.py core.asgi:application
+    python .scripts/benchmark_read_endpoints.py --path "/api/inventory/async/items/?query=soap" --token <jwt>
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def run_benchmark(url: str, token: str, total_requests: int, concurrency: int) -> dict:
+    """
+    Fire `total_requests` GETs at `url` from `concurrency` threads and collect latencies.
+    """
+    local = threading.local()
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+
+    def fetch(_):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = local.session.get(url, headers=headers, timeout=30)
+            ok = response.status_code < 500
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(fetch, range(total_requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, ok in results if ok)
+    errors = sum(1 for _, ok in results if not ok)
+
+    def percentile(value: float) -> float:
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * value))] * 1000
+
+    return {
+        "requests": total_requests,
+        "errors": errors,
+        "seconds": elapsed,
+        "rps": total_requests / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", required=True, help="Endpoint path including the query string.")
+    parser.add_argument("--token", default="", help="JWT access token.")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--warmup", type=int, default=50, help="Requests sent before measuring.")
+    args = parser.parse_args()
+
+    url = f"{args.base_url.rstrip('/')}{args.path}"
+    if args.warmup:
+        run_benchmark(url, args.token, args.warmup, min(args.concurrency, args.warmup))
+
+    result = run_benchmark(url, args.token, args.requests, args.concurrency)
+    print(f"URL:          {url}")
+    print(f"Concurrency:  {args.concurrency}")
+    print(f"Requests:     {result['requests']} ({result['errors']} errors) in {result['seconds']:.2f}s")
+    print(f"Throughput:   {result['rps']:.1f} req/s")
+    print(
+        f"Latency (ms): mean {result['mean_ms']:.1f} | p50 {result['p50_ms']:.1f} | "
+        f"p95 {result['p95_ms']:.1f} | p99 {result['p99_ms']:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -32,7 +32,22 @@ ENV_DESCRIPTIONS = {
     "DB_PORT": ("PostgreSQL database port", '"5432"'),
     "DB_USER": ("PostgreSQL database username", '"your_db_user"'),
     "DB_PASSWORD": ("PostgreSQL database password", '"your_db_password"'),
-    
+    "DB_CONN_MAX_AGE": ("Seconds a worker keeps its database connection open (0 = close after each request)", "60"),
+    "DB_USE_POOL": ("Use a psycopg 3 connection pool per worker instead of persistent connections; needs Django 5.1+ (True/False)", "False"),
+    "DB_POOL_MIN_SIZE": ("Connections each worker's pool keeps open when idle", "1"),
+    "DB_POOL_MAX_SIZE": ("Maximum connections per worker's pool (total = workers x this value)", "4"),
+    "DB_POOL_TIMEOUT": ("Seconds a request waits for a pooled connection before failing", "10"),
+    "DB_REPLICAS": ("Comma-separated read replicas as host:port (leave empty to read from the primary only)", '""'),
+    "DB_REPLICA_MAX_LAG_SECONDS": ("Skip replicas lagging the primary by more than this many seconds", "5"),
+    "DB_REPLICA_LAG_CHECK_INTERVAL": ("Seconds between replication lag checks per replica", "2"),
+    "DB_READ_YOUR_WRITES_SECONDS": ("Seconds a user's reads stay on the primary after they write", "10"),
+    
+    # Server Settings
+    "GUNICORN_WORKERS": ("Number of gunicorn worker processes (defaults to the CPU count)", "4"),
+    "GUNICORN_PRELOAD": ("Import the app once in the gunicorn master and fork warm workers from it (True/False)", "True"),
+    "GUNICORN_MAX_REQUESTS": ("Requests a worker serves before it is recycled (0 disables recycling)", "5000"),
+    "GUNICORN_MAX_REQUESTS_JITTER": ("Random extra requests per worker so recycling is staggered", "500"),
+
     # MongoDB Settings
     "MONGO_URI": ("MongoDB connection URI", '"mongodb://localhost:27017"'),
     "MONGO_NAME": ("MongoDB database name", '"your_mongo_db"'),
@@ -50,6 +65,35 @@ ENV_DESCRIPTIONS = {
     # Authentication Settings
     "OTP_ATTEMPT_LIMIT": ("Maximum OTP verification attempts", "5"),
     "OTP_ATTEMPT_TIMEOUT": ("OTP attempt timeout in minutes", "30"),
+    "LOGIN_THROTTLE_WINDOW_SECONDS": ("Seconds over which failed logins are counted", "900"),
+    "LOGIN_THROTTLE_IP_LIMIT": ("Failed logins allowed per client IP within the window", "100"),
+    "NUM_PROXIES": ("Trusted reverse proxies in front of the app (0: client IP is REMOTE_ADDR, X-Forwarded-For is ignored)", "0"),
+    "JWKS_KEY_TTL_SECONDS": ("Seconds parsed RS256 public keys are kept before parsing them again", "3600"),
+    "JWT_VERIFIED_TOKEN_CACHE_SIZE": ("Verified JWTs remembered per process until they expire", "1024"),
+    "AUTH_PRINCIPAL_CACHE_SECONDS": ("Seconds an authenticated user's id and flags are cached in Redis", "300"),
+    "AUTH_PRINCIPAL_LOCAL_CACHE_SECONDS": ("Seconds each worker keeps its own copy (changes reach other workers within this)", "5"),
+    "TOKEN_REVOCATION_SYNC_SECONDS": ("Seconds between each worker's pulls of newly revoked token ids", "2"),
+    "TOKEN_REVOCATION_BLOOM_CAPACITY": ("Revoked token ids each worker's Bloom filter is sized for", "100000"),
+    "PASSWORD_HASH_ITERATIONS": ("PBKDF2 iterations for password hashes, from calibrate_password_hasher (0 for Django's default)", "0"),
+    "PASSWORD_HASH_BUDGET_MS": ("Milliseconds one password hash may take on the auth nodes", "100"),
+    
+    # Billing Settings
+    "TAX_CALCULATION_MODE": ("How taxes on a bill line combine (compound/simple)", '"compound"'),
+    "TAX_ENGINE_GENERATION_CHECK_SECONDS": ("Seconds between checks for tax changes made by other workers", "5"),
+    "STOCK_RESERVATION_TTL_SECONDS": ("Seconds a draft bill holds its reserved stock", "900"),
+    "STOCK_RESERVATION_SWEEP_MINUTES": ("Minutes between sweeps of expired reservations (a cron job)", "1"),
+    "SALES_ROLLUP_MODE": ("When sales rollups are updated (inline/deferred)", '"deferred"'),
+    "SALES_ROLLUP_EVERY_MINUTES": ("Minutes between runs of the deferred sales rollup (a cron job)", "5"),
+    "BILL_RECOMPUTE_CHUNK_SIZE": ("Open bills recomputed per transaction after a tax or price change", "200"),
+    "BILL_RECOMPUTE_THROTTLE_SECONDS": ("Seconds to pause between recompute chunks", "0.05"),
+    "BILL_RECOMPUTE_LOCK_TIMEOUT_MS": ("Milliseconds a recompute waits for a locked bill when retrying it", "2000"),
+    "BILL_RECOMPUTE_LOCK_RETRIES": ("Rounds of retries for bills that were locked during a recompute", "3"),
+    "BILL_NUMBER_BACKEND": ("Where bill numbers are leased from (postgres/redis)", '"postgres"'),
+    "BILL_NUMBER_BLOCK_SIZE": ("Bill numbers leased per process at a time (largest gap left by a restart)", "20"),
+    "PAYMENT_IDEMPOTENCY_TTL_SECONDS": ("Seconds payment results are kept in Redis for idempotent retries", "86400"),
+    "PAYMENT_WEBHOOK_SECRET": ("Secret payment webhooks are signed with (webhooks are refused while empty)", '""'),
+    "PAYMENT_WEBHOOK_TOLERANCE_SECONDS": ("Seconds a webhook signature stays valid", "300"),
+    "PAYMENT_WEBHOOK_BATCH_SIZE": ("Webhook events applied to the ledger per statement", "200"),
     
     # AWS Settings
     "USE_AWS_S3": ("Enable AWS S3 storage (True/False)", "False"),
@@ -67,7 +111,7 @@ ENV_DESCRIPTIONS = {
     "REDIS_PASSWORD": ("Redis password (leave empty if none)", '""'),
     
     # Cron Settings
-    "CRON_ENABLED": ("Enable cron jobs (True/False)", "True"),
+    "CRON_ENABLED": ("Enable cron jobs (True/False)", "False"),
     
     # Email Settings
     "EMAIL_HOST": ("SMTP server hostname", '"smtp.gmail.com"'),
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Compare gunicorn with and without app preloading: memory per worker and first-request latency.
+
+For each mode the script boots gunicorn with `gunicorn.conf.py`, sends the first requests to
+`--path`, reads every worker's memory from `/proc/<pid>/smaps_rollup` (Linux only) and shuts
+the server down again:
+
+    python .scripts/gunicorn_worker_report.py --path /api/inventory/categories/ --token <jwt>
+
+PSS splits shared pages between the processes sharing them, so it is the number that shows
+what preloading saves; RSS counts shared pages once per worker.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.request import Request, urlopen
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+CONFIG_PATH = SRC_DIR.parent / "gunicorn.conf.py"
+
+
+def wait_for_port(port: int, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.05)
+    raise SystemExit(f"gunicorn did not start listening on port {port} within {timeout:.0f}s.")
+
+
+def worker_pids(master_pid: int) -> list[int]:
+    children = Path(f"/proc/{master_pid}/task/{master_pid}/children").read_text().split()
+    return [int(pid) for pid in children]
+
+
+def memory_kb(pid: int) -> dict:
+    memory = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        key, value = line.split(":", 1)
+        memory[key] = int(value.split()[0])
+    return {
+        "rss": memory.get("Rss", 0),
+        "pss": memory.get("Pss", 0),
+        "shared": memory.get("Shared_Clean", 0) + memory.get("Shared_Dirty", 0),
+        "private": memory.get("Private_Clean", 0) + memory.get("Private_Dirty", 0),
+    }
+
+
+def timed_get(url: str, token: str) -> float:
+    request = Request(url, headers={"Authorization": f"Bearer {token}"} if token else {})
+    started = time.perf_counter()
+    try:
+        with urlopen(request, timeout=30) as response:
+            response.read()
+    except Exception:
+        ## Error responses still went through the whole stack, which is what we are timing.
+        pass
+    return (time.perf_counter() - started) * 1000
+
+
+def measure(preload: bool, args) -> dict:
+    env = os.environ.copy()
+    env["GUNICORN_PRELOAD"] = str(preload)
+    env["GUNICORN_WORKERS"] = str(args.workers)
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn",
+            "-c", str(CONFIG_PATH),
+            "--chdir", str(SRC_DIR),
+            "--bind", f"127.0.0.1:{args.port}",
+            "core.wsgi:application",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        started = time.perf_counter()
+        wait_for_port(args.port)
+        ready_ms = (time.perf_counter() - started) * 1000
+
+        url = f"http://127.0.0.1:{args.port}{args.path}"
+        latencies = [timed_get(url, args.token) for _ in range(args.first_requests)]
+        ## Let workers that have not served yet finish their warm-up before reading memory.
+        time.sleep(1)
+        workers = [memory_kb(pid) for pid in worker_pids(process.pid)]
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+    return {
+        "ready_ms": ready_ms,
+        "first_ms": latencies[0],
+        "next_ms": statistics.median(latencies[1:]) if len(latencies) > 1 else latencies[0],
+        "workers": workers,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/admin/login/", help="Path requested right after boot.")
+    parser.add_argument("--token", default="", help="JWT access token.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-requests", type=int, default=5)
+    args = parser.parse_args()
+
+    for preload in (False, True):
+        result = measure(preload, args)
+        workers = result["workers"]
+        print(f"\n=== preload_app = {preload} ===")
+        print(f"Listening after:        {result['ready_ms']:.0f} ms")
+        print(f"First request:          {result['first_ms']:.1f} ms")
+        print(f"Following requests:     {result['next_ms']:.1f} ms (median)")
+        for index, memory in enumerate(workers):
+            print(
+                f"Worker {index}: RSS {memory['rss'] / 1024:7.1f} MiB | PSS {memory['pss'] / 1024:7.1f} MiB | "
+                f"shared {memory['shared'] / 1024:7.1f} MiB | private {memory['private'] / 1024:7.1f} MiB"
+            )
+        if workers:
+            print(f"Total PSS of workers:   {sum(memory['pss'] for memory in workers) / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
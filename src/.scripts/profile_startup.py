@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Profile how long a fresh worker takes to boot the Django application.
+
+Each run starts a new interpreter under `python -X importtime`, does what a gunicorn worker
+does on boot (import `core.wsgi`, which runs `django.setup()`), and reports:
+    - wall-clock boot time (median over `--runs`);
+    - the slowest modules by cumulative and by self import time.
+
+Use `--budget-ms` as a regression check in CI; the script exits with status 1 when the median
+boot time goes over budget:
+
+    python .scripts/profile_startup.py --runs 5 --budget-ms 900
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+
+BOOT_CODE = """
+import os, time
+started = time.perf_counter()
+if os.path.exists(os.path.join(os.getcwd(), ".env")):
+    from dotenv import read_dotenv
+    read_dotenv(os.path.join(os.getcwd(), ".env"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+from core.wsgi import application
+print(f"BOOT_MS={(time.perf_counter() - started) * 1000:.3f}")
+"""
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def boot_once() -> tuple[float, list[tuple[str, int, int, int]]]:
+    """
+    Boot the application once in a clean interpreter.
+
+    Returns the boot time in milliseconds and `(module, self_us, cumulative_us, depth)` per import.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BOOT_CODE],
+        cwd=SRC_DIR,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr[-4000:])
+        raise SystemExit(f"Application failed to boot (exit code {result.returncode}).")
+
+    boot_ms = None
+    for line in result.stdout.splitlines():
+        if line.startswith("BOOT_MS="):
+            boot_ms = float(line.split("=", 1)[1])
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return boot_ms, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Number of cold boots to measure.")
+    parser.add_argument("--top", type=int, default=25, help="Number of modules to list.")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.environ.get("STARTUP_BUDGET_MS", 0)),
+        help="Fail when the median boot time exceeds this many milliseconds (0 disables the check).",
+    )
+    args = parser.parse_args()
+
+    boot_times = []
+    imports = []
+    for _ in range(max(args.runs, 1)):
+        boot_ms, imports = boot_once()
+        boot_times.append(boot_ms)
+
+    median_ms = statistics.median(boot_times)
+    print(f"Boot time over {len(boot_times)} run(s): median {median_ms:.1f} ms "
+          f"(min {min(boot_times):.1f}, max {max(boot_times):.1f})")
+
+    ## Summed per top-level package, so that a slow dependency shows up once rather than per submodule.
+    packages = {}
+    for module, self_us, _, _ in imports:
+        package = module.split(".", 1)[0]
+        packages[package] = packages.get(package, 0) + self_us
+    print(f"\nSlowest packages by total import time (last run):")
+    for package, total_us in sorted(packages.items(), key=lambda entry: entry[1], reverse=True)[: args.top]:
+        print(f"  {total_us / 1000:9.2f} ms  {package}")
+
+    print(f"\nSlowest modules by self time (last run):")
+    for module, self_us, _, _ in sorted(imports, key=lambda entry: entry[1], reverse=True)[: args.top]:
+        print(f"  {self_us / 1000:9.2f} ms  {module}")
+
+    if args.budget_ms and median_ms > args.budget_ms:
+        print(f"\nFAIL: median boot time {median_ms:.1f} ms is over the {args.budget_ms:.1f} ms budget.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
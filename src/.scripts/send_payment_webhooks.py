@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Stand-in payment provider: send signed `payment.succeeded` webhooks to a local server.
+
+Sends `--count` events against the given bills, concurrently, resending every `--duplicate-every`th
+event (as providers do on timeouts) to exercise deduplication, and prints how fast the
+endpoint acknowledged them:
+
+    PAYMENT_WEBHOOK_SECRET=... python .scripts/send_payment_webhooks.py --bill <bill id> --amount 1.00
+
+The secret must match the server's `PAYMENT_WEBHOOK_SECRET`.
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+
+def sign(secret: str, body: bytes) -> str:
+    timestamp = int(time.time())
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def send(url: str, secret: str, body: bytes) -> tuple[int, float]:
+    request = Request(
+        url,
+        data=body,
+        method="POST",
+        headers={"Content-Type": "application/json", "X-Webhook-Signature": sign(secret, body)},
+    )
+    started = time.perf_counter()
+    try:
+        with urlopen(request, timeout=30) as response:
+            response.read()
+            status = response.status
+    except HTTPError as ex:
+        status = ex.code
+    return status, (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000/api/payments/webhooks/")
+    parser.add_argument("--secret", default=os.environ.get("PAYMENT_WEBHOOK_SECRET", ""))
+    parser.add_argument("--bill", action="append", required=True, help="Bill id; repeat for several bills.")
+    parser.add_argument("--amount", default="1.00", help="Amount of every payment.")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--duplicate-every", type=int, default=10, help="Resend every n-th event; 0 to never.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    if not args.secret:
+        raise SystemExit("Set --secret or PAYMENT_WEBHOOK_SECRET.")
+
+    bodies = []
+    for index in range(args.count):
+        event = {
+            "id": f"evt_{uuid.uuid4().hex}",
+            "type": "payment.succeeded",
+            "data": {
+                "bill": args.bill[index % len(args.bill)],
+                "amount": args.amount,
+                "method": "card",
+                "reference": f"ch_{uuid.uuid4().hex[:16]}",
+            },
+        }
+        body = json.dumps(event).encode()
+        bodies.append(body)
+        if args.duplicate_every and index % args.duplicate_every == 0:
+            bodies.append(body)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda body: send(args.url, args.secret, body), bodies))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for _, latency in results)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    print(f"Sent {len(bodies)} webhook(s) ({len(bodies) - args.count} duplicate(s)) in {elapsed:.2f}s.")
+    print(f"Statuses: {', '.join(f'{status}: {count}' for status, count in sorted(statuses.items()))}")
+    print(
+        f"Ack latency: median {statistics.median(latencies):.1f} ms | "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1 if len(latencies) > 1 else 0]:.1f} ms | "
+        f"max {latencies[-1]:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
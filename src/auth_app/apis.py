@@ -1,10 +1,17 @@
+import os
+
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.response import Response
 from rest_framework.request import Request
+from rest_framework.throttling import BaseThrottle
 
 
-from auth_app.helpers import UserModelHelpers
+from core.boilerplate.response_template import Resp
+from auth_app.helpers import UserModelHelpers, TokenHelpers
+from auth_app.serializers import BulkUserRegisterOptionsSerializer
+from auth_app.utils import LoginMetrics
 
 from auth_app import logger
 
@@ -27,6 +34,27 @@ class AdminUserRegisterAPI(APIView):
         return resp.to_response()
 
 
+class AdminBulkUserRegisterAPI(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def post(self, request: Request) -> Response:
+        ## "false"/"0" must not be read as truthy strings; accounts are regular users unless asked otherwise.
+        options = BulkUserRegisterOptionsSerializer(data=request.data)
+        if not options.is_valid():
+            resp = Resp(error="Invalid data.", message=f"{options.errors}", status_code=status.HTTP_400_BAD_REQUEST)
+            logger.error(resp.to_text())
+            return resp.to_response()
+
+        resp = UserModelHelpers.enqueue_bulk_register(
+            rows=request.data.get("users"), is_staff=options.validated_data["is_staff"]
+        )
+        return resp.to_response()
+
+    def get(self, request: Request) -> Response:
+        resp = UserModelHelpers.bulk_register_status(job_id=request.query_params.get("jobId"))
+        return resp.to_response()
+
+
 class UserPasswordLoginAPI(APIView):
     permission_classes = (AllowAny,)
 
@@ -34,7 +62,39 @@ class UserPasswordLoginAPI(APIView):
         username = request.data.get("username")
         email = request.data.get("email")
         password = request.data.get("password")
+        timings = {}
         resp = UserModelHelpers.login_via_password(
-            username=username, email=email, password=password
+            username=username, email=email, password=password, ip=BaseThrottle().get_ident(request), timings=timings
+        )
+        response = resp.to_response()
+        if timings:
+            response["Server-Timing"] = LoginMetrics.server_timing(timings)
+        return response
+
+
+class LoginMetricsAPI(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request: Request) -> Response:
+        ## Samples are per worker; repeated calls may be answered by different workers.
+        return Response({"worker": os.getpid(), "logins": LoginMetrics.summary()})
+
+
+class TokenRefreshAPI(APIView):
+    ## The refresh token in the body is the credential; an expired access token must not get in the way.
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def post(self, request: Request) -> Response:
+        resp = TokenHelpers.refresh(refresh_token=request.data.get("refreshToken"))
+        return resp.to_response()
+
+
+class LogoutAPI(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request: Request) -> Response:
+        resp = TokenHelpers.logout(
+            user=request.user, refresh_token=request.data.get("refreshToken"), access_token=request.auth
         )
         return resp.to_response()
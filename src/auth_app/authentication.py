@@ -0,0 +1,221 @@
+import json
+import time
+from datetime import timedelta
+from uuid import UUID
+
+from django.conf import settings as django_settings
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import SimpleLazyObject
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from auth_app.models import User
+from auth_app.utils import TokenRevocationStore, VerifiedTokenCache
+from auth_app import logger
+
+
+class PrincipalCache:
+    """
+    The few `User` columns authentication needs, cached per worker and in Redis.
+
+    A worker keeps a user's state for `AUTH_PRINCIPAL_LOCAL_CACHE_SECONDS` and Redis keeps it
+    for `AUTH_PRINCIPAL_CACHE_SECONDS`, so a request costs a dict lookup, at worst a Redis GET,
+    and only reads Postgres when both missed. `invalidate()` runs on every `User` save and on
+    block transitions (which are plain UPDATEs); other workers' copies age out within the
+    local TTL, which is therefore kept to seconds.
+    """
+    KEY_PREFIX: str = "auth:principal:"
+    FIELDS: tuple = ("id", "username", "is_active", "is_staff", "is_superuser", "blocked_until")
+    _local: dict = {}
+
+    @classmethod
+    def _redis(cls):
+        return getattr(django_settings, "REDIS_CONN", None)
+
+    @classmethod
+    def get(cls, user_id) -> dict:
+        """
+        State of the user with the given id, or `None` when there is no such user.
+        """
+        user_id = str(user_id)
+        entry = cls._local.get(user_id)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+
+        state = cls._get_shared(user_id)
+        if state is None:
+            state = User.objects.filter(pk=user_id).values(*cls.FIELDS).first()
+            if state is None:
+                return None
+            state = {**state, "id": str(state["id"])}
+            if state["blocked_until"]:
+                state["blocked_until"] = state["blocked_until"].isoformat()
+            cls._set_shared(user_id, state)
+
+        cls._local[user_id] = (state, time.monotonic() + django_settings.AUTH_PRINCIPAL_LOCAL_CACHE_SECONDS)
+        return state
+
+    @classmethod
+    def invalidate(cls, user_id) -> None:
+        user_id = str(user_id)
+        cls._local.pop(user_id, None)
+        redis_conn = cls._redis()
+        if redis_conn is None:
+            return
+        try:
+            redis_conn.delete(cls.KEY_PREFIX + user_id)
+        except Exception as ex:
+            logger.warning(f"Could not invalidate the cached principal of user '{user_id}': {ex}")
+
+    @classmethod
+    def _get_shared(cls, user_id: str) -> dict:
+        redis_conn = cls._redis()
+        if redis_conn is None:
+            return None
+        try:
+            cached = redis_conn.get(cls.KEY_PREFIX + user_id)
+        except Exception as ex:
+            logger.warning(f"Principal cache unavailable, reading the user from the database: {ex}")
+            return None
+        return json.loads(cached) if cached else None
+
+    @classmethod
+    def _set_shared(cls, user_id: str, state: dict) -> None:
+        redis_conn = cls._redis()
+        if redis_conn is None:
+            return
+        try:
+            redis_conn.set(cls.KEY_PREFIX + user_id, json.dumps(state), ex=django_settings.AUTH_PRINCIPAL_CACHE_SECONDS)
+        except Exception as ex:
+            logger.warning(f"Could not cache the principal of user '{user_id}': {ex}")
+
+
+class CachedPrincipal(SimpleLazyObject):
+    """
+    `request.user` for `CachedPrincipalJWTAuthentication`: answers from the cached state and
+    only loads the `User` row when something else is asked of it.
+
+    `id`/`pk` (a `UUID`), `username`, the `is_*` flags and `blocked_until` (an aware
+    `datetime`) never touch the database, so permission checks and throttles are free. Any
+    other attribute, `isinstance()` checks and assigning it to a foreign key load the full
+    user once, exactly like Django's own lazy `request.user`.
+    """
+
+    def __init__(self, state: dict):
+        super().__init__(lambda: User.objects.get(pk=state["id"]))
+        ## The cache holds text; hand out the same types as the model.
+        self.__dict__["_principal"] = {
+            **state,
+            "id": UUID(state["id"]),
+            "blocked_until": parse_datetime(state["blocked_until"]) if state["blocked_until"] else None,
+        }
+
+    @property
+    def id(self):
+        return self.__dict__["_principal"]["id"]
+
+    pk = id
+
+    @property
+    def username(self):
+        return self.__dict__["_principal"]["username"]
+
+    @property
+    def is_active(self):
+        return self.__dict__["_principal"]["is_active"]
+
+    @property
+    def is_staff(self):
+        return self.__dict__["_principal"]["is_staff"]
+
+    @property
+    def is_superuser(self):
+        return self.__dict__["_principal"]["is_superuser"]
+
+    @property
+    def blocked_until(self):
+        return self.__dict__["_principal"]["blocked_until"]
+
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
+    def __bool__(self):
+        return True
+
+    def __str__(self):
+        return self.username
+
+
+class CachedPrincipalJWTAuthentication(JWTAuthentication):
+    """
+    `JWTAuthentication` without the per-request `User` query: the user comes from `PrincipalCache`.
+
+    A token whose signature and claims were verified once is served from `VerifiedTokenCache`
+    until it expires, so repeated requests with the same access token skip the signature check.
+    Tokens revoked on logout are refused; the check is usually answered by the worker's Bloom
+    filter in `TokenRevocationStore` without leaving the process.
+    """
+
+    def get_validated_token(self, raw_token):
+        ## Keyed by everything the verification depended on, so a changed key or issuer misses.
+        digest = VerifiedTokenCache.digest(
+            raw_token,
+            api_settings.ALGORITHM,
+            api_settings.SIGNING_KEY,
+            api_settings.VERIFYING_KEY,
+            api_settings.JWK_URL,
+            api_settings.ISSUER,
+            api_settings.AUDIENCE,
+        )
+        claims = VerifiedTokenCache.get(digest)
+        validated_token = self._restore_token(raw_token, claims) if claims is not None else None
+        if validated_token is None:
+            validated_token = super().get_validated_token(raw_token)
+            leeway = api_settings.LEEWAY
+            VerifiedTokenCache.set(
+                digest,
+                validated_token.payload,
+                leeway=leeway.total_seconds() if isinstance(leeway, timedelta) else leeway,
+            )
+
+        if TokenRevocationStore.is_revoked(validated_token.get(api_settings.JTI_CLAIM)):
+            raise InvalidToken({"detail": "Token is revoked", "code": "token_not_valid"})
+        return validated_token
+
+    @staticmethod
+    def _restore_token(raw_token, claims: dict):
+        """
+        The token object `super().get_validated_token()` returned for these already verified claims.
+        """
+        for token_class in api_settings.AUTH_TOKEN_CLASSES:
+            if claims.get(api_settings.TOKEN_TYPE_CLAIM) == token_class.token_type:
+                token = token_class.__new__(token_class)
+                token.token = raw_token
+                token.current_time = aware_utcnow()
+                token.payload = claims
+                return token
+        return None
+
+    def get_user(self, validated_token):
+        if getattr(api_settings, "CHECK_REVOKE_TOKEN", False):
+            ## Revocation compares a hash of the password, which is not cached.
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise AuthenticationFailed("Token contained no recognizable user identification", code="token_not_valid")
+
+        state = PrincipalCache.get(user_id)
+        if state is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if not state["is_active"]:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return CachedPrincipal(state)
@@ -1,5 +1,8 @@
 from django.urls import path
-from auth_app.apis import UserRegisterAPI, AdminUserRegisterAPI, UserPasswordLoginAPI
+from auth_app.apis import (
+    UserRegisterAPI, AdminUserRegisterAPI, AdminBulkUserRegisterAPI, UserPasswordLoginAPI, TokenRefreshAPI, LogoutAPI,
+    LoginMetricsAPI,
+)
 
 
 PREFIX = "api/auth/"
@@ -7,5 +10,9 @@ PREFIX = "api/auth/"
 urlpatterns = [
     path('register-normal/', UserRegisterAPI.as_view(), name='new-user-registration'),
     path('register-sudo/', AdminUserRegisterAPI.as_view(), name='admin-user-registration'),
+    path('register-bulk/', AdminBulkUserRegisterAPI.as_view(), name='bulk-user-registration'),
     path('login/', UserPasswordLoginAPI.as_view(), name='password-login'),
+    path('token/refresh/', TokenRefreshAPI.as_view(), name='token-refresh'),
+    path('logout/', LogoutAPI.as_view(), name='logout'),
+    path('metrics/login/', LoginMetricsAPI.as_view(), name='login-metrics'),
 ]
\ No newline at end of file
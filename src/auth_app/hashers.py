@@ -0,0 +1,21 @@
+from django.conf import settings as django_settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class CalibratedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count from `PASSWORD_HASH_ITERATIONS`.
+
+    Run `calibrate_password_hasher` on the auth nodes to pick a count that fits
+    `PASSWORD_HASH_BUDGET_MS`; 0 keeps Django's default, and a count below `MIN_ITERATIONS`
+    (OWASP's figure for PBKDF2-HMAC-SHA256) is raised to it. Stored hashes keep the
+    `pbkdf2_sha256` prefix, and `must_update()` compares iteration counts both ways, so a
+    hash with more or fewer iterations than configured is replaced at the next successful
+    login.
+    """
+    MIN_ITERATIONS: int = 600000
+
+    @property
+    def iterations(self) -> int:
+        configured = getattr(django_settings, "PASSWORD_HASH_ITERATIONS", 0) or PBKDF2PasswordHasher.iterations
+        return max(configured, self.MIN_ITERATIONS)
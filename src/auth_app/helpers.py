@@ -1,33 +1,68 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from uuid import uuid4
+
+import django_rq
 from core.boilerplate.response_template import Resp
 from rest_framework.response import Response
 from rest_framework import status
 from django.conf import settings as django_settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.db import IntegrityError, transaction
+from django.template.defaultfilters import slugify
 from django.utils import timezone
 
+from auth_app.authentication import PrincipalCache
 from auth_app.models import User, UserProfile, UserOauth2Credential
 from auth_app.constants import FormatRegex
 from auth_app.serializers import UserSerializer, UserProfileOutputSerializer, UserProfileInputSerializer, UserRegisterSerializer
-from auth_app.utils import JWTUtils
+from auth_app.utils import JWTUtils, LoginMetrics, LoginThrottle, TokenRevocationStore, make_passwords
 
-from django.db.models import Q, QuerySet
+from django.db.models import F, Q, QuerySet
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 
 from auth_app import logger
 
 
 class UserModelHelpers:
+    MAX_BULK_USERS: int = 5000
+    BULK_BATCH_SIZE: int = 1000
+    BULK_INSERT_ATTEMPTS: int = 3
+    BULK_QUEUE: str = "low"
+    BULK_JOB_TTL_SECONDS: int = 600
+
+    ## Everything the login path reads: the credentials, the lockout state and what `UserSerializer` returns.
+    LOGIN_FIELDS: tuple = (
+        "id",
+        "username",
+        "email",
+        "slug",
+        "password",
+        "is_active",
+        "blocked_until",
+        "unsuccessful_login_attempts",
+    )
 
     @classmethod
-    def get(cls, username: str = None, email: str = None, return_obj: bool = False) -> Resp:
+    def get(cls, username: str = None, email: str = None, return_obj: bool = False, fields: tuple = None) -> Resp:
         """
         Get a user by username or email.
+
+        `User.save()` stores both lowercased, so an exact match on the lowercased value is
+        case-insensitive and, unlike `iexact` (`UPPER(...) = UPPER(...)`), uses the unique index.
+        `fields` limits the columns loaded.
         """
         query = Q()
         resp = Resp()
 
         if username:
-            query = Q(username__iexact=username.strip().lower())
+            query = Q(username=username.strip().lower())
         elif email:
-            query = Q(email__iexact=email.strip().lower())
+            query = Q(email=email.strip().lower())
         elif username and email:
             resp.error = "Invalid Parameters"
             resp.message = "Provide either username or email, not both."
@@ -41,7 +76,10 @@ class UserModelHelpers:
             logger.error(resp.to_text())
             return resp
 
-        user = User.objects.filter(query).first()
+        users = User.objects.filter(query)
+        if fields:
+            users = users.only(*fields)
+        user = users.first()
         if not user:
             resp.error = "User Not Found."
             resp.message = "No user found with the given credentials."
@@ -62,13 +100,13 @@ class UserModelHelpers:
         """
         query = Q()
         if username:
-            query = Q(username__iexact=username.strip().lower())
+            query = Q(username=username.strip().lower())
         elif email:
-            query = Q(email__iexact=email.strip().lower())
+            query = Q(email=email.strip().lower())
         elif username and email:
             query = Q(
-                Q(username__iexact=username.strip().lower()) |
-                Q(email__iexact=email.strip().lower())
+                Q(username=username.strip().lower()) |
+                Q(email=email.strip().lower())
             )
         else:
             logger.error(
@@ -134,7 +172,256 @@ class UserModelHelpers:
         return resp
 
     @classmethod
-    def login_via_password(cls, username: str = None, email: str = None, password: str = None) -> Resp:
+    def bulk_register(cls, rows: list = None, is_staff: bool = False, workers: int = None) -> Resp:
+        """
+        Create many accounts at once, e.g. a new store's staff.
+
+        Rows (`username`, `email`, `password`, optional `first_name`/`last_name`) are checked
+        in memory and against existing users with one query. Passwords are hashed across a
+        process pool, since PBKDF2 is pure CPU and holds the GIL, and the users and their
+        profiles are written with two `bulk_create`s in one transaction. `bulk_create` sends no
+        post_save, so the profiles are created here instead of by `UserModelSignals`. This runs
+        in an rq job (see `enqueue_bulk_register`) or `provision_users`, never in a request.
+
+        Invalid rows are reported in `rejected` and do not stop the valid ones. So are rows whose
+        username or email a concurrent signup takes between the check and the insert; the insert
+        is then rolled back and retried without them.
+        """
+        resp = cls._check_bulk_rows(rows)
+        if resp.error:
+            return resp
+
+        started = time.perf_counter()
+        accepted, rejected, seen = [], [], set()
+        for index, row in enumerate(rows):
+            row = row if isinstance(row, dict) else {}
+            username = str(row.get('username') or '').strip().lower()
+            email = str(row.get('email') or '').strip().lower()
+            password = row.get('password') or ''
+
+            if not username or not email:
+                reason = "username and email are required."
+            elif len(username) > 150 or len(email) > 254:
+                reason = "username or email too long."
+            elif not FormatRegex.EMAIL_REGEX.match(email):
+                reason = "invalid email."
+            elif not FormatRegex.PASSWORD_REGEX.match(password):
+                reason = "the password does not meet the required complexity."
+            elif username in seen or email in seen:
+                reason = "duplicate username or email in the request."
+            else:
+                seen.update((username, email))
+                accepted.append((index, username, email, password, row))
+                continue
+            rejected.append({'index': index, 'username': username, 'reason': reason})
+
+        accepted = cls._reject_existing(accepted, rejected)
+
+        if not accepted:
+            resp.error = "Invalid Data."
+            resp.message = "None of the users could be provisioned."
+            resp.data = {'created': 0, 'rejected': rejected}
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+            logger.warning(resp.to_text())
+            return resp
+
+        validated_at = time.perf_counter()
+        passwords = [row[3] for row in accepted]
+        workers = workers or os.cpu_count() or 1
+        chunk_size = max(1, -(-len(passwords) // (workers * 4)))
+        chunks = [passwords[start:start + chunk_size] for start in range(0, len(passwords), chunk_size)]
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            hashes = [encoded for chunk in pool.map(make_passwords, chunks) for encoded in chunk]
+        hashed_at = time.perf_counter()
+
+        encoded_passwords = {row[0]: encoded for row, encoded in zip(accepted, hashes)}
+        for attempt in range(1, cls.BULK_INSERT_ATTEMPTS + 1):
+            users, profiles = [], []
+            for index, username, email, _, row in accepted:
+                user = User(
+                    id=uuid4(),
+                    username=username,
+                    email=email,
+                    password=encoded_passwords[index],
+                    slug=slugify(username),
+                    is_staff=is_staff,
+                )
+                users.append(user)
+                profiles.append(
+                    UserProfile(
+                        user=user,
+                        first_name=(row.get('first_name') or '').strip().lower() or None,
+                        last_name=(row.get('last_name') or '').strip().lower() or None,
+                    )
+                )
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create(users, batch_size=cls.BULK_BATCH_SIZE)
+                    UserProfile.objects.bulk_create(profiles, batch_size=cls.BULK_BATCH_SIZE)
+                break
+            except IntegrityError:
+                ## Someone signed up with one of these usernames or emails after the check above.
+                remaining = cls._reject_existing(accepted, rejected)
+                if len(remaining) == len(accepted) or attempt == cls.BULK_INSERT_ATTEMPTS:
+                    resp.error = "Conflict"
+                    resp.message = "The users could not be provisioned; their usernames or emails are being registered concurrently."
+                    resp.data = {'created': 0, 'rejected': rejected}
+                    resp.status_code = status.HTTP_409_CONFLICT
+                    logger.error(resp.to_text())
+                    return resp
+                accepted = remaining
+                logger.warning("Users of this batch were registered concurrently; provisioning the rest again.")
+
+        if not accepted:
+            resp.error = "Invalid Data."
+            resp.message = "None of the users could be provisioned."
+            resp.data = {'created': 0, 'rejected': rejected}
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+            logger.warning(resp.to_text())
+            return resp
+
+        finished = time.perf_counter()
+
+        elapsed = finished - started
+        resp.message = f"Provisioned {len(users)} user(s) in {elapsed:.2f}s; {len(rejected)} rejected."
+        resp.data = {
+            'created': len(users),
+            'users': [{'id': str(user.id), 'username': user.username, 'email': user.email} for user in users],
+            'rejected': rejected,
+            'timings': {
+                'validateSeconds': round(validated_at - started, 3),
+                'hashSeconds': round(hashed_at - validated_at, 3),
+                'insertSeconds': round(finished - hashed_at, 3),
+                'hashWorkers': min(workers, len(chunks)),
+                'usersPerSecond': round(len(users) / elapsed, 1) if elapsed else None,
+            },
+        }
+        resp.status_code = status.HTTP_201_CREATED
+        logger.info(resp.to_text())
+        return resp
+
+    @classmethod
+    def enqueue_bulk_register(cls, rows: list = None, is_staff: bool = False) -> Resp:
+        """
+        Queue `bulk_register` on an rq worker, so hashing a batch never holds a request worker.
+
+        The rows, passwords included, wait in Redis as the job's arguments; rq deletes them with
+        the job, `BULK_JOB_TTL_SECONDS` after it finishes or fails.
+        """
+        resp = cls._check_bulk_rows(rows)
+        if resp.error:
+            return resp
+
+        if not django_settings.USE_REDIS:
+            resp.error = "Service Unavailable"
+            resp.message = "Bulk registration needs the job queue; use the `provision_users` command instead."
+            resp.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+            logger.error(resp.to_text())
+            return resp
+
+        from auth_app.jobs import bulk_register_users
+
+        job = django_rq.get_queue(cls.BULK_QUEUE).enqueue(
+            bulk_register_users,
+            rows,
+            is_staff,
+            result_ttl=cls.BULK_JOB_TTL_SECONDS,
+            failure_ttl=cls.BULK_JOB_TTL_SECONDS,
+        )
+        resp.message = f"Queued the registration of {len(rows)} user(s)."
+        resp.data = {'jobId': job.id, 'status': job.get_status()}
+        resp.status_code = status.HTTP_202_ACCEPTED
+        logger.info(resp.to_text())
+        return resp
+
+    @classmethod
+    def bulk_register_status(cls, job_id: str = None) -> Resp:
+        """
+        Where a queued bulk registration stands; once finished, `result` is what `bulk_register` returned.
+        """
+        resp = Resp()
+        job = django_rq.get_queue(cls.BULK_QUEUE).fetch_job(job_id) if job_id else None
+        if not job:
+            resp.error = "Not Found"
+            resp.message = f"No bulk registration '{job_id}' is queued or was finished recently."
+            resp.status_code = status.HTTP_404_NOT_FOUND
+            logger.error(resp.to_text())
+            return resp
+
+        job_status = job.get_status()
+        error = None
+        if job_status == "failed" and (result := job.latest_result()):
+            error = result.exc_string
+
+        resp.message = f"Bulk registration '{job_id}': {job_status}."
+        resp.data = {
+            'jobId': job_id,
+            'status': job_status,
+            'result': job.return_value() if job_status == "finished" else None,
+            'error': error,
+        }
+        resp.status_code = status.HTTP_200_OK
+        logger.info(resp.to_text())
+        return resp
+
+    @classmethod
+    def _check_bulk_rows(cls, rows: list) -> Resp:
+        resp = Resp()
+        if not rows or not isinstance(rows, list):
+            resp.error = "Invalid Parameters"
+            resp.message = "A non-empty list of users is required."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+            logger.error(resp.to_text())
+            return resp
+
+        if len(rows) > cls.MAX_BULK_USERS:
+            resp.error = "Too Many Users"
+            resp.message = f"At most {cls.MAX_BULK_USERS} users can be provisioned at once; got {len(rows)}."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+            logger.error(resp.to_text())
+            return resp
+
+        return resp
+
+    @staticmethod
+    def _reject_existing(accepted: list, rejected: list) -> list:
+        """
+        Move the accepted rows whose username or email is already taken to `rejected`; returns the rest.
+        """
+        if not accepted:
+            return accepted
+
+        existing = set()
+        for username, email in User.objects.filter(
+            Q(username__in=[row[1] for row in accepted]) | Q(email__in=[row[2] for row in accepted])
+        ).values_list('username', 'email'):
+            existing.update((username, email))
+        rejected.extend(
+            {'index': index, 'username': username, 'reason': "a user with this username or email exists."}
+            for index, username, email, _, _ in accepted
+            if username in existing or email in existing
+        )
+        return [row for row in accepted if row[1] not in existing and row[2] not in existing]
+
+    @classmethod
+    def login_via_password(
+        cls, username: str = None, email: str = None, password: str = None, ip: str = None, timings: dict = None
+    ) -> Resp:
+        """
+        Log a user in with one indexed lookup and no writes unless a block starts or ends.
+
+        Failed attempts are counted per user and per client `ip` by `LoginThrottle` in Redis,
+        and blocked users or IPs are turned away before the password is hashed. The `User`
+        row is written only when a block starts, when a login after a block succeeds, or to
+        store an upgraded password hash, and each of those is a single UPDATE. Without Redis,
+        failures are counted on the row instead.
+
+        A hash made with other parameters than the configured hasher's (see
+        `CalibratedPBKDF2PasswordHasher`) is replaced on success, in that same UPDATE. When
+        given, `timings` is filled with the milliseconds spent hashing and in total.
+        """
+        started = time.perf_counter()
+        timings = {} if timings is None else timings
         resp = Resp()
         if not username and not email:
             resp.error = "Invalid Parameters"
@@ -143,18 +430,24 @@ class UserModelHelpers:
             logger.error(resp.to_text())
             return resp
 
-        user_resp = cls.get(username=username, email=email, return_obj=True)
+        throttled = LoginThrottle.available()
+        if throttled and (seconds := LoginThrottle.blocked(ip=ip)):
+            return cls._blocked(timezone.now() + timedelta(seconds=seconds))
+
+        user_resp = cls.get(username=username, email=email, return_obj=True, fields=cls.LOGIN_FIELDS)
         if user_resp.error:
+            if throttled and user_resp.status_code == status.HTTP_404_NOT_FOUND:
+                ## Guessing usernames counts against the IP too.
+                LoginThrottle.fail(ip=ip)
             return user_resp
 
         user: User = user_resp.data
+        now = timezone.now()
 
-        if user.blocked_until and user.blocked_until > timezone.now():
-            resp.error = "User Blocked"
-            resp.message = f"User is blocked until {user.blocked_until} due to multiple unsuccessful login attempts."
-            resp.status_code = status.HTTP_403_FORBIDDEN
-            logger.warning(resp.to_text())
-            return resp
+        if user.blocked_until and user.blocked_until > now:
+            return cls._blocked(user.blocked_until)
+        if throttled and (seconds := LoginThrottle.blocked(user_id=user.pk)):
+            return cls._blocked(now + timedelta(seconds=seconds))
 
         if not password:
             resp.error = "Invalid Parameters"
@@ -163,16 +456,40 @@ class UserModelHelpers:
             logger.error(resp.to_text())
             return resp
 
-        if not user.check_password(password):
-            user.unsuccessful_login_attempts += 1
-            user.save()
-
-            if user.unsuccessful_login_attempts > django_settings.OTP_ATTEMPT_LIMIT:
-                user.block()
-                resp.error = "User Blocked"
-                resp.message = f"Too many unsuccessful login attempts. User is blocked until {user.blocked_until}."
-                resp.status_code = status.HTTP_403_FORBIDDEN
-                return resp
+        ## `User.check_password()` would save the upgraded hash on its own; keep it for the single write below.
+        upgraded_hashes, rehash_ms = [], []
+
+        def rehash(raw: str) -> None:
+            rehash_started = time.perf_counter()
+            upgraded_hashes.append(make_password(raw))
+            rehash_ms.append((time.perf_counter() - rehash_started) * 1000)
+
+        hash_started = time.perf_counter()
+        verified = check_password(password, user.password, setter=rehash)
+        timings['hash'] = (time.perf_counter() - hash_started) * 1000 - sum(rehash_ms)
+        if rehash_ms:
+            timings['rehash'] = rehash_ms[0]
+
+        if not verified:
+            if throttled:
+                attempts_left, block_started = LoginThrottle.fail(user_id=user.pk, ip=ip)
+            else:
+                attempts_left = django_settings.OTP_ATTEMPT_LIMIT - user.unsuccessful_login_attempts - 1
+                block_started = attempts_left < 0
+                if not block_started:
+                    User.objects.filter(pk=user.pk).update(
+                        unsuccessful_login_attempts=F("unsuccessful_login_attempts") + 1, updated=now
+                    )
+
+            if block_started:
+                user.blocked_until = now + timedelta(minutes=django_settings.OTP_ATTEMPT_TIMEOUT)
+                User.objects.filter(pk=user.pk).update(
+                    blocked_until=user.blocked_until, unsuccessful_login_attempts=0, updated=now
+                )
+                ## A plain UPDATE sends no post_save.
+                PrincipalCache.invalidate(user.pk)
+                cls._record_login_timings("blocked", timings, started)
+                return cls._blocked(user.blocked_until)
 
             resp.error = "Invalid Credentials"
             resp.message = "The provided credentials are invalid."
@@ -180,16 +497,27 @@ class UserModelHelpers:
                 "username": username,
                 "email": email,
                 "password": password,
-                "attemptsLeft": django_settings.OTP_ATTEMPT_LIMIT - user.unsuccessful_login_attempts
+                "attemptsLeft": attempts_left
             }
             resp.status_code = status.HTTP_401_UNAUTHORIZED
             logger.warning(resp.to_text())
+            cls._record_login_timings("failure", timings, started)
             return resp
 
         tokens = JWTUtils.get_tokens_for_user(user)
-
-        if user.blocked_until:
-            user.unblock()
+        if throttled:
+            LoginThrottle.succeed(user.pk)
+
+        changes = {}
+        if user.blocked_until or user.unsuccessful_login_attempts:
+            changes.update(blocked_until=None, unsuccessful_login_attempts=0)
+        if upgraded_hashes:
+            changes["password"] = upgraded_hashes[-1]
+        if changes:
+            for field, value in changes.items():
+                setattr(user, field, value)
+            User.objects.filter(pk=user.pk).update(**changes, updated=now)
+            PrincipalCache.invalidate(user.pk)
 
         resp.message = f"User '{user.email}' logged in successfully."
         resp.data = {
@@ -198,6 +526,21 @@ class UserModelHelpers:
         }
         resp.status_code = status.HTTP_200_OK
         logger.info(resp.to_text())
+        cls._record_login_timings("success", timings, started)
+        return resp
+
+    @classmethod
+    def _record_login_timings(cls, outcome: str, timings: dict, started: float) -> None:
+        timings['total'] = (time.perf_counter() - started) * 1000
+        LoginMetrics.record(outcome, timings.get('hash', 0.0), timings.get('rehash', 0.0), timings['total'])
+
+    @classmethod
+    def _blocked(cls, blocked_until) -> Resp:
+        resp = Resp()
+        resp.error = "User Blocked"
+        resp.message = f"Too many unsuccessful login attempts. Blocked until {blocked_until}."
+        resp.status_code = status.HTTP_403_FORBIDDEN
+        logger.warning(resp.to_text())
         return resp
 
     @classmethod
@@ -254,5 +597,123 @@ class UserModelHelpers:
         return resp
 
 
+class TokenHelpers:
+
+    @classmethod
+    def refresh(cls, refresh_token: str = None) -> Resp:
+        """
+        Exchange a refresh token for a new access token and, when rotating, a new refresh token.
+
+        The old refresh token is revoked with an atomic `ZADD NX`, so it works exactly once:
+        a second use (a replayed or stolen token) is refused.
+        """
+        resp = Resp()
+        if not refresh_token:
+            resp.error = "Invalid Parameters"
+            resp.message = "A refresh token is required."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+            logger.error(resp.to_text())
+            return resp
+
+        try:
+            refresh = RefreshToken(refresh_token)
+        except TokenError as ex:
+            resp.error = "Invalid Token"
+            resp.message = f"{ex}"
+            resp.status_code = status.HTTP_401_UNAUTHORIZED
+            logger.warning(resp.to_text())
+            return resp
+
+        jti = refresh.get(jwt_settings.JTI_CLAIM)
+        if TokenRevocationStore.is_revoked(jti):
+            resp.error = "Invalid Token"
+            resp.message = "The refresh token has been revoked."
+            resp.status_code = status.HTTP_401_UNAUTHORIZED
+            logger.warning(resp.to_text())
+            return resp
+
+        state = PrincipalCache.get(refresh.get(jwt_settings.USER_ID_CLAIM))
+        if not state or not state["is_active"]:
+            resp.error = "Invalid Token"
+            resp.message = "The user of this refresh token no longer exists or is inactive."
+            resp.status_code = status.HTTP_401_UNAUTHORIZED
+            logger.warning(resp.to_text())
+            return resp
+
+        revoke = jwt_settings.ROTATE_REFRESH_TOKENS and jwt_settings.BLACKLIST_AFTER_ROTATION
+        if revoke and not TokenRevocationStore.available():
+            return cls._revocation_unavailable(resp, "refresh tokens cannot be rotated")
+
+        data = {'accessToken': str(refresh.access_token)}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            if revoke and not TokenRevocationStore.revoke(jti):
+                resp.error = "Invalid Token"
+                resp.message = "The refresh token has already been used."
+                resp.status_code = status.HTTP_401_UNAUTHORIZED
+                logger.warning(resp.to_text())
+                return resp
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refreshToken'] = str(refresh)
+
+        resp.message = f"Tokens refreshed for user '{state['username']}'."
+        resp.data = data
+        resp.status_code = status.HTTP_200_OK
+        logger.info(resp.to_text())
+        return resp
+
+    @classmethod
+    def logout(cls, user=None, refresh_token: str = None, access_token=None) -> Resp:
+        """
+        Revoke the refresh token and the access token the request was made with.
+        """
+        resp = Resp()
+        if not refresh_token:
+            resp.error = "Invalid Parameters"
+            resp.message = "The refresh token to revoke is required."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+            logger.error(resp.to_text())
+            return resp
+
+        try:
+            refresh = RefreshToken(refresh_token)
+        except TokenError as ex:
+            resp.error = "Invalid Token"
+            resp.message = f"{ex}"
+            resp.status_code = status.HTTP_401_UNAUTHORIZED
+            logger.warning(resp.to_text())
+            return resp
+
+        if str(refresh.get(jwt_settings.USER_ID_CLAIM)) != str(user.pk):
+            resp.error = "Invalid Token"
+            resp.message = "The refresh token belongs to another user."
+            resp.status_code = status.HTTP_403_FORBIDDEN
+            logger.warning(resp.to_text())
+            return resp
+
+        if not TokenRevocationStore.available():
+            return cls._revocation_unavailable(resp, "tokens cannot be revoked")
+
+        TokenRevocationStore.revoke(refresh.get(jwt_settings.JTI_CLAIM))
+        if access_token is not None:
+            TokenRevocationStore.revoke(access_token.get(jwt_settings.JTI_CLAIM))
+
+        resp.message = f"User '{user.username}' logged out."
+        resp.data = {'loggedOut': True}
+        resp.status_code = status.HTTP_200_OK
+        logger.info(resp.to_text())
+        return resp
+
+    @staticmethod
+    def _revocation_unavailable(resp: Resp, consequence: str) -> Resp:
+        ## Reporting success here would leave the old tokens usable until they expire.
+        resp.error = "Service Unavailable"
+        resp.message = f"No token revocation store is configured; {consequence}."
+        resp.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        logger.error(resp.to_text())
+        return resp
+
+
 class Oauth2Helpers:
     pass
\ No newline at end of file
@@ -0,0 +1,9 @@
+from django_rq import job
+
+from auth_app.helpers import UserModelHelpers
+
+
+@job(UserModelHelpers.BULK_QUEUE)
+def bulk_register_users(rows: list, is_staff: bool = False) -> dict:
+    resp = UserModelHelpers.bulk_register(rows=rows, is_staff=is_staff)
+    return {"error": resp.error, "message": resp.message, "data": resp.data}
@@ -0,0 +1,92 @@
+import random
+import statistics
+import time
+from uuid import uuid4
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from auth_app.helpers import UserModelHelpers
+from auth_app.models import User
+from auth_app.utils import PasswordUtils
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure password logins per second on one core with the user table at several sizes, "
+        "and the queries each login makes. Users are created inside a transaction that is rolled back."
+    )
+    USERNAME_PREFIX = "benchmark-login-"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="100000,1000000", help="Comma-separated user table sizes.")
+        parser.add_argument("--logins", type=int, default=200, help="Timed logins per size and outcome.")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Users inserted per statement.")
+
+    def handle(self, *args, **options):
+        password = PasswordUtils.generate_strong_password()
+        ## Every benchmark user shares one hash; hashing a million passwords would dwarf the benchmark.
+        encoded = make_password(password)
+
+        for size in (int(size) for size in options["sizes"].split(",")):
+            try:
+                with transaction.atomic():
+                    existing = User.objects.count()
+                    self.seed(max(size - existing, 1), encoded, options["batch_size"])
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"ANALYZE {connection.ops.quote_name(User._meta.db_table)}")
+
+                    self.stdout.write(f"{User.objects.count()} user(s):")
+                    self.measure("success", password, options["logins"])
+                    self.measure("failure", password + "x", options["logins"])
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def seed(self, count: int, encoded: str, batch_size: int) -> None:
+        run = uuid4().hex[:8]
+        for start in range(0, count, batch_size):
+            User.objects.bulk_create(
+                [
+                    User(
+                        username=f"{self.USERNAME_PREFIX}{run}-{index}",
+                        email=f"{self.USERNAME_PREFIX}{run}-{index}@example.invalid",
+                        slug=f"{self.USERNAME_PREFIX}{run}-{index}",
+                        password=encoded,
+                    )
+                    for index in range(start, min(start + batch_size, count))
+                ],
+                batch_size=batch_size,
+            )
+        self.usernames = [f"{self.USERNAME_PREFIX}{run}-{index}" for index in range(count)]
+
+    def measure(self, outcome: str, password: str, logins: int) -> None:
+        usernames = random.sample(self.usernames, min(logins, len(self.usernames)))
+        latencies, queries = [], []
+        for username in usernames:
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                resp = UserModelHelpers.login_via_password(username=username, password=password)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured.captured_queries))
+            if (resp.status_code == 200) != (outcome == "success"):
+                self.stdout.write(self.style.ERROR(f"  unexpected {resp.status_code} for '{username}': {resp.message}"))
+                return
+
+        ## Every login does one password hash; report it apart so the query cost is visible.
+        hash_started = time.perf_counter()
+        User(password=make_password(password)).check_password(password)
+        hash_ms = (time.perf_counter() - hash_started) * 1000 / 2
+
+        total_ms = sum(latencies)
+        self.stdout.write(
+            f"  {outcome:7s}: {len(latencies) / (total_ms / 1000):8.1f} logins/s/core | "
+            f"median {statistics.median(latencies):7.2f} ms (~{hash_ms:.2f} ms hashing) | "
+            f"queries/login max {max(queries)}, mean {statistics.mean(queries):.2f}"
+        )
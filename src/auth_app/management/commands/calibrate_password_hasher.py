@@ -0,0 +1,82 @@
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings as django_settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand
+
+from auth_app.hashers import CalibratedPBKDF2PasswordHasher
+
+
+def time_hashes(iterations: int, samples: int) -> list[float]:
+    """
+    Milliseconds per PBKDF2-SHA256 hash at `iterations`; also run in worker processes.
+    """
+    hasher = PBKDF2PasswordHasher()
+    salt = hasher.salt()
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hasher.encode("calibration-Passw0rd!", salt, iterations=iterations)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure PBKDF2-SHA256 on this machine and print the PASSWORD_HASH_ITERATIONS that keeps one login's "
+        "hash within PASSWORD_HASH_BUDGET_MS, with every core busy hashing as under a login burst."
+    )
+    PROBE_ITERATIONS: int = 100000
+    ROUND_TO: int = 10000
+
+    def add_arguments(self, parser):
+        parser.add_argument("--budget-ms", type=float, default=None, help="Defaults to PASSWORD_HASH_BUDGET_MS.")
+        parser.add_argument("--processes", type=int, default=None, help="Concurrent hashers; defaults to the CPU count.")
+        parser.add_argument("--samples", type=int, default=5, help="Hashes timed per process and probe.")
+
+    def handle(self, *args, **options):
+        budget_ms = options["budget_ms"] or django_settings.PASSWORD_HASH_BUDGET_MS
+        workers = options["processes"] or os.cpu_count() or 1
+        samples = options["samples"]
+
+        single_ms = statistics.median(time_hashes(self.PROBE_ITERATIONS, samples))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            loaded = [
+                timing
+                for timings in pool.map(time_hashes, [self.PROBE_ITERATIONS] * workers, [samples] * workers)
+                for timing in timings
+            ]
+        loaded_ms = statistics.median(loaded)
+
+        ms_per_iteration = loaded_ms / self.PROBE_ITERATIONS
+        iterations = int(budget_ms / ms_per_iteration) // self.ROUND_TO * self.ROUND_TO
+        ## The hasher never uses fewer than its floor, whatever is configured.
+        chosen = max(iterations, CalibratedPBKDF2PasswordHasher.MIN_ITERATIONS)
+
+        current = CalibratedPBKDF2PasswordHasher().iterations
+        self.stdout.write(
+            f"{self.PROBE_ITERATIONS} iterations: {single_ms:.1f} ms alone, {loaded_ms:.1f} ms with {workers} "
+            f"concurrent hasher(s)."
+        )
+        self.stdout.write(
+            f"Budget {budget_ms:.0f} ms -> {iterations} iterations "
+            f"(currently {current}: ~{current * ms_per_iteration:.0f} ms per login under load)."
+        )
+        if chosen != iterations:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"That is below the {CalibratedPBKDF2PasswordHasher.MIN_ITERATIONS} floor; using the floor "
+                    f"(~{chosen * ms_per_iteration:.0f} ms). Raise the budget or add CPU."
+                )
+            )
+        if chosen < PBKDF2PasswordHasher.iterations:
+            self.stdout.write(
+                self.style.WARNING(f"Django's default is {PBKDF2PasswordHasher.iterations} iterations.")
+            )
+        self.stdout.write(self.style.SUCCESS(f"PASSWORD_HASH_ITERATIONS = {chosen}"))
+        self.stdout.write(
+            "Existing hashes are re-made with the new count at each user's next successful login."
+        )
@@ -5,9 +5,10 @@ from core.boilerplate.base_model import BaseModel
 from core.boilerplate.custom_fields import EncryptedJSONField
 from django.conf import settings as django_settings
 from django.contrib.auth.hashers import make_password
+from django.utils import timezone
 from auth_app.model_choices import Oauth2Choices
 
-from datetime import datetime, timedelta
+from datetime import timedelta
 from uuid import uuid4
 
 from django.contrib.auth.models import AbstractUser
@@ -40,7 +41,7 @@ class User(AbstractUser):
         super(User, self).save(*args, **kwargs)
 
     def block(self, minutes=django_settings.OTP_ATTEMPT_TIMEOUT):
-        self.blocked_until = datetime.now() + timedelta(minutes=minutes)
+        self.blocked_until = timezone.now() + timedelta(minutes=minutes)
         self.unsuccessful_login_attempts = 0
         self.save()
 
@@ -65,7 +66,7 @@ class User(AbstractUser):
 
     class Meta:
         indexes = (
-            models.Index(fields=("username", "email"))
+            models.Index(fields=("username", "email")),
         )
 
 
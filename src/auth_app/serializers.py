@@ -1,6 +1,6 @@
 from django.contrib.auth.hashers import make_password
 
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import BooleanField, ModelSerializer, Serializer
 from auth_app.models import User, UserProfile
 
 
@@ -22,6 +22,13 @@ class UserRegisterSerializer(ModelSerializer):
         return super(UserRegisterSerializer, self).create(validated_data)
 
 
+class BulkUserRegisterOptionsSerializer(Serializer):
+    """
+    Options of a bulk registration; the rows themselves are checked by `UserModelHelpers.bulk_register`.
+    """
+    isStaff = BooleanField(source='is_staff', required=False, default=False)
+
+
 class UserSerializer(ModelSerializer):
     """
     General-purpose serializer to be used when returning user data.
@@ -1,5 +1,5 @@
 from django.db.models.signals import pre_delete, post_save
-from requests import post
+from auth_app.authentication import PrincipalCache
 from auth_app.models import User, UserProfile
 from auth_app import logger
 
@@ -16,16 +16,18 @@ class UserModelSignals:
     @classmethod
     def update(cls, sender, instance: User, created: bool, **kwargs):
         if not created:
+            PrincipalCache.invalidate(instance.pk)
             logger.info(f"User <{instance.email}> updated successfully.")
 
     @classmethod
     def deleted(cls, sender, instance: User, **kwargs):
+        PrincipalCache.invalidate(instance.pk)
         logger.info(f"User <{instance.email}> deleted successfully.")
 
 
-post_save.connect(reciever=UserModelSignals.create, sender=UserModelSignals.MODEL)
-post_save.connect(reciever=UserModelSignals.update, sender=UserModelSignals.MODEL)
-pre_delete.connect(reciever=UserModelSignals.deleted, sender=UserModelSignals.MODEL)
+post_save.connect(receiver=UserModelSignals.create, sender=UserModelSignals.MODEL)
+post_save.connect(receiver=UserModelSignals.update, sender=UserModelSignals.MODEL)
+pre_delete.connect(receiver=UserModelSignals.deleted, sender=UserModelSignals.MODEL)
 
 
 class UserProfileModelSignals:
@@ -53,11 +55,11 @@ class UserProfileModelSignals:
 
 
 post_save.connect(
-    reciever=UserProfileModelSignals.create, sender=UserProfileModelSignals.MODEL
+    receiver=UserProfileModelSignals.create, sender=UserProfileModelSignals.MODEL
 )
 post_save.connect(
-    reciever=UserProfileModelSignals.update, sender=UserProfileModelSignals.MODEL
+    receiver=UserProfileModelSignals.update, sender=UserProfileModelSignals.MODEL
 )
 pre_delete.connect(
-    reciever=UserProfileModelSignals.deleted, sender=UserProfileModelSignals.MODEL
+    receiver=UserProfileModelSignals.deleted, sender=UserProfileModelSignals.MODEL
 )
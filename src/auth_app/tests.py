@@ -1,3 +1,97 @@
-from django.test import TestCase
+from uuid import uuid4
 
-# Create your tests here.
+import pytest
+from django.contrib.auth.hashers import make_password
+
+from auth_app.helpers import TokenHelpers, UserModelHelpers
+from auth_app.models import User
+from auth_app.utils import JWTUtils, LoginThrottle
+
+PASSWORD = "C0rrect-Horse!"
+
+
+@pytest.fixture
+def user(db) -> User:
+    name = f"user-{uuid4().hex[:12]}"
+    return User.objects.create(username=name, email=f"{name}@example.com", password=make_password(PASSWORD))
+
+
+@pytest.fixture
+def ip() -> str:
+    return f"198.51.100.{uuid4().int % 250 + 1}"
+
+
+@pytest.fixture
+def login_throttle(redis_conn, settings, user, ip):
+    settings.OTP_ATTEMPT_LIMIT = 2
+    settings.OTP_ATTEMPT_TIMEOUT = 15
+    settings.LOGIN_THROTTLE_IP_LIMIT = 3
+    yield LoginThrottle
+    for subject in (f"user:{user.pk}", f"ip:{ip}"):
+        redis_conn.delete(LoginThrottle.FAILURES_PREFIX + subject, LoginThrottle.BLOCKED_PREFIX + subject)
+
+
+def login(user: User, password: str, ip: str):
+    return UserModelHelpers.login_via_password(username=user.username, password=password, ip=ip)
+
+
+@pytest.mark.django_db
+class TestLoginThrottle:
+
+    def test_user_is_blocked_after_too_many_failures(self, login_throttle, user, ip):
+        assert [login(user, "wrong", ip).data["attemptsLeft"] for _ in range(2)] == [1, 0]
+
+        blocked = login(user, "wrong", ip)
+        assert blocked.status_code == 403
+        user.refresh_from_db()
+        assert user.blocked_until is not None
+
+        ## The right password does not get past a block.
+        assert login(user, PASSWORD, ip).status_code == 403
+
+    def test_success_clears_the_failures(self, login_throttle, user, ip):
+        login(user, "wrong", ip)
+        login(user, "wrong", ip)
+        assert login(user, PASSWORD, ip).status_code == 200
+
+        assert login(user, "wrong", ip).data["attemptsLeft"] == 1
+
+    def test_ip_is_blocked_after_guessing_usernames(self, login_throttle, user, ip):
+        for _ in range(4):
+            UserModelHelpers.login_via_password(username=f"nobody-{uuid4().hex[:8]}", password="wrong", ip=ip)
+
+        assert login(user, PASSWORD, ip).status_code == 403
+        assert login(user, PASSWORD, "192.0.2.1").status_code == 200
+
+    def test_failures_are_counted_on_the_user_without_redis(self, no_redis, settings, user, ip):
+        settings.OTP_ATTEMPT_LIMIT = 2
+        settings.OTP_ATTEMPT_TIMEOUT = 15
+
+        assert [login(user, "wrong", ip).data["attemptsLeft"] for _ in range(2)] == [1, 0]
+        assert login(user, "wrong", ip).status_code == 403
+        assert login(user, PASSWORD, ip).status_code == 403
+
+
+@pytest.mark.django_db
+class TestRefreshRotation:
+
+    def test_refresh_token_works_exactly_once(self, redis_conn, user):
+        refresh_token = JWTUtils.get_tokens_for_user(user)["refreshToken"]
+
+        rotated = TokenHelpers.refresh(refresh_token=refresh_token)
+        assert rotated.status_code == 200
+        assert rotated.data["refreshToken"] != refresh_token
+
+        assert TokenHelpers.refresh(refresh_token=refresh_token).status_code == 401
+        assert TokenHelpers.refresh(refresh_token=rotated.data["refreshToken"]).status_code == 200
+
+    def test_rotation_is_refused_without_a_revocation_store(self, no_redis, user):
+        refresh_token = JWTUtils.get_tokens_for_user(user)["refreshToken"]
+
+        assert TokenHelpers.refresh(refresh_token=refresh_token).status_code == 503
+
+    def test_logout_revokes_the_refresh_token(self, redis_conn, user):
+        refresh_token = JWTUtils.get_tokens_for_user(user)["refreshToken"]
+
+        assert TokenHelpers.logout(user=user, refresh_token=refresh_token).status_code == 200
+        assert TokenHelpers.refresh(refresh_token=refresh_token).status_code == 401
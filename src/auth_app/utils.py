@@ -1,20 +1,157 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, deque
 from secrets import choice
+from uuid import uuid4
 from django.conf import settings as django_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 from auth_app.models import User
 from random import shuffle
-from typing import Optional, Union
+from typing import TYPE_CHECKING, Optional, Union
 
 import jwt as py_jwt
-from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey, RSAPublicKey
 from jwt import ExpiredSignatureError, InvalidTokenError
-from jwt.algorithms import RSAAlgorithm
 from auth_app.constants import FormatRegex
+from utils.bloom import BloomFilter
+
+if TYPE_CHECKING:
+    from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey, RSAPublicKey
 
 
 from auth_app import logger
 
 
+class JWKSKeyStore:
+    """
+    Parsed public keys for RS256 verification, so `RSAAlgorithm.from_jwk()` runs once per key.
+
+    JWKs are indexed by `kid` (or a digest of the JWK when it has none) and PEM keys by their
+    text. An entry is parsed again when it is older than `JWKS_KEY_TTL_SECONDS` or when the
+    JWK passed for its `kid` has changed, so rotated keys are picked up; at most `MAX_KEYS`
+    are kept. A whole JWKS (`{"keys": [...]}`) can be passed too; the token header's `kid`
+    picks the key.
+    """
+    MAX_KEYS: int = 64
+    _keys: OrderedDict = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, jwk: dict, token: str) -> tuple[Optional["RSAPublicKey"], str]:
+        """
+        `(key, fingerprint)` for the JWK (or the JWKS entry) that signed `token`.
+        """
+        if "keys" in jwk:
+            kid = py_jwt.get_unverified_header(token).get("kid")
+            keys = jwk["keys"]
+            jwk = next((key for key in keys if key.get("kid") == kid), keys[0] if len(keys) == 1 else None)
+            if jwk is None:
+                logger.warning(f"No key with kid '{kid}' in the JWKS.")
+                return None, ""
+
+        index = jwk.get("kid") or cls._fingerprint(jwk)
+        entry = cls._cached(index, jwk)
+        if entry:
+            return entry[1], entry[2]
+
+        ## `cryptography` is slow to import and only RS256 needs it.
+        from jwt.algorithms import RSAAlgorithm
+
+        return cls._store(index, jwk, RSAAlgorithm.from_jwk(jwk=jwk), cls._fingerprint(jwk))
+
+    @classmethod
+    def get_pem(cls, pem: str) -> tuple["RSAPublicKey", str]:
+        entry = cls._cached(pem, pem)
+        if entry:
+            return entry[1], entry[2]
+
+        from jwt.algorithms import RSAAlgorithm
+
+        key = RSAAlgorithm(RSAAlgorithm.SHA256).prepare_key(pem.encode("utf-8"))
+        return cls._store(pem, pem, key, hashlib.sha256(pem.encode("utf-8")).hexdigest())
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._keys.clear()
+
+    @classmethod
+    def _fingerprint(cls, jwk: dict) -> str:
+        return hashlib.sha256(json.dumps(jwk, sort_keys=True).encode()).hexdigest()
+
+    @classmethod
+    def _cached(cls, index: str, source) -> Optional[tuple]:
+        with cls._lock:
+            entry = cls._keys.get(index)
+            if entry is None or entry[0] != source or entry[3] < time.monotonic():
+                return None
+            cls._keys.move_to_end(index)
+            return entry
+
+    @classmethod
+    def _store(cls, index: str, source, key, fingerprint: str) -> tuple:
+        with cls._lock:
+            cls._keys[index] = (source, key, fingerprint, time.monotonic() + django_settings.JWKS_KEY_TTL_SECONDS)
+            cls._keys.move_to_end(index)
+            while len(cls._keys) > cls.MAX_KEYS:
+                cls._keys.popitem(last=False)
+        return key, fingerprint
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of tokens whose signature and claims were already verified, up to their expiry.
+
+    Entries are keyed by a SHA-256 of the token together with the algorithm, the key and
+    the expected issuer/audience, so a token is only served from here for the same checks it
+    passed. Tokens without an `exp` are never cached. Holds `JWT_VERIFIED_TOKEN_CACHE_SIZE`
+    tokens per process; a hit returns a copy of the claims.
+    """
+    _tokens: OrderedDict = OrderedDict()
+    _lock = threading.Lock()
+    hits: int = 0
+    misses: int = 0
+
+    @classmethod
+    def digest(cls, token: str, *context) -> str:
+        return hashlib.sha256("|".join(str(part) for part in (*context, token)).encode()).hexdigest()
+
+    @classmethod
+    def get(cls, digest: str) -> Optional[dict]:
+        with cls._lock:
+            entry = cls._tokens.get(digest)
+            if entry is None:
+                cls.misses += 1
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del cls._tokens[digest]
+                cls.misses += 1
+                return None
+            cls._tokens.move_to_end(digest)
+            cls.hits += 1
+            return dict(claims)
+
+    @classmethod
+    def set(cls, digest: str, claims: dict, leeway: int = 0) -> None:
+        expires = claims.get("exp")
+        if not isinstance(expires, (int, float)):
+            return
+        with cls._lock:
+            cls._tokens[digest] = (dict(claims), expires + leeway)
+            cls._tokens.move_to_end(digest)
+            while len(cls._tokens) > django_settings.JWT_VERIFIED_TOKEN_CACHE_SIZE:
+                cls._tokens.popitem(last=False)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._tokens.clear()
+            cls.hits = cls.misses = 0
+
+
+
 class JWTUtils:
     """
     Utilities for basic operation on JWT.
@@ -31,7 +168,8 @@ class JWTUtils:
             logger.warning(f'Invalid argument(s) `user` passed.')
             return None
 
-        if not user in User.objects.all():
+        if user._state.adding:
+            ## Unsaved instance; callers pass users they just loaded, so there is nothing to query.
             logger.warning(f'Invalid argument(s) `user` does not exist.')
             return None
         refresh = RefreshToken.for_user(user)
@@ -81,11 +219,15 @@ class JWTUtils:
                 if not public_signing_key:
                     # prithoo: In case of `HS256`, the `signing_key` is the secret key.
                     public_signing_key = django_settings.SECRET_KEY
+                digest = VerifiedTokenCache.digest(token, algorithm, public_signing_key)
+                if (cached := VerifiedTokenCache.get(digest)) is not None:
+                    return cached
                 valid_data = py_jwt.decode(jwt=token, key=public_signing_key, algorithms=[
                                            cls.HS256_ALGORITHM_NAME])
+                VerifiedTokenCache.set(digest, valid_data)
 
             elif algorithm == cls.RS256_ALGORITHM_NAME:
-                rsa_key: Union[RSAPublicKey, bytes] = None
+                rsa_key: Union["RSAPublicKey", bytes] = None
                 decode_options = {
                     "verify_aud": False,
                     "verify_iss": bool(issuer),
@@ -107,10 +249,10 @@ class JWTUtils:
 
                 if isinstance(public_signing_key, dict):
                     # prithoo: This means the pubKey is in JWK format.
-                    rsa_key = RSAAlgorithm.from_jwk(jwk=public_signing_key)
+                    rsa_key, key_fingerprint = JWKSKeyStore.get(public_signing_key, token)
                 elif isinstance(public_signing_key, str):
                     # prithoo: This means the pubKey is in PKCS | X.509 | SPKI formats.
-                    rsa_key = public_signing_key.encode('utf-8')
+                    rsa_key, key_fingerprint = JWKSKeyStore.get_pem(public_signing_key)
                 else:
                     logger.warning(
                         f'Invalid argument(s) `signing_key` passed for `RS256` algorithm. The value must be either a string or a dictionary.')
@@ -120,6 +262,9 @@ class JWTUtils:
                     logger.warning(f'Error while converting JWK to RSA key.')
                     return None
 
+                digest = VerifiedTokenCache.digest(token, algorithm, key_fingerprint, issuer, audience)
+                if (cached := VerifiedTokenCache.get(digest)) is not None:
+                    return cached
                 valid_data = py_jwt.decode(
                     jwt=token,
                     key=rsa_key,
@@ -129,6 +274,7 @@ class JWTUtils:
                     options=decode_options,
                     leeway=leeway_seconds
                 )
+                VerifiedTokenCache.set(digest, valid_data, leeway=leeway_seconds)
 
             else:
                 logger.warning(f'Unsupported algorithm `{algorithm}` passed.')
@@ -247,3 +393,250 @@ class PasswordUtils:
                 iteration=iteration + 1
             )
         return password
+
+
+class LoginThrottle:
+    """
+    Sliding-window counters of failed logins in Redis, per user and per client IP.
+
+    Each failure is a member of a sorted set scored by its time; one pipeline adds it, trims
+    the members older than `LOGIN_THROTTLE_WINDOW_SECONDS` and counts the rest. When a
+    count passes its limit (`OTP_ATTEMPT_LIMIT` per user, `LOGIN_THROTTLE_IP_LIMIT` per IP)
+    a block key with a TTL of `OTP_ATTEMPT_TIMEOUT` minutes is set; `blocked()` is checked
+    before the password is hashed, so throttled requests cost two Redis reads.
+
+    The `User` row is only written on block transitions: `blocked_until` when a block starts
+    (for the admin and for the database fallback) and again when a login after it succeeds.
+    Without Redis, `available()` is false and callers count failures in the database.
+    """
+    FAILURES_PREFIX: str = "auth:login-failures:"
+    BLOCKED_PREFIX: str = "auth:login-blocked:"
+
+    @classmethod
+    def _redis(cls):
+        return getattr(django_settings, "REDIS_CONN", None)
+
+    @classmethod
+    def available(cls) -> bool:
+        return cls._redis() is not None
+
+    @classmethod
+    def _subjects(cls, user_id=None, ip: str = None) -> list[tuple[str, int]]:
+        subjects = []
+        if user_id:
+            subjects.append((f"user:{user_id}", django_settings.OTP_ATTEMPT_LIMIT))
+        if ip:
+            subjects.append((f"ip:{ip}", django_settings.LOGIN_THROTTLE_IP_LIMIT))
+        return subjects
+
+    @classmethod
+    def blocked(cls, user_id=None, ip: str = None) -> Optional[int]:
+        """
+        Seconds left on the longest block of the user or IP, `None` when neither is blocked.
+        """
+        subjects = cls._subjects(user_id, ip)
+        if not subjects:
+            return None
+        pipeline = cls._redis().pipeline(transaction=False)
+        for subject, _ in subjects:
+            pipeline.ttl(cls.BLOCKED_PREFIX + subject)
+        remaining = [seconds for seconds in pipeline.execute() if seconds and seconds > 0]
+        return max(remaining) if remaining else None
+
+    @classmethod
+    def fail(cls, user_id=None, ip: str = None) -> tuple[int, bool]:
+        """
+        Record a failed attempt; returns `(attempts left for the user, whether a block started)`.
+        """
+        now = time.time()
+        window = django_settings.LOGIN_THROTTLE_WINDOW_SECONDS
+        subjects = cls._subjects(user_id, ip)
+        member = f"{now}:{uuid4().hex[:8]}"
+
+        pipeline = cls._redis().pipeline(transaction=True)
+        for subject, _ in subjects:
+            key = cls.FAILURES_PREFIX + subject
+            pipeline.zadd(key, {member: now})
+            pipeline.zremrangebyscore(key, 0, now - window)
+            pipeline.zcard(key)
+            pipeline.expire(key, window)
+        results = pipeline.execute()
+        counts = results[2::4]
+
+        block_seconds = django_settings.OTP_ATTEMPT_TIMEOUT * 60
+        user_blocked, attempts_left = False, None
+        for (subject, limit), count in zip(subjects, counts):
+            if subject.startswith("user:"):
+                attempts_left = max(limit - count, 0)
+            if count <= limit or block_seconds <= 0:
+                continue
+            ## SET NX: only the request that starts the block reports the transition.
+            started = cls._redis().set(cls.BLOCKED_PREFIX + subject, 1, nx=True, ex=block_seconds)
+            cls._redis().delete(cls.FAILURES_PREFIX + subject)
+            if started and subject.startswith("user:"):
+                user_blocked = True
+        return attempts_left, user_blocked
+
+    @classmethod
+    def succeed(cls, user_id) -> None:
+        cls._redis().delete(cls.FAILURES_PREFIX + f"user:{user_id}")
+
+
+class TokenRevocationStore:
+    """
+    Revoked token ids (`jti`) in a Redis sorted set, fronted by a per-worker Bloom filter.
+
+    Redis holds every revoked jti scored by when it was revoked; members older than the
+    refresh token lifetime are pruned, since those tokens have expired anyway. Each worker
+    mirrors the set in a `BloomFilter`, pulling only the members added since its last pull
+    every `TOKEN_REVOCATION_SYNC_SECONDS` (and rebuilding it when it fills up), so checking a
+    token that was not revoked - nearly all of them - needs no network round trip. A filter
+    hit is confirmed with `ZSCORE`.
+
+    `revoke()` is a `ZADD NX`, so when two requests rotate the same refresh token only one of
+    them wins. A revocation made by another worker reaches this worker's filter within one
+    sync interval; the rotation itself never relies on the filter.
+    """
+    KEY: str = "auth:revoked-jtis"
+    ERROR_RATE: float = 0.001
+    ## Revocations stamped by other hosts' clocks can land slightly behind our watermark.
+    CLOCK_SKEW_SECONDS: float = 5.0
+
+    _filter: Optional[BloomFilter] = None
+    _watermark: float = 0.0
+    _synced_at: float = 0.0
+    _lock = threading.Lock()
+
+    @classmethod
+    def _redis(cls):
+        return getattr(django_settings, "REDIS_CONN", None)
+
+    @classmethod
+    def available(cls) -> bool:
+        return cls._redis() is not None
+
+    @classmethod
+    def _retention_seconds(cls) -> float:
+        return django_settings.SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"].total_seconds()
+
+    @classmethod
+    def revoke(cls, jti: str) -> bool:
+        """
+        Revoke a token id; returns `False` when it already was revoked.
+
+        Raises `RuntimeError` without Redis (check `available()` first): a revocation that is not
+        stored anywhere must not be reported as done.
+        """
+        redis_conn = cls._redis()
+        if redis_conn is None:
+            raise RuntimeError("No token revocation store is configured (USE_REDIS is off).")
+        now = time.time()
+        pipeline = redis_conn.pipeline(transaction=True)
+        pipeline.zadd(cls.KEY, {jti: now}, nx=True)
+        pipeline.zremrangebyscore(cls.KEY, 0, now - cls._retention_seconds())
+        added, _ = pipeline.execute()
+        if added:
+            with cls._lock:
+                if cls._filter is not None:
+                    cls._filter.add(jti)
+        return bool(added)
+
+    @classmethod
+    def is_revoked(cls, jti: str) -> bool:
+        redis_conn = cls._redis()
+        if redis_conn is None or not jti:
+            return False
+        try:
+            bloom = cls._sync(redis_conn)
+            if jti not in bloom:
+                return False
+            return redis_conn.zscore(cls.KEY, jti) is not None
+        except Exception as ex:
+            ## Fail open like the rest of the Redis caches; the rotation's ZADD NX still catches reuse.
+            logger.warning(f"Token revocation store unavailable: {ex}")
+            return False
+
+    @classmethod
+    def _sync(cls, redis_conn) -> BloomFilter:
+        now = time.monotonic()
+        if cls._filter is not None and now - cls._synced_at < django_settings.TOKEN_REVOCATION_SYNC_SECONDS:
+            return cls._filter
+
+        with cls._lock:
+            if cls._filter is not None and now - cls._synced_at < django_settings.TOKEN_REVOCATION_SYNC_SECONDS:
+                return cls._filter
+            rebuild = cls._filter is None or cls._filter.full
+            since = 0 if rebuild else max(cls._watermark - cls.CLOCK_SKEW_SECONDS, 0)
+            members = redis_conn.zrangebyscore(cls.KEY, since, "+inf", withscores=True)
+
+            bloom = BloomFilter(
+                max(django_settings.TOKEN_REVOCATION_BLOOM_CAPACITY, len(members) * 2), cls.ERROR_RATE
+            ) if rebuild else cls._filter
+            for member, score in members:
+                member = member.decode() if isinstance(member, bytes) else member
+                ## The skew window is pulled again every time; do not count those members twice.
+                if member not in bloom:
+                    bloom.add(member)
+                cls._watermark = max(cls._watermark, score)
+            cls._filter, cls._synced_at = bloom, now
+            return bloom
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._filter, cls._watermark, cls._synced_at = None, 0.0, 0.0
+
+
+def make_passwords(passwords: list[str]) -> list[str]:
+    """
+    `make_password()` for a chunk of passwords; runs in `UserModelHelpers.bulk_register`'s process pool.
+    """
+    from django.contrib.auth.hashers import make_password
+
+    return [make_password(password) for password in passwords]
+
+
+class LoginMetrics:
+    """
+    Timings of this worker's recent password logins, for `Server-Timing` and the admin metrics API.
+
+    Each login that reached the hasher records how long verifying the password took, how long
+    rehashing took (only when the stored hash's parameters changed) and the whole login; the
+    last `MAX_SAMPLES` are kept per outcome.
+    """
+    MAX_SAMPLES: int = 1000
+    _samples: dict = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def record(cls, outcome: str, hash_ms: float, rehash_ms: float, total_ms: float) -> None:
+        with cls._lock:
+            samples = cls._samples.setdefault(outcome, deque(maxlen=cls.MAX_SAMPLES))
+            samples.append((hash_ms, rehash_ms, total_ms))
+
+    @classmethod
+    def server_timing(cls, timings: dict) -> str:
+        return ", ".join(f"{name};dur={duration:.1f}" for name, duration in timings.items())
+
+    @classmethod
+    def summary(cls) -> dict:
+        def percentiles(values: list) -> dict:
+            values = sorted(values)
+            return {
+                "p50": round(values[len(values) // 2], 2),
+                "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 2),
+                "max": round(values[-1], 2),
+            }
+
+        with cls._lock:
+            snapshot = {outcome: list(samples) for outcome, samples in cls._samples.items()}
+        return {
+            outcome: {
+                "count": len(samples),
+                "hashMs": percentiles([sample[0] for sample in samples]),
+                "rehashes": sum(1 for sample in samples if sample[1]),
+                "totalMs": percentiles([sample[2] for sample in samples]),
+            }
+            for outcome, samples in snapshot.items()
+            if samples
+        }
@@ -0,0 +1,4 @@
+import logging
+
+logger = logging.getLogger('logger.' + __name__)
+default_app_config = 'billing_app.apps.BillingAppConfig'
\ No newline at end of file
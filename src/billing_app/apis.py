@@ -0,0 +1,101 @@
+from django.core.files.storage import default_storage
+from django.http import FileResponse
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated
+
+from billing_app.helpers import (
+    BillHelpers,
+    BillRenderHelpers,
+    ReceivablesReportHelpers,
+    SalesReportHelpers,
+)
+from billing_app import logger
+
+
+class BillAPI(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request: Request) -> Response:
+        resp = BillHelpers.get(_id=request.query_params.get("id"))
+        return resp.to_response()
+
+    def post(self, request: Request) -> Response:
+        resp = BillHelpers.create(data=request.data)
+        return resp.to_response()
+
+
+class BillReservationAPI(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request: Request) -> Response:
+        resp = BillHelpers.reserve(_id=request.data.get("id"))
+        return resp.to_response()
+
+
+class BillFinalizeAPI(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request: Request) -> Response:
+        resp = BillHelpers.finalize(_id=request.data.get("id"))
+        return resp.to_response()
+
+
+class SalesReportAPI(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request: Request) -> Response:
+        resp = SalesReportHelpers.report(
+            by=request.query_params.get("by", "item"),
+            start=request.query_params.get("start"),
+            end=request.query_params.get("end"),
+            daily=request.query_params.get("daily", "").lower() in ("1", "true", "yes"),
+        )
+        return resp.to_response()
+
+
+class ReceivablesAgingAPI(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request: Request) -> Response:
+        resp = ReceivablesReportHelpers.aging()
+        return resp.to_response()
+
+
+class BillRenderAPI(APIView):
+    """
+    `POST` queues the rendering of a bill (`id`, `format`); `GET` polls it.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request: Request) -> Response:
+        resp = BillRenderHelpers.status(
+            _id=request.query_params.get("id"), fmt=request.query_params.get("format", "html")
+        )
+        return resp.to_response()
+
+    def post(self, request: Request) -> Response:
+        resp = BillRenderHelpers.status(
+            _id=request.data.get("id"), fmt=request.data.get("format", "html"), enqueue=True
+        )
+        return resp.to_response()
+
+
+class BillRenderDownloadAPI(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request: Request) -> Response:
+        fmt = request.query_params.get("format", "html")
+        resp = BillRenderHelpers.status(_id=request.query_params.get("id"), fmt=fmt)
+        if resp.error or resp.data.get("status") != "ready":
+            return resp.to_response()
+
+        response = FileResponse(
+            default_storage.open(resp.data["key"]),
+            content_type=BillRenderHelpers.CONTENT_TYPES[fmt],
+            filename=f"bill-{resp.data['id']}.{fmt}",
+        )
+        ## The content behind a key never changes.
+        response["Cache-Control"] = "private, max-age=31536000, immutable"
+        return response
@@ -0,0 +1,15 @@
+class TaxModes:
+    """
+    How the taxes on a bill line combine; see `billing_app.utils.TaxEngine`.
+    """
+    COMPOUND = "compound"
+    SIMPLE = "simple"
+
+
+## Accounts-receivable aging buckets: (label, minimum age in days, maximum age in days or None).
+AR_AGING_BUCKETS: tuple = (
+    ("0-30", 0, 30),
+    ("31-60", 31, 60),
+    ("61-90", 61, 90),
+    ("90+", 91, None),
+)
@@ -0,0 +1,32 @@
+from django.conf import settings as django_settings
+from django_cron import CronJobBase, Schedule
+
+from billing_app.utils import SalesRollupEngine, StockReservationEngine
+
+
+class ReleaseExpiredReservationsCronJob(CronJobBase):
+    """
+    Puts the stock of expired reservations back; see `StockReservationEngine.release_expired()`.
+    """
+    RUN_EVERY_MINS = django_settings.STOCK_RESERVATION_SWEEP_MINUTES
+
+    schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+    code = "billing_app.release_expired_reservations"
+
+    def do(self) -> str:
+        released = StockReservationEngine.release_expired()
+        return f"Released {released} expired reservation(s)."
+
+
+class RollUpSalesCronJob(CronJobBase):
+    """
+    Adds finalized bills to the daily sales rollups; see `SalesRollupEngine.run()`.
+    """
+    RUN_EVERY_MINS = django_settings.SALES_ROLLUP_EVERY_MINUTES
+
+    schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+    code = "billing_app.roll_up_sales"
+
+    def do(self) -> str:
+        rolled_up = SalesRollupEngine.run()
+        return f"Rolled up sales of {rolled_up} bill(s)."
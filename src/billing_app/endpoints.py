@@ -0,0 +1,23 @@
+from django.urls import path
+from billing_app.apis import (
+    BillAPI,
+    BillFinalizeAPI,
+    BillRenderAPI,
+    BillRenderDownloadAPI,
+    BillReservationAPI,
+    ReceivablesAgingAPI,
+    SalesReportAPI,
+)
+
+
+PREFIX = "api/billing/"
+
+urlpatterns = [
+    path("bills/", BillAPI.as_view(), name="bill-get-create"),
+    path("bills/reserve/", BillReservationAPI.as_view(), name="bill-reserve-stock"),
+    path("bills/finalize/", BillFinalizeAPI.as_view(), name="bill-finalize"),
+    path("bills/render/", BillRenderAPI.as_view(), name="bill-render"),
+    path("bills/render/download/", BillRenderDownloadAPI.as_view(), name="bill-render-download"),
+    path("reports/sales/", SalesReportAPI.as_view(), name="sales-report"),
+    path("reports/ar-aging/", ReceivablesAgingAPI.as_view(), name="receivables-aging-report"),
+]
@@ -0,0 +1,539 @@
+import hashlib
+import json
+from datetime import date, timedelta
+
+import django_rq
+from rest_framework import status
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q, QuerySet, Sum
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from billing_app.constants import AR_AGING_BUCKETS
+from billing_app.model_choices import BillStatusChoices
+from billing_app.models import (
+    Bill,
+    BillItem,
+    DailyCategorySales,
+    DailyItemSales,
+    DailyTaxSales,
+    ItemTax,
+    SalesRollupWatermark,
+)
+from billing_app.serializers import BillCreateSerializer, BillOutputSerializer
+from billing_app.utils import (
+    BillStateError,
+    BillTotalsEngine,
+    SalesRollupEngine,
+    StockReservationEngine,
+    StockShortage,
+    TaxEngine,
+)
+from billing_app import logger
+from core.boilerplate.response_template import Resp
+from inventory_app.models import InventoryItem
+
+
+class BillHelpers:
+    OUTPUT_SERIALIZER = BillOutputSerializer
+    Model = Bill
+
+    @classmethod
+    def _output_queryset(cls) -> QuerySet:
+        """
+        Bills with everything `OUTPUT_SERIALIZER` renders, in three queries however many lines they have.
+        """
+        return cls.Model.objects.prefetch_related(
+            Prefetch(
+                "bill_items",
+                queryset=BillItem.objects.select_related("item__category")
+                .prefetch_related("taxes")
+                .order_by("created_at"),
+            )
+        )
+
+    @classmethod
+    def get(cls, _id: str, return_obj: bool = False, *args, **kwargs) -> Resp:
+        resp = Resp()
+        if not _id:
+            resp.error = "ID parameter is required."
+            resp.message = "The 'id' parameter is required to fetch the bill."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp
+
+        bill_obj = cls._output_queryset().filter(id=_id).first()
+        if not bill_obj:
+            resp.error = "Bill not found."
+            resp.message = f"Bill with id '{_id}' not found."
+            resp.status_code = status.HTTP_404_NOT_FOUND
+
+            logger.error(resp.to_text())
+            return resp
+
+        resp.message = f"Bill with id '{_id}' fetched successfully."
+        resp.data = bill_obj if return_obj else cls.OUTPUT_SERIALIZER(bill_obj).data
+        resp.status_code = status.HTTP_200_OK
+
+        logger.info(resp.to_text())
+        return resp
+
+    @classmethod
+    def create(cls, data: dict, return_obj: bool = False) -> Resp:
+        """
+        Create a bill with all of its lines and their taxes in one transaction.
+
+        Everything is validated before the first write; items and taxes are checked with one
+        query each, tax rates come from `TaxEngine`'s cache and totals are computed in memory, so
+        the number of queries does not grow with the number of lines.
+        """
+        resp = Resp()
+        deserialized = BillCreateSerializer(data=data)
+        if not deserialized.is_valid():
+            resp.error = "Invalid data."
+            resp.message = f"{deserialized.errors}"
+            resp.data = data
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp
+
+        validated = deserialized.validated_data
+        lines_data = validated["items"]
+
+        item_ids = {line["item"] for line in lines_data}
+        items = InventoryItem.objects.only("id", "price").in_bulk(item_ids)
+        if missing_items := item_ids - set(items):
+            resp.error = "Inventory item not found."
+            resp.message = f"Inventory item(s) not found: {', '.join(str(_id) for _id in missing_items)}."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp
+
+        tax_ids = {tax_id for line in lines_data for tax_id in line["taxes"]}
+        ## Not `TaxEngine.rates()`: its cache may still hold a tax that was just deleted.
+        found_taxes = set(ItemTax.objects.filter(id__in=tax_ids).values_list("id", flat=True)) if tax_ids else set()
+        if missing_taxes := tax_ids - found_taxes:
+            resp.error = "Tax not found."
+            resp.message = f"Tax(es) not found: {', '.join(str(_id) for _id in missing_taxes)}."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp
+
+        bill = cls.Model(
+            additional_discount_percentage=validated["additional_discount_percentage"],
+            paid_amount=validated["paid_amount"],
+            note=validated.get("note"),
+        )
+        line_totals = TaxEngine.line_totals(
+            (items[line["item"]].price, line["quantity"], line["taxes"], line["discount"]) for line in lines_data
+        )
+        bill_items = []
+        tax_links = []
+        for index, (line, line_total) in enumerate(zip(lines_data, line_totals)):
+            bill_item = BillItem(
+                bill=bill,
+                item_id=line["item"],
+                quantity=line["quantity"],
+                discount=line["discount"],
+                note=line.get("note"),
+                total=line_total,
+            )
+            if bill_item.total < 0:
+                resp.error = "Invalid discount."
+                resp.message = f"The discount on line {index + 1} is larger than the line's amount."
+                resp.data = data
+                resp.status_code = status.HTTP_400_BAD_REQUEST
+
+                logger.error(resp.to_text())
+                return resp
+
+            if bill_item.note:
+                bill_item.clean_text_attribute("note")
+            bill_items.append(bill_item)
+            tax_links.extend(
+                BillItem.taxes.through(billitem_id=bill_item.id, itemtax_id=tax_id)
+                for tax_id in dict.fromkeys(line["taxes"])
+            )
+
+        bill.total_amount, bill.due_amount = BillTotalsEngine.bill_totals(
+            [bill_item.total for bill_item in bill_items],
+            bill.additional_discount_percentage,
+            bill.paid_amount,
+        )
+        if bill.due_amount < 0:
+            resp.error = "Invalid paid amount."
+            resp.message = f"The paid amount ({bill.paid_amount}) is more than the bill's total ({bill.total_amount})."
+            resp.data = data
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp
+
+        with transaction.atomic():
+            bill.save()
+            BillItem.objects.bulk_create(bill_items)
+            if tax_links:
+                BillItem.taxes.through.objects.bulk_create(tax_links)
+
+        created_resp = cls.get(_id=bill.id, return_obj=return_obj)
+        resp.message = f"Bill '{bill.id}' with {len(bill_items)} item(s) created successfully."
+        resp.data = created_resp.data
+        resp.status_code = status.HTTP_201_CREATED
+
+        logger.info(resp.to_text())
+        return resp
+
+    @classmethod
+    def reserve(cls, _id: str, return_obj: bool = False) -> Resp:
+        """
+        Hold stock for every line of a draft bill; see `StockReservationEngine.reserve()`.
+        """
+        return cls._apply_stock_operation(_id, StockReservationEngine.reserve, "reserved stock for", return_obj)
+
+    @classmethod
+    def finalize(cls, _id: str, return_obj: bool = False) -> Resp:
+        """
+        Finalize a draft bill and take its stock; see `StockReservationEngine.finalize()`.
+        """
+        return cls._apply_stock_operation(_id, cls._finalize_bill, "finalized", return_obj)
+
+    @staticmethod
+    def _finalize_bill(bill: Bill) -> None:
+        with transaction.atomic():
+            StockReservationEngine.finalize(bill)
+            SalesRollupEngine.on_finalized(bill)
+
+    @classmethod
+    def _apply_stock_operation(cls, _id: str, operation, verb: str, return_obj: bool) -> Resp:
+        resp = Resp()
+        if not _id:
+            resp.error = "ID parameter is required."
+            resp.message = "The 'id' of the bill is required."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp
+
+        bill = cls.Model.objects.filter(id=_id).only("id", "status").first()
+        if not bill:
+            resp.error = "Bill not found."
+            resp.message = f"Bill with id '{_id}' not found."
+            resp.status_code = status.HTTP_404_NOT_FOUND
+
+            logger.error(resp.to_text())
+            return resp
+
+        try:
+            operation(bill)
+        except BillStateError as ex:
+            resp.error = "Invalid bill status."
+            resp.message = f"{ex}"
+            resp.status_code = status.HTTP_409_CONFLICT
+
+            logger.error(resp.to_text())
+            return resp
+        except StockShortage as ex:
+            resp.error = "Insufficient stock."
+            resp.message = f"{len(ex.shortages)} item(s) on bill '{_id}' cannot be fulfilled."
+            resp.data = ex.shortages
+            resp.status_code = status.HTTP_409_CONFLICT
+
+            logger.error(resp.to_text())
+            return resp
+
+        updated_resp = cls.get(_id=bill.id, return_obj=return_obj)
+        resp.message = f"Successfully {verb} bill '{_id}'."
+        resp.data = updated_resp.data
+        resp.status_code = status.HTTP_200_OK
+
+        logger.info(resp.to_text())
+        return resp
+
+
+class SalesReportHelpers:
+    """
+    Revenue reports read from the daily rollups kept by `SalesRollupEngine`.
+    """
+    DIMENSIONS = {
+        "item": (DailyItemSales, "item_id", "item__name"),
+        "category": (DailyCategorySales, "category_id", "category__name"),
+        "tax": (DailyTaxSales, "tax_id", "tax__name"),
+    }
+
+    @classmethod
+    def report(cls, by: str, start: str = None, end: str = None, daily: bool = False) -> Resp:
+        resp = Resp()
+        if by not in cls.DIMENSIONS:
+            resp.error = "Invalid dimension."
+            resp.message = f"'by' must be one of: {', '.join(cls.DIMENSIONS)}."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp
+
+        try:
+            start_day = date.fromisoformat(start) if start else None
+            end_day = date.fromisoformat(end) if end else None
+        except ValueError:
+            resp.error = "Invalid date."
+            resp.message = "'start' and 'end' must be dates in the YYYY-MM-DD format."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp
+
+        Model, key, name = cls.DIMENSIONS[by]
+        rows = Model.objects.all()
+        if start_day:
+            rows = rows.filter(day__gte=start_day)
+        if end_day:
+            rows = rows.filter(day__lte=end_day)
+
+        group_by = (("day",) if daily else ()) + (key, name)
+        rows = (
+            rows.values(*group_by)
+            .annotate(
+                quantity_sum=Sum("quantity"),
+                line_count_sum=Sum("line_count"),
+                gross_amount_sum=Sum("gross_amount"),
+                net_amount_sum=Sum("net_amount"),
+            )
+            .order_by(*(("day",) if daily else ()), "-net_amount_sum")
+        )
+        watermark = SalesRollupWatermark.objects.filter(name=SalesRollupEngine.WATERMARK_NAME).first()
+
+        resp.message = f"Sales by {by} fetched successfully."
+        resp.data = {
+            "by": by,
+            "start": start_day,
+            "end": end_day,
+            "rolledUpUntil": watermark.last_finalized_at if watermark else None,
+            "results": [
+                {
+                    **({"day": row["day"]} if daily else {}),
+                    "id": row[key],
+                    "name": row[name],
+                    "quantity": row["quantity_sum"],
+                    "lineCount": row["line_count_sum"],
+                    "grossAmount": row["gross_amount_sum"],
+                    "netAmount": row["net_amount_sum"],
+                }
+                for row in rows
+            ],
+        }
+        resp.status_code = status.HTTP_200_OK
+
+        logger.info(resp.to_text())
+        return resp
+
+
+class ReceivablesReportHelpers:
+    Model = Bill
+
+    @classmethod
+    def aging(cls) -> Resp:
+        """
+        Amounts still due on finalized bills, bucketed by the time since they were finalized
+        (`AR_AGING_BUCKETS`).
+
+        Drafts are carts, not receivables, so only finalized bills count. Every bucket comes
+        from one conditional aggregate over the finalized bills with `due_amount > 0`, read from
+        the partial `bill_receivable_age_idx`, so the cost depends on the number of unpaid
+        bills, not on the whole bill history.
+        """
+        resp = Resp()
+        now = timezone.now()
+
+        aggregates = {}
+        for label, min_days, max_days in AR_AGING_BUCKETS:
+            ## A bill is `n` days old from `n` days after it was finalized until the day after.
+            bucket = Q(finalized_at__lte=now - timedelta(days=min_days))
+            if max_days is not None:
+                bucket &= Q(finalized_at__gt=now - timedelta(days=max_days + 1))
+            aggregates[f"{label}__count"] = Count("id", filter=bucket)
+            aggregates[f"{label}__due"] = Sum("due_amount", filter=bucket)
+
+        totals = (
+            cls.Model.objects.filter(status=BillStatusChoices.FINALIZED, due_amount__gt=0)
+            .aggregate(**aggregates)
+        )
+
+        buckets = [
+            {
+                "bucket": label,
+                "minDays": min_days,
+                "maxDays": max_days,
+                "billCount": totals[f"{label}__count"],
+                "dueAmount": totals[f"{label}__due"] or 0,
+            }
+            for label, min_days, max_days in AR_AGING_BUCKETS
+        ]
+
+        resp.message = "Accounts-receivable aging fetched successfully."
+        resp.data = {
+            "asOf": now,
+            "billCount": sum(bucket["billCount"] for bucket in buckets),
+            "dueAmount": sum(bucket["dueAmount"] for bucket in buckets),
+            "buckets": buckets,
+        }
+        resp.status_code = status.HTTP_200_OK
+
+        logger.info(resp.to_text())
+        return resp
+
+
+class BillRenderHelpers:
+    """
+    Printable bills, rendered by an rq job and stored under a hash of what they show.
+
+    The template is given only the fields it shows (`rendered_fields`), and the storage key is
+    the SHA-256 of those, the bill's `updated_at`, the format and `RENDER_VERSION`. An unchanged
+    bill is therefore rendered once and then served straight from storage, while stock movements
+    on its items (which change their `quantity`/`updated_at`) do not give it a new key. Bump
+    `RENDER_VERSION` when the template or the fields below change.
+    """
+    TEMPLATE = "billing_app/bill.html"
+    RENDER_VERSION: int = 2
+    STORAGE_PREFIX = "bills/rendered"
+    CONTENT_TYPES = {"html": "text/html; charset=utf-8", "pdf": "application/pdf"}
+    QUEUE = "default"
+
+    BILL_FIELDS: tuple = (
+        "id",
+        "number",
+        "created_at",
+        "status",
+        "additional_discount_percentage",
+        "total_amount",
+        "paid_amount",
+        "due_amount",
+        "note",
+    )
+    LINE_FIELDS: tuple = ("quantity", "discount", "total")
+    ITEM_FIELDS: tuple = ("name", "sku", "price")
+    TAX_FIELDS: tuple = ("name", "percentage")
+
+    @classmethod
+    def rendered_fields(cls, bill_data: dict) -> dict:
+        """
+        What the template shows of a serialized bill, in the same shape.
+        """
+        return {
+            **{field: bill_data.get(field) for field in cls.BILL_FIELDS},
+            "bill_items": [
+                {
+                    **{field: line.get(field) for field in cls.LINE_FIELDS},
+                    "item": {field: (line.get("item") or {}).get(field) for field in cls.ITEM_FIELDS},
+                    "taxes": [{field: tax.get(field) for field in cls.TAX_FIELDS} for tax in line.get("taxes") or []],
+                }
+                for line in bill_data.get("bill_items") or []
+            ],
+        }
+
+    @classmethod
+    def content_key(cls, bill_data: dict, fmt: str) -> str:
+        digest = hashlib.sha256(
+            json.dumps(
+                {
+                    "bill": cls.rendered_fields(bill_data),
+                    "updatedAt": bill_data.get("updated_at"),
+                    "format": fmt,
+                    "version": cls.RENDER_VERSION,
+                },
+                sort_keys=True,
+                cls=DjangoJSONEncoder,
+            ).encode()
+        ).hexdigest()
+        return f"{cls.STORAGE_PREFIX}/{digest[:2]}/{digest}.{fmt}"
+
+    @classmethod
+    def job_id(cls, key: str) -> str:
+        ## Requests for the same content share one job.
+        return "render-" + key.rsplit("/", 1)[-1].replace(".", "-")
+
+    @classmethod
+    def render(cls, _id: str, fmt: str) -> str:
+        """
+        Render a bill and store it unless that exact content is stored already; returns the key.
+        """
+        bill_data = BillHelpers.OUTPUT_SERIALIZER(BillHelpers._output_queryset().get(id=_id)).data
+        key = cls.content_key(bill_data, fmt)
+        if default_storage.exists(key):
+            return key
+
+        html = render_to_string(cls.TEMPLATE, {"bill": cls.rendered_fields(bill_data)})
+        if fmt == "pdf":
+            ## Optional: only the workers that render PDFs need WeasyPrint and its system libraries.
+            from weasyprint import HTML
+
+            content = HTML(string=html).write_pdf()
+        else:
+            content = html.encode()
+
+        default_storage.save(key, ContentFile(content))
+        logger.info(f"Rendered bill '{_id}' as {fmt} to '{key}'.")
+        return key
+
+    @classmethod
+    def status(cls, _id: str, fmt: str, enqueue: bool = False) -> Resp:
+        """
+        Where the rendering of a bill's current content stands; with `enqueue`, queue it if needed.
+        """
+        resp = Resp()
+        if not _id:
+            resp.error = "ID parameter is required."
+            resp.message = "The 'id' of the bill is required."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp
+
+        if fmt not in cls.CONTENT_TYPES:
+            resp.error = "Invalid format."
+            resp.message = f"'format' must be one of: {', '.join(cls.CONTENT_TYPES)}."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp
+
+        bill_resp = BillHelpers.get(_id=_id)
+        if bill_resp.error:
+            return bill_resp
+
+        key = cls.content_key(bill_resp.data, fmt)
+        data = {"id": _id, "format": fmt, "key": key}
+
+        if default_storage.exists(key):
+            resp.message = f"Bill '{_id}' is rendered as {fmt}."
+            resp.data = {**data, "status": "ready"}
+            resp.status_code = status.HTTP_200_OK
+
+            logger.info(resp.to_text())
+            return resp
+
+        queue = django_rq.get_queue(cls.QUEUE)
+        job = queue.fetch_job(cls.job_id(key))
+        job_status = job.get_status() if job else None
+        if enqueue and job_status in (None, "failed", "stopped", "canceled", "finished"):
+            from billing_app.jobs import render_bill
+
+            job = queue.enqueue(render_bill, str(_id), fmt, job_id=cls.job_id(key))
+            job_status = job.get_status()
+
+        error = None
+        if job_status == "failed" and (result := job.latest_result()):
+            error = result.exc_string
+
+        resp.message = f"Rendering of bill '{_id}' as {fmt}: {job_status or 'not requested'}."
+        resp.data = {**data, "status": job_status or "not_requested", "error": error}
+        resp.status_code = status.HTTP_202_ACCEPTED if job_status else status.HTTP_404_NOT_FOUND
+
+        logger.info(resp.to_text())
+        return resp
@@ -0,0 +1,38 @@
+from django_rq import job
+from rq import get_current_job
+
+from billing_app.helpers import BillRenderHelpers
+from billing_app.utils import BillTotalsEngine, SalesRollupEngine, StockReservationEngine
+
+
+@job("low")
+def release_expired_reservations() -> int:
+    return StockReservationEngine.release_expired()
+
+
+@job("low")
+def roll_up_sales() -> int:
+    return SalesRollupEngine.run()
+
+
+@job("low")
+def recompute_open_bills(tax_id: str = None, item_id: str = None) -> int:
+    current_job = get_current_job()
+
+    def report_progress(recomputed: int, chunks: int) -> None:
+        if current_job:
+            current_job.meta.update({"recomputed": recomputed, "chunks": chunks})
+            current_job.save_meta()
+
+    recomputed, skipped = BillTotalsEngine.recompute_open_bills(
+        tax_id=tax_id, item_id=item_id, progress=report_progress
+    )
+    if current_job:
+        current_job.meta.update({"recomputed": recomputed, "skipped": skipped})
+        current_job.save_meta()
+    return recomputed
+
+
+@job("default")
+def render_bill(bill_id: str, fmt: str) -> str:
+    return BillRenderHelpers.render(bill_id, fmt)
@@ -0,0 +1,85 @@
+import threading
+import time
+
+from django.conf import settings as django_settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from billing_app.utils import BillNumberAllocator
+
+
+class BenchmarkAllocator(BillNumberAllocator):
+    ## Never consume numbers from the real sequence or counter.
+    SEQUENCE_NAME = "billing_bill_number_benchmark_seq"
+    REDIS_KEY = "billing:bill-number:benchmark"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure bill number allocation throughput with many concurrent checkouts, for several block sizes. "
+        "Every thread stands for a worker with its own allocator; a separate sequence/counter is created and dropped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backend", choices=(BillNumberAllocator.POSTGRES, BillNumberAllocator.REDIS), default=None)
+        parser.add_argument("--workers", type=int, default=16, help="Concurrent allocators (threads).")
+        parser.add_argument("--checkouts", type=int, default=2000, help="Numbers allocated per worker.")
+        parser.add_argument("--block-sizes", default="1,20,100", help="Comma-separated block sizes to compare.")
+
+    def handle(self, *args, **options):
+        backend = options["backend"] or django_settings.BILL_NUMBER_BACKEND
+        self.stdout.write(
+            f"{options['workers']} worker(s) x {options['checkouts']} checkout(s), backend '{backend}':"
+        )
+        for block_size in (int(size) for size in options["block_sizes"].split(",")):
+            self.drop_counter(backend)
+            self.create_counter(backend, block_size)
+            elapsed, numbers, leases = self.run(backend, block_size, options["workers"], options["checkouts"])
+            unique = len(set(numbers)) == len(numbers)
+            self.stdout.write(
+                f"  block size {block_size:5d}: {len(numbers) / elapsed:10.0f} numbers/s, "
+                f"{leases:6d} lease(s), {elapsed * 1000:8.1f} ms"
+                + ("" if unique else self.style.ERROR("  DUPLICATE NUMBERS"))
+            )
+        self.drop_counter(backend)
+
+    @staticmethod
+    def run(backend: str, block_size: int, workers: int, checkouts: int) -> tuple[float, list, int]:
+        allocators = [BenchmarkAllocator(backend=backend, block_size=block_size) for _ in range(workers)]
+        numbers = []
+        numbers_lock = threading.Lock()
+        start = threading.Barrier(workers + 1)
+
+        def checkout(allocator: BillNumberAllocator) -> None:
+            start.wait()
+            allocated = [allocator.next() for _ in range(checkouts)]
+            with numbers_lock:
+                numbers.extend(allocated)
+            connection.close()
+
+        threads = [threading.Thread(target=checkout, args=(allocator,)) for allocator in allocators]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return elapsed, numbers, sum(allocator.leases for allocator in allocators)
+
+    @staticmethod
+    def create_counter(backend: str, block_size: int) -> None:
+        ## The allocator never creates its sequence (the real one comes from a migration).
+        if backend == BillNumberAllocator.REDIS:
+            return
+        name = connection.ops.quote_name(BenchmarkAllocator.SEQUENCE_NAME)
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE SEQUENCE {name} AS bigint INCREMENT BY {block_size} START WITH {block_size}")
+
+    @staticmethod
+    def drop_counter(backend: str) -> None:
+        if backend == BillNumberAllocator.REDIS:
+            django_settings.REDIS_CONN.delete(BenchmarkAllocator.REDIS_KEY)
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP SEQUENCE IF EXISTS {connection.ops.quote_name(BenchmarkAllocator.SEQUENCE_NAME)}")
@@ -0,0 +1,108 @@
+import time
+from decimal import Decimal
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+
+from billing_app.models import Bill, BillItem, ItemTax
+from billing_app.utils import BillTotalsEngine
+from inventory_app.models import InventoryItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the per-line `BillItem.save()` loop with `BillTotalsEngine` on a throwaway bill. "
+        "Everything is created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, default=50, help="Lines on the bill.")
+        parser.add_argument("--taxes", type=int, default=2, help="Taxes applied to every line.")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per strategy; the best one is reported.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            bill = self.create_bill(lines=options["lines"], taxes=options["taxes"])
+
+            legacy = self.measure(bill, lambda: self.legacy_recompute(bill), options["repeat"])
+            legacy_totals = (bill.total_amount, bill.due_amount)
+
+            engine = self.measure(bill, lambda: BillTotalsEngine.recompute([bill]), options["repeat"])
+            engine_totals = (bill.total_amount, bill.due_amount)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Bill with {options['lines']} line(s) and {options['taxes']} tax(es) per line:")
+        self.stdout.write(f"  per-line save loop: {legacy[0]:8.2f} ms, {legacy[1]} queries")
+        self.stdout.write(f"  totals engine:      {engine[0]:8.2f} ms, {engine[1]} queries")
+        if legacy_totals == engine_totals:
+            self.stdout.write(self.style.SUCCESS(f"Totals match: {engine_totals[0]} (due {engine_totals[1]})."))
+        else:
+            self.stdout.write(self.style.ERROR(f"Totals differ: {legacy_totals} vs {engine_totals}."))
+
+    def measure(self, bill: Bill, func, repeat: int) -> tuple[float, int]:
+        best_ms, queries = None, 0
+        for _ in range(max(repeat, 1)):
+            ## Stale line totals, so that both strategies have every line to write.
+            BillItem.objects.filter(bill=bill).update(total=0)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                func()
+                elapsed_ms = (time.perf_counter() - started) * 1000
+            if best_ms is None or elapsed_ms < best_ms:
+                best_ms, queries = elapsed_ms, len(captured.captured_queries)
+        return best_ms, queries
+
+    @staticmethod
+    def legacy_recompute(bill: Bill) -> None:
+        """
+        What `Bill.save()` used to do before the totals engine.
+        """
+        for item in bill.items:
+            item.save()
+        total_amount = bill.items.aggregate(total=Sum("total"))["total"] or 0
+        total_amount -= (total_amount * bill.additional_discount_percentage) / 100
+        bill.total_amount = total_amount
+        bill.due_amount = bill.total_amount - bill.paid_amount
+
+    @staticmethod
+    def create_bill(lines: int, taxes: int) -> Bill:
+        ## `bulk_create` keeps the set-up cheap and skips the models' `save()` side effects.
+        run_id = uuid4().hex[:8]
+        items = InventoryItem.objects.bulk_create(
+            [
+                InventoryItem(
+                    name=f"benchmark-{run_id}-{index}",
+                    sku=f"bench-{run_id}-{index}",
+                    quantity=1000,
+                    price=Decimal("19.99") + index,
+                )
+                for index in range(lines)
+            ]
+        )
+        item_taxes = ItemTax.objects.bulk_create(
+            [
+                ItemTax(name=f"benchmark-{run_id}-{index}", percentage=Decimal("5.00") + index)
+                for index in range(taxes)
+            ]
+        )
+        bill = Bill.objects.bulk_create(
+            [Bill(additional_discount_percentage=Decimal("2.50"), paid_amount=Decimal("0.00"))]
+        )[0]
+        bill_items = BillItem.objects.bulk_create(
+            [
+                BillItem(bill=bill, item=item, quantity=index % 5 + 1, discount=Decimal("0.50"))
+                for index, item in enumerate(items)
+            ]
+        )
+        BillItem.taxes.through.objects.bulk_create(
+            [
+                BillItem.taxes.through(billitem_id=bill_item.id, itemtax_id=tax.id)
+                for bill_item in bill_items
+                for tax in item_taxes
+            ]
+        )
+        return bill
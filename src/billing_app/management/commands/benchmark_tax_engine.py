@@ -0,0 +1,87 @@
+import random
+import time
+from decimal import Decimal, ROUND_HALF_UP
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from billing_app.models import ItemTax
+from billing_app.utils import TaxEngine
+
+
+class Command(BaseCommand):
+    help = (
+        "Time tax application for a batch import: compounding every line's percentages one by one "
+        "versus `TaxEngine`'s cached multipliers. The taxes are created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, default=1000, help="Lines in the batch.")
+        parser.add_argument("--taxes", type=int, default=6, help="Distinct taxes to draw from.")
+        parser.add_argument("--taxes-per-line", type=int, default=2, help="Taxes applied to every line.")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per strategy; the best one is reported.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        with transaction.atomic():
+            run_id = uuid4().hex[:8]
+            item_taxes = ItemTax.objects.bulk_create(
+                [
+                    ItemTax(name=f"benchmark-{run_id}-{index}", percentage=Decimal("2.50") * (index + 1))
+                    for index in range(options["taxes"])
+                ]
+            )
+            rates = {tax.id: tax.percentage for tax in item_taxes}
+            per_line = min(options["taxes_per_line"], len(item_taxes))
+            lines = [
+                (
+                    Decimal(rng.randrange(100, 100000)) / 100,
+                    rng.randrange(1, 10),
+                    [tax.id for tax in rng.sample(item_taxes, per_line)],
+                    Decimal(rng.randrange(0, 100)) / 100,
+                )
+                for _ in range(options["lines"])
+            ]
+
+            TaxEngine.clear()
+            legacy_ms, legacy_totals = self.measure(lambda: self.legacy_totals(lines, rates), options["repeat"])
+            ## The first run pays for loading the rates; the best run shows the warm cost.
+            engine_ms, engine_totals = self.measure(lambda: TaxEngine.line_totals(lines), options["repeat"])
+
+            transaction.set_rollback(True)
+        TaxEngine.clear()
+
+        count = max(len(lines), 1)
+        self.stdout.write(f"{len(lines)} line(s), {per_line} of {len(item_taxes)} tax(es) per line:")
+        self.stdout.write(f"  per-line compounding: {legacy_ms:8.2f} ms ({legacy_ms * 1000 / count:7.2f} µs/line)")
+        self.stdout.write(f"  tax engine:           {engine_ms:8.2f} ms ({engine_ms * 1000 / count:7.2f} µs/line)")
+        if legacy_totals == engine_totals:
+            self.stdout.write(self.style.SUCCESS("Line totals match."))
+        else:
+            mismatches = sum(1 for legacy, engine in zip(legacy_totals, engine_totals) if legacy != engine)
+            self.stdout.write(self.style.ERROR(f"{mismatches} line total(s) differ."))
+
+    @staticmethod
+    def measure(func, repeat: int) -> tuple[float, list]:
+        best_ms, result = None, None
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            result = func()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if best_ms is None or elapsed_ms < best_ms:
+                best_ms = elapsed_ms
+        return best_ms, result
+
+    @staticmethod
+    def legacy_totals(lines: list, rates: dict) -> list[Decimal]:
+        """
+        What `BillItem.save()` did for every line before the tax engine, minus the query.
+        """
+        totals = []
+        for price, quantity, tax_ids, discount in lines:
+            total = price * quantity
+            for tax_id in tax_ids:
+                total += (total * rates[tax_id]) / 100
+            totals.append((total - discount).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
+        return totals
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from billing_app.utils import BillTotalsEngine
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute open (draft, amount due) bills, all of them or only those using a tax or an item, "
+        "in throttled chunks. `--enqueue` hands the work to an rq worker instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tax", help="Only bills with a line using this ItemTax id.")
+        parser.add_argument("--item", help="Only bills with a line for this InventoryItem id.")
+        parser.add_argument("--chunk-size", type=int, default=None)
+        parser.add_argument("--throttle", type=float, default=None, help="Seconds to pause between chunks.")
+        parser.add_argument("--enqueue", action="store_true", help="Queue the recompute on the 'low' rq queue.")
+
+    def handle(self, *args, **options):
+        if options["enqueue"]:
+            from billing_app.jobs import recompute_open_bills
+
+            queued = recompute_open_bills.delay(tax_id=options["tax"], item_id=options["item"])
+            self.stdout.write(f"Queued job {queued.id}.")
+            return
+
+        recomputed, skipped = BillTotalsEngine.recompute_open_bills(
+            tax_id=options["tax"],
+            item_id=options["item"],
+            chunk_size=options["chunk_size"],
+            throttle=options["throttle"],
+            progress=lambda recomputed, chunks: self.stdout.write(f"  chunk {chunks}: {recomputed} bill(s)"),
+        )
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"{skipped} bill(s) stayed locked and were not recomputed."))
+        self.stdout.write(self.style.SUCCESS(f"Recomputed {recomputed} open bill(s)."))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from billing_app.utils import StockReservationEngine
+
+
+class Command(BaseCommand):
+    help = (
+        "Put the stock of expired reservations back (also scheduled by `runcrons`). Runs once by default; "
+        "`--every` keeps sweeping, `--enqueue` hands one sweep to an rq worker instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--every", type=float, default=0, help="Seconds between sweeps; 0 sweeps once.")
+        parser.add_argument("--batch-size", type=int, default=StockReservationEngine.SWEEP_BATCH_SIZE)
+        parser.add_argument("--enqueue", action="store_true", help="Queue the sweep on the 'low' rq queue.")
+
+    def handle(self, *args, **options):
+        if options["enqueue"]:
+            from billing_app.jobs import release_expired_reservations
+
+            queued = release_expired_reservations.delay()
+            self.stdout.write(f"Queued job {queued.id}.")
+            return
+
+        while True:
+            released = StockReservationEngine.release_expired(batch_size=options["batch_size"])
+            self.stdout.write(f"Released {released} expired reservation(s).")
+            if not options["every"]:
+                break
+            time.sleep(options["every"])
@@ -0,0 +1,41 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from billing_app.utils import SalesRollupEngine
+
+
+class Command(BaseCommand):
+    help = (
+        "Add finalized bills not rolled up yet to the daily sales rollups. Runs once by default "
+        "(for cron); `--every` keeps running, `--enqueue` hands one run to an rq worker, and "
+        "`--rebuild` recomputes the rollups from scratch (or from `--since`) for backfills."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--every", type=float, default=0, help="Seconds between runs; 0 runs once.")
+        parser.add_argument("--batch-size", type=int, default=SalesRollupEngine.BATCH_SIZE)
+        parser.add_argument("--enqueue", action="store_true", help="Queue the run on the 'low' rq queue.")
+        parser.add_argument("--rebuild", action="store_true", help="Drop and rebuild the rollups.")
+        parser.add_argument("--since", type=date.fromisoformat, help="With --rebuild: first day (YYYY-MM-DD) to rebuild.")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            rolled_up = SalesRollupEngine.rebuild(since=options["since"], batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt the sales rollups from {rolled_up} bill(s)."))
+            return
+
+        if options["enqueue"]:
+            from billing_app.jobs import roll_up_sales
+
+            queued = roll_up_sales.delay()
+            self.stdout.write(f"Queued job {queued.id}.")
+            return
+
+        while True:
+            rolled_up = SalesRollupEngine.run(batch_size=options["batch_size"])
+            self.stdout.write(f"Rolled up {rolled_up} bill(s).")
+            if not options["every"]:
+                break
+            time.sleep(options["every"])
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+## The increment is the block of bill numbers a process leases at a time (`BILL_NUMBER_BLOCK_SIZE`);
+## to change it, add a migration that runs `ALTER SEQUENCE billing_bill_number_seq INCREMENT BY <n>`.
+BILL_NUMBER_BLOCK_SIZE = 20
+
+
+class Migration(migrations.Migration):
+
+    dependencies = []
+
+    operations = [
+        migrations.RunSQL(
+            sql=(
+                "CREATE SEQUENCE IF NOT EXISTS billing_bill_number_seq AS bigint "
+                f"INCREMENT BY {BILL_NUMBER_BLOCK_SIZE} START WITH {BILL_NUMBER_BLOCK_SIZE}"
+            ),
+            reverse_sql="DROP SEQUENCE IF EXISTS billing_bill_number_seq",
+        ),
+    ]
@@ -0,0 +1,22 @@
+class BillStatusChoices:
+    DRAFT = "draft"
+    FINALIZED = "finalized"
+    CANCELLED = "cancelled"
+
+    STATUS_CHOICES = [
+        (DRAFT, "Draft"),
+        (FINALIZED, "Finalized"),
+        (CANCELLED, "Cancelled"),
+    ]
+
+
+class StockReservationStatusChoices:
+    ACTIVE = "active"
+    CONSUMED = "consumed"
+    RELEASED = "released"
+
+    STATUS_CHOICES = [
+        (ACTIVE, "Active"),
+        (CONSUMED, "Consumed"),
+        (RELEASED, "Released"),
+    ]
@@ -1,6 +1,11 @@
+from uuid import UUID
+
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from billing_app.model_choices import BillStatusChoices, StockReservationStatusChoices
 from core.boilerplate.base_model import BaseModel
-from inventory_app.models import InventoryItem
+from inventory_app.models import InventoryItem, InventoryItemCategory
 
 
 class ItemTax(BaseModel):
@@ -27,6 +32,8 @@ class ItemTax(BaseModel):
 
 
 class Bill(BaseModel):
+    ## Human-readable invoice number, see `billing_app.utils.BillNumberAllocator`.
+    number = models.BigIntegerField(unique=True, blank=True, null=True, editable=False)
     additional_discount_percentage = models.DecimalField(
         max_digits=32, decimal_places=2, default=0.00
     )
@@ -34,21 +41,31 @@ class Bill(BaseModel):
     paid_amount = models.DecimalField(max_digits=32, decimal_places=2, default=0.00)
     due_amount = models.DecimalField(max_digits=32, decimal_places=2, default=0.00)
     note = models.TextField(blank=True, null=True)
+    status = models.CharField(
+        max_length=16, choices=BillStatusChoices.STATUS_CHOICES, default=BillStatusChoices.DRAFT
+    )
+    finalized_at = models.DateTimeField(blank=True, null=True)
+    rolled_up_at = models.DateTimeField(blank=True, null=True)
 
     def save(self, *args, **kwargs):
-        for item in self.items:
-            item.save()
+        if self.number is None:
+            from billing_app.utils import BillNumberAllocator
+
+            self.number = BillNumberAllocator.allocate()
         self.calculate_totals()
         if self.note:
             self.clean_text_attribute("note")
         super(Bill, self).save(*args, **kwargs)
 
     def calculate_totals(self):
-        bill_items = self.items
-        total_amount = bill_items.aggregate(total=models.Sum('total'))['total'] or 0
-        total_amount -= (total_amount * self.additional_discount_percentage) / 100
-        self.total_amount = total_amount
-        self.due_amount = self.total_amount - self.paid_amount
+        """
+        Refresh every line total and this bill's totals in a fixed number of queries.
+
+        A bill that has not been saved yet has no lines, so there is nothing to compute.
+        """
+        from billing_app.utils import BillTotalsEngine
+
+        BillTotalsEngine.recompute([self])
 
     class Meta:
         verbose_name = "Bill"
@@ -57,6 +74,24 @@ class Bill(BaseModel):
             models.Index(fields=("total_amount",)),
             models.Index(fields=("paid_amount",)),
             models.Index(fields=("due_amount",)),
+            models.Index(fields=("status",)),
+            models.Index(
+                fields=("finalized_at", "id"),
+                condition=models.Q(status=BillStatusChoices.FINALIZED, rolled_up_at__isnull=True),
+                name="bill_pending_rollup_idx",
+            ),
+            models.Index(
+                fields=("id",),
+                condition=models.Q(status=BillStatusChoices.DRAFT, due_amount__gt=0),
+                name="bill_open_idx",
+            ),
+            ## Covers the accounts-receivable aging query with an index-only scan of the unpaid finalized bills.
+            models.Index(
+                fields=("finalized_at",),
+                include=("due_amount",),
+                condition=models.Q(status=BillStatusChoices.FINALIZED, due_amount__gt=0),
+                name="bill_receivable_age_idx",
+            ),
         )
 
     @property
@@ -73,11 +108,11 @@ class BillItem(BaseModel):
     note = models.TextField(blank=True, null=True)
 
     def save(self, *args, **kwargs):
-        taxes: list[ItemTax] = self.taxes.all()
-        self.total = self.item.price * self.quantity
-        for tax in taxes:
-            self.total += (self.total * tax.percentage) / 100
-        self.total -= self.discount
+        from billing_app.utils import TaxEngine
+
+        ## An unsaved line cannot have taxes linked yet.
+        tax_ids = [] if self._state.adding else self.taxes.values_list("id", flat=True)
+        self.total = TaxEngine.line_total(self.item.price, self.quantity, tax_ids, self.discount)
 
         if self.note:
             self.clean_text_attribute("note")
@@ -92,3 +127,126 @@ class BillItem(BaseModel):
             models.Index(fields=("discount",)),
             models.Index(fields=("total",)),
         )
+
+
+class StockReservation(BaseModel):
+    """
+    Stock of an item held for a draft bill.
+
+    Reserving takes the quantity out of `InventoryItem.quantity` straight away; finalizing the
+    bill marks the reservation consumed, and reservations still active after `expires_at` are
+    released (the stock is put back) by `StockReservationEngine.release_expired()`.
+    """
+
+    bill = models.ForeignKey(Bill, on_delete=models.CASCADE, related_name="stock_reservations")
+    item = models.ForeignKey(InventoryItem, on_delete=models.PROTECT, related_name="stock_reservations")
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(
+        max_length=16,
+        choices=StockReservationStatusChoices.STATUS_CHOICES,
+        default=StockReservationStatusChoices.ACTIVE,
+    )
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.item_id} x{self.quantity} for bill {self.bill_id} ({self.status})"
+
+    class Meta:
+        verbose_name = "Stock Reservation"
+        verbose_name_plural = "Stock Reservations"
+        constraints = (
+            models.UniqueConstraint(
+                fields=("bill", "item"),
+                condition=models.Q(status=StockReservationStatusChoices.ACTIVE),
+                name="unique_active_stock_reservation",
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=("expires_at",),
+                condition=models.Q(status=StockReservationStatusChoices.ACTIVE),
+                name="active_reservation_expiry_idx",
+            ),
+        )
+
+
+class SalesRollupBase(BaseModel):
+    """
+    Sales of finalized bills summed per day (in `TIME_ZONE`) and per some dimension.
+
+    Rows are only ever incremented by `SalesRollupEngine`; `gross_amount` is the sum of line
+    totals and `net_amount` the same after each bill's additional discount.
+    """
+
+    day = models.DateField()
+    quantity = models.BigIntegerField(default=0)
+    line_count = models.BigIntegerField(default=0)
+    gross_amount = models.DecimalField(max_digits=32, decimal_places=2, default=0.00)
+    net_amount = models.DecimalField(max_digits=32, decimal_places=2, default=0.00)
+
+    class Meta:
+        abstract = True
+
+
+class DailyItemSales(SalesRollupBase):
+    item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE, related_name="daily_sales")
+
+    class Meta:
+        verbose_name = "Daily Item Sales"
+        verbose_name_plural = "Daily Item Sales"
+        constraints = (models.UniqueConstraint(fields=("day", "item"), name="unique_daily_item_sales"),)
+        indexes = (models.Index(fields=("item", "day")),)
+
+
+class DailyCategorySales(SalesRollupBase):
+    ## Items without a category are summed under a NULL category. NULLs are never equal in a
+    ## unique index, so it is built on the category with NULL read as `NO_CATEGORY`.
+    NO_CATEGORY: UUID = UUID(int=0)
+
+    category = models.ForeignKey(
+        InventoryItemCategory, on_delete=models.CASCADE, null=True, blank=True, related_name="daily_sales"
+    )
+
+    class Meta:
+        verbose_name = "Daily Category Sales"
+        verbose_name_plural = "Daily Category Sales"
+        constraints = (
+            models.UniqueConstraint(
+                F("day"),
+                Coalesce("category", Value(UUID(int=0)), output_field=models.UUIDField()),
+                name="unique_daily_category_sales",
+            ),
+        )
+        indexes = (models.Index(fields=("category", "day")),)
+
+
+class DailyTaxSales(SalesRollupBase):
+    """
+    Amounts are those of the lines the tax applied to (the taxable sales), not the tax itself.
+    """
+
+    tax = models.ForeignKey(ItemTax, on_delete=models.CASCADE, related_name="daily_sales")
+
+    class Meta:
+        verbose_name = "Daily Tax Sales"
+        verbose_name_plural = "Daily Tax Sales"
+        constraints = (models.UniqueConstraint(fields=("day", "tax"), name="unique_daily_tax_sales"),)
+        indexes = (models.Index(fields=("tax", "day")),)
+
+
+class SalesRollupWatermark(BaseModel):
+    """
+    The latest bill the deferred rollup job processed, by `(finalized_at, id)`; reports show it
+    as how recent the rollups are. Which bills are still pending is up to `Bill.rolled_up_at`.
+    """
+
+    name = models.CharField(max_length=64, unique=True)
+    last_finalized_at = models.DateTimeField(blank=True, null=True)
+    last_bill_id = models.UUIDField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_finalized_at} / {self.last_bill_id}"
+
+    class Meta:
+        verbose_name = "Sales Rollup Watermark"
+        verbose_name_plural = "Sales Rollup Watermarks"
@@ -1,5 +1,15 @@
 
-from rest_framework.serializers import ModelSerializer
+from decimal import Decimal
+
+from rest_framework.serializers import (
+	ModelSerializer,
+	Serializer,
+	CharField,
+	DecimalField,
+	IntegerField,
+	ListField,
+	UUIDField,
+)
 from billing_app.models import ItemTax, Bill, BillItem
 from inventory_app.serializers import InventoryItemOutputSerializer
 
@@ -35,3 +45,19 @@ class BillOutputSerializer(ModelSerializer):
 	class Meta:
 		model = Bill
 		fields = "__all__"
+
+# One-shot bill creation: the whole cart, validated before anything is written
+class BillItemCreateSerializer(Serializer):
+	item = UUIDField()
+	quantity = IntegerField(min_value=1, default=1)
+	discount = DecimalField(max_digits=16, decimal_places=2, min_value=Decimal("0.00"), default=Decimal("0.00"))
+	taxes = ListField(child=UUIDField(), required=False, default=list)
+	note = CharField(required=False, allow_blank=True, allow_null=True)
+
+class BillCreateSerializer(Serializer):
+	items = BillItemCreateSerializer(many=True, allow_empty=False)
+	additional_discount_percentage = DecimalField(
+		max_digits=5, decimal_places=2, min_value=Decimal("0.00"), max_value=Decimal("100.00"), default=Decimal("0.00")
+	)
+	paid_amount = DecimalField(max_digits=32, decimal_places=2, min_value=Decimal("0.00"), default=Decimal("0.00"))
+	note = CharField(required=False, allow_blank=True, allow_null=True)
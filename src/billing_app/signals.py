@@ -0,0 +1,93 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from billing_app.models import ItemTax
+from billing_app.utils import TaxEngine
+from billing_app import logger
+from inventory_app.models import InventoryItem
+
+
+def enqueue_open_bill_recompute(**kwargs) -> None:
+    """
+    Queue `recompute_open_bills` once the current transaction commits.
+    """
+
+    def enqueue():
+        try:
+            from billing_app.jobs import recompute_open_bills
+
+            recompute_open_bills.delay(**kwargs)
+        except Exception as ex:
+            logger.error(f"Could not queue the recompute of open bills ({kwargs}): {ex}")
+
+    transaction.on_commit(enqueue)
+
+
+class ItemTaxSignalHandler:
+    MODEL = ItemTax
+
+    @classmethod
+    def remember_percentage(cls, sender, instance: ItemTax, **kwargs):
+        instance._previous_percentage = (
+            cls.MODEL.objects.filter(pk=instance.pk).values_list("percentage", flat=True).first()
+            if not instance._state.adding
+            else None
+        )
+
+    @classmethod
+    def invalidate_rates(cls, sender, instance: ItemTax, **kwargs):
+        logger.info(f"ItemTax changed: {instance.name}; clearing cached tax rates.")
+        TaxEngine.invalidate()
+
+    @classmethod
+    def recompute_open_bills(cls, sender, instance: ItemTax, created, **kwargs):
+        previous = getattr(instance, "_previous_percentage", None)
+        if created or previous is None or previous == instance.percentage:
+            return
+        logger.info(f"ItemTax {instance.name}: {previous}% -> {instance.percentage}%; recomputing open bills.")
+        enqueue_open_bill_recompute(tax_id=str(instance.pk))
+
+
+class InventoryItemPriceSignalHandler:
+    MODEL = InventoryItem
+
+    @classmethod
+    def remember_price(cls, sender, instance: InventoryItem, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if instance._state.adding or (update_fields is not None and "price" not in update_fields):
+            instance._previous_price = None
+            return
+        instance._previous_price = cls.MODEL.objects.filter(pk=instance.pk).values_list("price", flat=True).first()
+
+    @classmethod
+    def recompute_open_bills(cls, sender, instance: InventoryItem, created, **kwargs):
+        previous = getattr(instance, "_previous_price", None)
+        if created or previous is None or previous == instance.price:
+            return
+        logger.info(f"InventoryItem {instance.name}: price {previous} -> {instance.price}; recomputing open bills.")
+        enqueue_open_bill_recompute(item_id=str(instance.pk))
+
+
+pre_save.connect(
+    ItemTaxSignalHandler.remember_percentage,
+    sender=ItemTaxSignalHandler.MODEL,
+)
+post_save.connect(
+    ItemTaxSignalHandler.invalidate_rates,
+    sender=ItemTaxSignalHandler.MODEL,
+)
+post_save.connect(
+    ItemTaxSignalHandler.recompute_open_bills,
+    sender=ItemTaxSignalHandler.MODEL,
+)
+post_delete.connect(
+    ItemTaxSignalHandler.invalidate_rates,
+    sender=ItemTaxSignalHandler.MODEL,
+)
+pre_save.connect(
+    InventoryItemPriceSignalHandler.remember_price,
+    sender=InventoryItemPriceSignalHandler.MODEL,
+)
+post_save.connect(
+    InventoryItemPriceSignalHandler.recompute_open_bills,
+    sender=InventoryItemPriceSignalHandler.MODEL,
+)
@@ -1,3 +1,224 @@
-from django.test import TestCase
+import random
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import pytest
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from billing_app.model_choices import BillStatusChoices, StockReservationStatusChoices
+from billing_app.models import Bill, BillItem, DailyCategorySales, ItemTax, StockReservation
+from billing_app.helpers import BillHelpers
+from billing_app.utils import SalesRollupEngine, StockReservationEngine, StockShortage, TaxEngine
+from utils.money import MoneyUtils
+
+
+class TestMoneyUtils:
+
+    @pytest.mark.parametrize(
+        "value, cents",
+        [
+            ("10.00", 1000),
+            (Decimal("1.234"), 123),
+            ("0.005", 1),
+            ("0.015", 2),
+            ("0.025", 3),
+            ("-0.025", -3),
+            (1.1, 110),
+            (None, 0),
+        ],
+    )
+    def test_to_cents_rounds_half_away_from_zero(self, value, cents):
+        assert MoneyUtils.to_cents(value) == cents
+
+    def test_from_cents(self):
+        assert MoneyUtils.from_cents(1234) == Decimal("12.34")
+        assert MoneyUtils.from_cents(MoneyUtils.to_cents("99.99")) == Decimal("99.99")
+
+    @pytest.mark.parametrize(
+        "numerator, denominator, quotient",
+        [(5, 2, 3), (7, 2, 4), (-5, 2, -3), (-7, 4, -2), (10, 4, 3), (11, 4, 3), (9, 3, 3)],
+    )
+    def test_divide_rounds_half_away_from_zero(self, numerator, denominator, quotient):
+        assert MoneyUtils.divide(numerator, denominator) == quotient
+
+    def test_compound_and_simple_ratios(self):
+        ## 10% then 5%.
+        assert MoneyUtils.apply_ratio(1000, MoneyUtils.compound_ratio([1000, 500])) == 1155
+        assert MoneyUtils.apply_ratio(1000, MoneyUtils.simple_ratio([1000, 500])) == 1150
+
+    def test_apply_ratio_rounds_once_after_subtracting(self):
+        ## 333 * 1.05 = 349.65
+        assert MoneyUtils.apply_ratio(333, MoneyUtils.simple_ratio([500])) == 350
+        ## 1.00 at 2.5% is 1.025, which a numeric(32, 2) column stores as 1.03.
+        assert MoneyUtils.apply_ratio(100, MoneyUtils.simple_ratio([250])) == 103
+        ## 1 * 0.5 - 1 = -0.5 rounds to -1; rounding 0.5 before subtracting would give 0.
+        assert MoneyUtils.apply_ratio(1, (1, 2), less=1) == -1
+
+
+@pytest.mark.django_db
+class TestBillTotalsMatchTheSaveBasedPath:
+    """
+    Totals computed in integer cents against what the `Decimal` code before `BillTotalsEngine`
+    wrote: exact amounts, rounded to a cent by the `numeric(32, 2)` columns themselves.
+    """
+
+    @staticmethod
+    def write_legacy_totals(bill: Bill) -> tuple[list[Decimal], Decimal]:
+        """
+        `BillItem.save()` and `Bill.calculate_totals()` as they were, then the stored results.
+        """
+        lines = list(bill.items.select_related("item").prefetch_related("taxes"))
+        for line in lines:
+            total = line.item.price * line.quantity
+            for tax in line.taxes.all():
+                total += (total * tax.percentage) / 100
+            total -= line.discount
+            BillItem.objects.filter(pk=line.pk).update(total=total)
+
+        total_amount = BillItem.objects.filter(bill=bill).aggregate(total=Sum("total"))["total"] or 0
+        total_amount -= (total_amount * bill.additional_discount_percentage) / 100
+        Bill.objects.filter(pk=bill.pk).update(total_amount=total_amount)
+
+        bill.refresh_from_db()
+        return [line.total for line in bill.items], bill.total_amount
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_random_bills(self, settings, make_item, seed):
+        settings.TAX_CALCULATION_MODE = "compound"
+        rng = random.Random(seed)
+        ## Percentages with half cents in them, so ties turn up often.
+        taxes = [
+            ItemTax.objects.create(name=f"tax-{percentage}", percentage=Decimal(percentage))
+            for percentage in ("2.50", "12.50", "5.00", "0.25")
+        ]
+
+        bill = Bill.objects.create(additional_discount_percentage=Decimal(rng.randrange(0, 2000)) / 100)
+        ## 1.00 at 2.5% is 1.025: the column stored 1.03.
+        line = BillItem.objects.create(bill=bill, item=make_item(price="1.00"), quantity=1)
+        line.taxes.add(taxes[0])
+        for _ in range(rng.randrange(1, 8)):
+            item = make_item(price=str(Decimal(rng.randrange(1, 10**6)) / 100))
+            line = BillItem.objects.create(
+                bill=bill, item=item, quantity=rng.randrange(1, 50), discount=Decimal(rng.randrange(0, 500)) / 100
+            )
+            line.taxes.add(*rng.sample(taxes, rng.randrange(0, len(taxes) + 1)))
+        bill.save()
+        bill.refresh_from_db()
+        engine_totals = ([line.total for line in bill.items], bill.total_amount)
+
+        assert self.write_legacy_totals(bill) == engine_totals
+
+
+@pytest.mark.django_db
+class TestStockReservation:
+
+    def test_reserve_takes_stock_and_release_puts_it_back(self, make_item, make_bill):
+        item = make_item(quantity=10)
+        bill = make_bill((item, 3))
+
+        reservations = StockReservationEngine.reserve(bill)
+        item.refresh_from_db()
+        assert [(reservation.item_id, reservation.quantity) for reservation in reservations] == [(item.id, 3)]
+        assert item.quantity == 7
+
+        assert StockReservationEngine.release(bill) == 1
+        item.refresh_from_db()
+        assert item.quantity == 10
+        assert not StockReservation.objects.filter(bill=bill, status=StockReservationStatusChoices.ACTIVE).exists()
+
+    def test_reserving_again_replaces_the_previous_reservation(self, make_item, make_bill):
+        item = make_item(quantity=10)
+        bill = make_bill((item, 3))
+
+        StockReservationEngine.reserve(bill)
+        StockReservationEngine.reserve(bill)
+        item.refresh_from_db()
+        assert item.quantity == 7
+        assert StockReservation.objects.filter(bill=bill, status=StockReservationStatusChoices.ACTIVE).count() == 1
+
+    def test_shortage_takes_nothing(self, make_item, make_bill):
+        plenty, scarce = make_item(quantity=10), make_item(quantity=1)
+        bill = make_bill((plenty, 3), (scarce, 2))
+
+        with pytest.raises(StockShortage) as shortage:
+            StockReservationEngine.reserve(bill)
+
+        assert shortage.value.shortages == [{"item": scarce.id, "requested": 2, "available": 1}]
+        plenty.refresh_from_db()
+        scarce.refresh_from_db()
+        assert (plenty.quantity, scarce.quantity) == (10, 1)
+        assert not StockReservation.objects.filter(bill=bill).exists()
+
+    def test_finalize_consumes_the_reservation(self, make_item, make_bill):
+        item = make_item(quantity=10)
+        bill = make_bill((item, 3))
+        StockReservationEngine.reserve(bill)
+
+        StockReservationEngine.finalize(bill)
+        item.refresh_from_db()
+        bill.refresh_from_db()
+        assert item.quantity == 7
+        assert bill.status == BillStatusChoices.FINALIZED
+        assert StockReservation.objects.get(bill=bill).status == StockReservationStatusChoices.CONSUMED
+
+    def test_release_expired_only_restocks_expired_reservations(self, make_item, make_bill):
+        item = make_item(quantity=10)
+        expired, current = make_bill((item, 2)), make_bill((item, 3))
+        StockReservationEngine.reserve(expired)
+        StockReservationEngine.reserve(current)
+        StockReservation.objects.filter(bill=expired).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        assert StockReservationEngine.release_expired() == 1
+        item.refresh_from_db()
+        assert item.quantity == 7
+        assert StockReservation.objects.get(bill=expired).status == StockReservationStatusChoices.RELEASED
+        assert StockReservation.objects.get(bill=current).status == StockReservationStatusChoices.ACTIVE
+
+
+@pytest.mark.django_db
+class TestSalesRollup:
+
+    def finalized_bill(self, make_item, make_bill, finalized_at):
+        bill = make_bill((make_item(price="10.00"), 2))
+        Bill.objects.filter(pk=bill.pk).update(status=BillStatusChoices.FINALIZED, finalized_at=finalized_at)
+        return bill
+
+    def test_bills_are_rolled_up_once_under_a_null_category(self, make_item, make_bill):
+        now = timezone.now()
+        self.finalized_bill(make_item, make_bill, now)
+        self.finalized_bill(make_item, make_bill, now)
+
+        assert SalesRollupEngine.run() == 2
+        assert SalesRollupEngine.run() == 0
+        row = DailyCategorySales.objects.get(category=None)
+        assert (row.line_count, row.quantity, row.gross_amount) == (2, 4, Decimal("40.00"))
+
+    def test_bill_committed_after_later_ones_is_still_rolled_up(self, make_item, make_bill):
+        now = timezone.now()
+        self.finalized_bill(make_item, make_bill, now)
+        assert SalesRollupEngine.run() == 1
+
+        ## Finalized an hour ago, but only committed now.
+        late = self.finalized_bill(make_item, make_bill, now - timedelta(hours=1))
+        assert SalesRollupEngine.run() == 1
+        late.refresh_from_db()
+        assert late.rolled_up_at is not None
+
+
+@pytest.mark.django_db
+class TestBillCreation:
+
+    def test_tax_deleted_after_it_was_cached_is_refused(self, make_item):
+        item = make_item(price="10.00")
+        tax = ItemTax.objects.create(name="vat", percentage=Decimal("5.00"))
+        TaxEngine.rates([tax.id])
+        ## Deleted by another worker: this one's cache is not invalidated until its next generation check.
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {ItemTax._meta.db_table} WHERE id = %s", [tax.id])
+
+        resp = BillHelpers.create(data={"items": [{"item": str(item.id), "quantity": 1, "taxes": [str(tax.id)]}]})
+
+        assert resp.status_code == 400
+        assert not Bill.objects.exists()
@@ -0,0 +1,969 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from typing import Iterable
+
+from django.conf import settings as django_settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import BigIntegerField, Exists, F, OuterRef, Q, QuerySet, Sum
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from billing_app.constants import TaxModes
+from billing_app.model_choices import BillStatusChoices, StockReservationStatusChoices
+from billing_app.models import (
+    Bill,
+    BillItem,
+    DailyCategorySales,
+    DailyItemSales,
+    DailyTaxSales,
+    ItemTax,
+    SalesRollupWatermark,
+    StockReservation,
+)
+
+from billing_app import logger
+from inventory_app.models import InventoryItem
+from utils.money import MoneyUtils
+
+
+class BillLine:
+    """
+    The fields of a `BillItem` that its total depends on, loaded without building a model instance.
+
+    `discount`, `total` and `price` are in cents.
+    """
+    __slots__ = ("id", "bill_id", "quantity", "discount", "total", "price", "tax_ids")
+
+    def __init__(self, id, bill_id, quantity, discount, total, price) -> None:
+        self.id = id
+        self.bill_id = bill_id
+        self.quantity = quantity
+        self.discount = discount
+        self.total = total
+        self.price = price
+        self.tax_ids = []
+
+
+class TaxEngine:
+    """
+    Effective tax ratios, cached per worker for every distinct set of taxes.
+
+    Bills reuse a handful of tax combinations, so instead of compounding each line's
+    percentages on every save, the ratio of a tax set (its "signature") is computed once, as an
+    exact `(numerator, denominator)` pair of integers, and a line's total in cents becomes
+    `round(price * quantity * ratio - discount)`:
+        - compound mode: the product of `(1 + percentage / 100)`, i.e. each tax applies on top
+          of the previous ones, which is what `BillItem.save()` always did;
+        - simple mode: `1 + sum(percentage) / 100`, every tax applies to the base amount.
+
+    Changing or deleting an `ItemTax` clears the cache in the worker that made the change and
+    bumps a generation counter in Redis; other workers compare it at most every
+    `TAX_ENGINE_GENERATION_CHECK_SECONDS` and drop their cache when it moved.
+    """
+    GENERATION_KEY: str = "billing:tax-engine:generation"
+
+    _rates: dict = {}
+    _ratios: dict = {}
+    _generation = None
+    _generation_checked_at: float = 0.0
+
+    @classmethod
+    def signature(cls, tax_ids: Iterable) -> tuple:
+        return tuple(sorted(set(tax_ids), key=str))
+
+    @classmethod
+    def rates(cls, tax_ids: Iterable) -> dict:
+        """
+        Percentage of each of the given taxes, in basis points; unknown ids are left out.
+
+        Rates missing from the cache are loaded with a single query.
+        """
+        cls._check_generation()
+        tax_ids = set(tax_ids)
+        if missing := [tax_id for tax_id in tax_ids if tax_id not in cls._rates]:
+            cls._load_rates(ItemTax.objects.filter(id__in=missing))
+        return {tax_id: cls._rates[tax_id] for tax_id in tax_ids if tax_id in cls._rates}
+
+    @classmethod
+    def ratio(cls, tax_ids: Iterable, mode: str = None) -> tuple[int, int]:
+        mode = mode or django_settings.TAX_CALCULATION_MODE
+        signature = cls.signature(tax_ids)
+        key = (mode, signature)
+        if (ratio := cls._ratios.get(key)) is not None:
+            return ratio
+
+        basis_points = cls.rates(signature).values()
+        if mode == TaxModes.SIMPLE:
+            ratio = MoneyUtils.simple_ratio(basis_points)
+        elif mode == TaxModes.COMPOUND:
+            ratio = MoneyUtils.compound_ratio(basis_points)
+        else:
+            raise ValueError(f"Unknown tax calculation mode '{mode}'.")
+
+        cls._ratios[key] = ratio
+        return ratio
+
+    @classmethod
+    def line_total(cls, price, quantity: int, tax_ids: Iterable, discount, mode: str = None) -> Decimal:
+        """
+        Total of a single line, taking and returning `DecimalField` values.
+        """
+        return MoneyUtils.from_cents(
+            MoneyUtils.apply_ratio(
+                MoneyUtils.to_cents(price) * quantity, cls.ratio(tax_ids, mode=mode), less=MoneyUtils.to_cents(discount)
+            )
+        )
+
+    @classmethod
+    def line_totals_cents(cls, lines: Iterable[tuple], mode: str = None) -> list[int]:
+        """
+        Totals in cents of a batch of `(price_cents, quantity, tax_ids, discount_cents)` lines.
+
+        Rates of the whole batch are resolved together and each distinct tax set is looked up
+        once, so the per-line cost is a few integer operations.
+        """
+        lines = list(lines)
+        cls.rates({tax_id for _, _, tax_ids, _ in lines for tax_id in tax_ids})
+
+        ratios = {}
+        totals = []
+        for price_cents, quantity, tax_ids, discount_cents in lines:
+            signature = cls.signature(tax_ids)
+            if (ratio := ratios.get(signature)) is None:
+                ratio = ratios[signature] = cls.ratio(signature, mode=mode)
+            totals.append(MoneyUtils.apply_ratio(price_cents * quantity, ratio, less=discount_cents))
+        return totals
+
+    @classmethod
+    def line_totals(cls, lines: Iterable[tuple], mode: str = None) -> list[Decimal]:
+        """
+        `line_totals_cents()` for `(price, quantity, tax_ids, discount)` lines of `DecimalField` values.
+        """
+        return [
+            MoneyUtils.from_cents(total)
+            for total in cls.line_totals_cents(
+                (
+                    (MoneyUtils.to_cents(price), quantity, tax_ids, MoneyUtils.to_cents(discount))
+                    for price, quantity, tax_ids, discount in lines
+                ),
+                mode=mode,
+            )
+        ]
+
+    @classmethod
+    def warm(cls) -> None:
+        """
+        Load every tax rate; the table is small and read on almost every bill.
+        """
+        cls._check_generation()
+        cls._load_rates(ItemTax.objects.all())
+
+    @classmethod
+    def invalidate(cls) -> None:
+        cls.clear()
+        redis_conn = getattr(django_settings, "REDIS_CONN", None)
+        if redis_conn is None:
+            return
+        try:
+            cls._generation = int(redis_conn.incr(cls.GENERATION_KEY))
+            cls._generation_checked_at = time.monotonic()
+        except Exception as ex:
+            logger.warning(f"Could not publish tax cache invalidation: {ex}")
+
+    @classmethod
+    def clear(cls) -> None:
+        cls._rates.clear()
+        cls._ratios.clear()
+
+    @classmethod
+    def _load_rates(cls, queryset) -> None:
+        cls._rates.update(
+            (tax_id, MoneyUtils.to_basis_points(percentage))
+            for tax_id, percentage in queryset.values_list("id", "percentage")
+        )
+
+    @classmethod
+    def _check_generation(cls) -> None:
+        now = time.monotonic()
+        if now - cls._generation_checked_at < django_settings.TAX_ENGINE_GENERATION_CHECK_SECONDS:
+            return
+        cls._generation_checked_at = now
+
+        redis_conn = getattr(django_settings, "REDIS_CONN", None)
+        if redis_conn is None:
+            return
+        try:
+            ## GET answers bytes (or None before the first change) while INCR answers an int.
+            generation = int(redis_conn.get(cls.GENERATION_KEY) or 0)
+        except Exception as ex:
+            ## Cannot tell whether another worker changed a tax; do not trust the cache.
+            logger.warning(f"Could not read tax cache generation: {ex}")
+            cls.clear()
+            return
+
+        if generation != cls._generation:
+            cls.clear()
+            cls._generation = generation
+
+
+def warm_tax_engine() -> None:
+    TaxEngine.warm()
+
+
+class BillTotalsEngine:
+    """
+    Computes line and bill totals for whole bills at once.
+
+    Loading every line of any number of bills takes two queries (lines joined to their item's
+    price, then the line-tax links) and returns amounts as integer cents; line totals come from
+    `TaxEngine` in one batch and are persisted with one `bulk_update` per table.
+    """
+    BULK_UPDATE_BATCH_SIZE: int = 500
+
+    @classmethod
+    def cents(cls, field: str) -> Cast:
+        """
+        A `DecimalField` read as integer cents by the database, so no `Decimal` is ever built for it.
+        """
+        return Cast(F(field) * 100, output_field=BigIntegerField())
+
+    @classmethod
+    def bill_totals_cents(cls, line_totals: Iterable[int], discount_basis_points: int, paid_cents: int) -> tuple[int, int]:
+        """
+        Return `(total_amount, due_amount)` in cents for the given line totals in cents.
+        """
+        total_amount = MoneyUtils.discount(sum(line_totals), discount_basis_points)
+        return total_amount, total_amount - paid_cents
+
+    @classmethod
+    def bill_totals(cls, line_totals: Iterable[Decimal], discount_percentage, paid_amount) -> tuple[Decimal, Decimal]:
+        """
+        `bill_totals_cents()` taking and returning `DecimalField` values.
+        """
+        total_amount, due_amount = cls.bill_totals_cents(
+            (MoneyUtils.to_cents(total) for total in line_totals),
+            MoneyUtils.to_basis_points(discount_percentage),
+            MoneyUtils.to_cents(paid_amount),
+        )
+        return MoneyUtils.from_cents(total_amount), MoneyUtils.from_cents(due_amount)
+
+    @classmethod
+    def load_lines(cls, bill_ids: Iterable) -> dict:
+        """
+        Lines of the given bills, grouped by bill id, with their item price and tax ids.
+
+        Amounts on the returned lines are in cents.
+        """
+        bill_ids = list(bill_ids)
+        lines = {}
+        lines_by_bill = defaultdict(list)
+        rows = (
+            BillItem.objects.filter(bill_id__in=bill_ids)
+            .annotate(
+                discount_cents=cls.cents("discount"),
+                total_cents=cls.cents("total"),
+                price_cents=cls.cents("item__price"),
+            )
+            .values_list("id", "bill_id", "quantity", "discount_cents", "total_cents", "price_cents")
+        )
+        for row in rows:
+            line = BillLine(*row)
+            lines[line.id] = line
+            lines_by_bill[line.bill_id].append(line)
+
+        if lines:
+            tax_links = BillItem.taxes.through.objects.filter(
+                billitem__bill_id__in=bill_ids
+            ).values_list("billitem_id", "itemtax_id")
+            for line_id, tax_id in tax_links:
+                lines[line_id].tax_ids.append(tax_id)
+
+        return lines_by_bill
+
+    @classmethod
+    def recompute(cls, bills: list[Bill]) -> list[Bill]:
+        """
+        Recompute and store the line totals of `bills`, and set (without saving) their
+        `total_amount` and `due_amount`.
+
+        Only lines whose total changed are written.
+        """
+        bills = [bill for bill in bills if bill.pk and not bill._state.adding]
+        if not bills:
+            return bills
+
+        now = timezone.now()
+        lines_by_bill = cls.load_lines([bill.pk for bill in bills])
+        all_lines = [line for lines in lines_by_bill.values() for line in lines]
+        totals = dict(
+            zip(
+                (line.id for line in all_lines),
+                TaxEngine.line_totals_cents(
+                    (line.price, line.quantity, line.tax_ids, line.discount) for line in all_lines
+                ),
+            )
+        )
+
+        changed_lines = []
+        for bill in bills:
+            line_totals = []
+            for line in lines_by_bill.get(bill.pk, ()):
+                total = totals[line.id]
+                if total != line.total:
+                    changed_lines.append(BillItem(id=line.id, total=MoneyUtils.from_cents(total), updated_at=now))
+                line_totals.append(total)
+
+            total_amount, due_amount = cls.bill_totals_cents(
+                line_totals,
+                MoneyUtils.to_basis_points(bill.additional_discount_percentage),
+                MoneyUtils.to_cents(bill.paid_amount),
+            )
+            bill.total_amount = MoneyUtils.from_cents(total_amount)
+            bill.due_amount = MoneyUtils.from_cents(due_amount)
+
+        if changed_lines:
+            BillItem.objects.bulk_update(
+                changed_lines, ["total", "updated_at"], batch_size=cls.BULK_UPDATE_BATCH_SIZE
+            )
+        logger.info(f"Recomputed totals of {len(bills)} bill(s); {len(changed_lines)} line total(s) changed.")
+        return bills
+
+    @classmethod
+    def recompute_and_save(cls, bill_ids: Iterable, skip_locked: bool = False, lock_timeout_ms: int = None) -> int:
+        """
+        Recompute the given bills and persist their totals with a single bill UPDATE.
+
+        With `skip_locked`, bills whose row another transaction holds are left out; with
+        `lock_timeout_ms`, waiting longer than that for a row raises `OperationalError`.
+
+        Returns the number of bills updated.
+        """
+        return len(cls._recompute_and_save(bill_ids, skip_locked=skip_locked, lock_timeout_ms=lock_timeout_ms))
+
+    @classmethod
+    def _recompute_and_save(cls, bill_ids: Iterable, skip_locked: bool = False, lock_timeout_ms: int = None) -> set:
+        with transaction.atomic():
+            if lock_timeout_ms:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT set_config('lock_timeout', %s, true)", [f"{int(lock_timeout_ms)}ms"])
+            bills = Bill.objects.filter(pk__in=list(bill_ids))
+            if skip_locked or lock_timeout_ms:
+                bills = bills.select_for_update(skip_locked=skip_locked)
+            bills = list(
+                bills.only("id", "additional_discount_percentage", "paid_amount", "total_amount", "due_amount")
+            )
+            cls.recompute(bills)
+            if not bills:
+                return set()
+
+            now = timezone.now()
+            for bill in bills:
+                bill.updated_at = now
+            Bill.objects.bulk_update(
+                bills, ["total_amount", "due_amount", "updated_at"], batch_size=cls.BULK_UPDATE_BATCH_SIZE
+            )
+        return {bill.pk for bill in bills}
+
+    @classmethod
+    def open_bills(cls, tax_id=None, item_id=None) -> QuerySet:
+        """
+        Draft bills with an amount due, optionally only those with a line using `tax_id` or `item_id`.
+
+        Finalized bills are issued documents (and already in the sales rollups), so price and
+        tax changes never touch them.
+        """
+        bills = Bill.objects.filter(status=BillStatusChoices.DRAFT, due_amount__gt=0)
+        if tax_id:
+            bills = bills.filter(Exists(BillItem.objects.filter(bill=OuterRef("pk"), taxes=tax_id)))
+        if item_id:
+            bills = bills.filter(Exists(BillItem.objects.filter(bill=OuterRef("pk"), item_id=item_id)))
+        return bills
+
+    @classmethod
+    def recompute_open_bills(
+        cls, tax_id=None, item_id=None, chunk_size: int = None, throttle: float = None, progress=None
+    ) -> tuple[int, int]:
+        """
+        Recompute every open bill affected by a change to a tax or an item's price.
+
+        Bills are walked in primary-key order, one chunk per short transaction, sleeping
+        `throttle` seconds in between so that billing traffic is never blocked for long.
+        `progress(recomputed, chunks)` is called after every chunk.
+
+        Bills locked at that moment (a reservation, a finalize or a payment in flight, none of
+        which recompute totals) are skipped without waiting and retried one by one afterwards
+        by `retry_locked_bills()`. Returns `(recomputed, skipped)`, `skipped` being the bills
+        still locked after every retry.
+        """
+        chunk_size = chunk_size or django_settings.BILL_RECOMPUTE_CHUNK_SIZE
+        throttle = django_settings.BILL_RECOMPUTE_THROTTLE_SECONDS if throttle is None else throttle
+        ## Rates may have changed in another process moments ago.
+        TaxEngine.clear()
+
+        bills = cls.open_bills(tax_id=tax_id, item_id=item_id).order_by("pk")
+        recomputed, chunks, last_id, skipped = 0, 0, None, []
+        while True:
+            chunk = bills.filter(pk__gt=last_id) if last_id else bills
+            bill_ids = list(chunk.values_list("pk", flat=True)[:chunk_size])
+            if not bill_ids:
+                break
+
+            last_id = bill_ids[-1]
+            saved = cls._recompute_and_save(bill_ids, skip_locked=True)
+            recomputed += len(saved)
+            skipped.extend(bill_id for bill_id in bill_ids if bill_id not in saved)
+            chunks += 1
+            if progress:
+                progress(recomputed, chunks)
+            if len(bill_ids) < chunk_size:
+                break
+            if throttle:
+                time.sleep(throttle)
+
+        retried, still_locked = cls.retry_locked_bills(skipped)
+        recomputed += retried
+        if progress and retried:
+            progress(recomputed, chunks)
+
+        logger.info(
+            f"Recomputed {recomputed} open bill(s) in {chunks} chunk(s) (tax: {tax_id}, item: {item_id}); "
+            f"{len(skipped)} were locked, {len(still_locked)} still are."
+        )
+        if still_locked:
+            logger.error(f"Could not lock {len(still_locked)} open bill(s) to recompute: {still_locked}")
+        return recomputed, len(still_locked)
+
+    @classmethod
+    def retry_locked_bills(cls, bill_ids: list) -> tuple[int, list]:
+        """
+        Recompute bills that were locked, one per transaction, waiting at most
+        `BILL_RECOMPUTE_LOCK_TIMEOUT_MS` for each, over `BILL_RECOMPUTE_LOCK_RETRIES` rounds.
+
+        Returns `(recomputed, ids still locked)`.
+        """
+        recomputed, pending = 0, list(bill_ids)
+        for attempt in range(django_settings.BILL_RECOMPUTE_LOCK_RETRIES):
+            ## Bills finalized or paid off meanwhile no longer need it.
+            pending = list(cls.open_bills().filter(pk__in=pending).order_by("pk").values_list("pk", flat=True))
+            if not pending:
+                break
+            if attempt:
+                time.sleep(django_settings.BILL_RECOMPUTE_LOCK_TIMEOUT_MS / 1000)
+
+            locked = []
+            for bill_id in pending:
+                try:
+                    recomputed += cls.recompute_and_save(
+                        [bill_id], lock_timeout_ms=django_settings.BILL_RECOMPUTE_LOCK_TIMEOUT_MS
+                    )
+                except OperationalError:
+                    locked.append(bill_id)
+            pending = locked
+        return recomputed, pending
+
+
+class BillStateError(Exception):
+    """
+    The bill is not in a state that allows the operation (e.g. finalizing a finalized bill).
+    """
+
+
+class StockShortage(Exception):
+    """
+    Some items of a bill do not have enough stock; `shortages` lists `{item, requested, available}`.
+    """
+
+    def __init__(self, shortages: list[dict]) -> None:
+        self.shortages = shortages
+        super().__init__(f"Insufficient stock for {len(shortages)} item(s).")
+
+
+class StockReservationEngine:
+    """
+    Takes stock for bills with set-based statements instead of per-item read-modify-write.
+
+    Every decrement is one `UPDATE ... FROM (VALUES ...) WHERE quantity >= requested`: an item
+    without enough stock is simply not updated, so nothing is read first and no row stays
+    locked beyond the statement's own transaction. When any item is short the whole transaction
+    is rolled back and `StockShortage` reports what was missing. Every statement that changes
+    quantities first locks its items in id order (`LOCK_ITEMS_SQL`), so bills sharing items
+    listed in a different order wait for each other instead of deadlocking.
+
+    Reservations hold stock for draft bills until they are finalized or `expires_at` passes;
+    `release_expired()` puts expired stock back, skipping rows another transaction holds.
+    """
+    SWEEP_BATCH_SIZE: int = 1000
+
+    LOCK_ITEMS_SQL: str = """
+        SELECT id FROM {item_table} WHERE id = ANY(%s::uuid[]) ORDER BY id FOR UPDATE
+    """
+
+    DECREMENT_SQL: str = """
+        UPDATE {item_table} AS item
+        SET quantity = item.quantity - requested.quantity, updated_at = %s
+        FROM (VALUES {values}) AS requested (id, quantity)
+        WHERE item.id = requested.id AND item.quantity >= requested.quantity
+        RETURNING item.id
+    """
+
+    RESTOCK_SQL: str = """
+        UPDATE {item_table} AS item
+        SET quantity = item.quantity + returned.quantity, updated_at = %s
+        FROM (VALUES {values}) AS returned (id, quantity)
+        WHERE item.id = returned.id
+        RETURNING item.id
+    """
+
+    RELEASE_EXPIRED_SQL: str = """
+        WITH expired AS (
+            SELECT id, item_id, quantity FROM {reservation_table}
+            WHERE status = %s AND expires_at <= %s
+            ORDER BY expires_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE {reservation_table} AS reservation
+        SET status = %s, updated_at = %s
+        FROM expired
+        WHERE reservation.id = expired.id
+        RETURNING expired.item_id, expired.quantity
+    """
+
+    @classmethod
+    def requested_quantities(cls, bill_id) -> dict:
+        """
+        Quantity of each item on a bill, summed over its lines.
+        """
+        return dict(
+            BillItem.objects.filter(bill_id=bill_id)
+            .values("item_id")
+            .annotate(requested=Sum("quantity"))
+            .values_list("item_id", "requested")
+        )
+
+    @classmethod
+    def decrement(cls, quantities: dict) -> None:
+        """
+        Take `{item_id: quantity}` out of stock, or raise `StockShortage`.
+
+        Must be called inside a transaction, which rolls back on `StockShortage`.
+        """
+        quantities = {item_id: quantity for item_id, quantity in quantities.items() if quantity > 0}
+        if not quantities:
+            return
+
+        updated = cls._update_quantities(cls.DECREMENT_SQL, quantities)
+        if missing := [item_id for item_id in quantities if item_id not in updated]:
+            available = dict(InventoryItem.objects.filter(id__in=missing).values_list("id", "quantity"))
+            raise StockShortage(
+                [
+                    {"item": item_id, "requested": quantities[item_id], "available": available.get(item_id, 0)}
+                    for item_id in missing
+                ]
+            )
+
+    @classmethod
+    def restock(cls, quantities: dict) -> None:
+        quantities = {item_id: quantity for item_id, quantity in quantities.items() if quantity > 0}
+        if quantities:
+            cls._update_quantities(cls.RESTOCK_SQL, quantities)
+
+    @classmethod
+    def _update_quantities(cls, sql: str, quantities: dict) -> set:
+        item_table = connection.ops.quote_name(InventoryItem._meta.db_table)
+        item_ids = sorted(quantities, key=str)
+        sql = sql.format(item_table=item_table, values=", ".join(["(%s::uuid, %s::integer)"] * len(item_ids)))
+        params = [timezone.now()]
+        for item_id in item_ids:
+            params.extend((item_id, quantities[item_id]))
+
+        with connection.cursor() as cursor:
+            ## An UPDATE locks rows in whatever order its plan visits them; take the locks in id order first.
+            cursor.execute(cls.LOCK_ITEMS_SQL.format(item_table=item_table), [[str(item_id) for item_id in item_ids]])
+            cursor.execute(sql, params)
+            return {row[0] for row in cursor.fetchall()}
+
+    @classmethod
+    def _lock_draft(cls, bill: Bill, **changes) -> None:
+        """
+        Lock a draft bill's row for the rest of the transaction, applying `changes` to it.
+        """
+        changes.setdefault("updated_at", timezone.now())
+        if not Bill.objects.filter(pk=bill.pk, status=BillStatusChoices.DRAFT).update(**changes):
+            raise BillStateError(f"Bill '{bill.pk}' is not a draft.")
+
+    @classmethod
+    def reserve(cls, bill: Bill) -> list[StockReservation]:
+        """
+        Hold the stock of every line of a draft bill until `STOCK_RESERVATION_TTL_SECONDS` from now.
+
+        Reserving again (e.g. after the cart changed) releases the bill's previous reservations
+        in the same transaction. Raises `StockShortage` or `BillStateError` like `finalize()`.
+        """
+        expires_at = timezone.now() + timedelta(seconds=django_settings.STOCK_RESERVATION_TTL_SECONDS)
+        with transaction.atomic():
+            cls._lock_draft(bill)
+            cls.release(bill)
+            quantities = cls.requested_quantities(bill.pk)
+            cls.decrement(quantities)
+            return StockReservation.objects.bulk_create(
+                [
+                    StockReservation(bill=bill, item_id=item_id, quantity=quantity, expires_at=expires_at)
+                    for item_id, quantity in quantities.items()
+                ]
+            )
+
+    @classmethod
+    def release(cls, bill: Bill) -> int:
+        """
+        Put the stock of a bill's active reservations back. Returns the number released.
+        """
+        with transaction.atomic():
+            reservations = list(
+                StockReservation.objects.select_for_update()
+                .filter(bill=bill, status=StockReservationStatusChoices.ACTIVE)
+                .values_list("id", "item_id", "quantity")
+            )
+            if not reservations:
+                return 0
+            StockReservation.objects.filter(id__in=[row[0] for row in reservations]).update(
+                status=StockReservationStatusChoices.RELEASED, updated_at=timezone.now()
+            )
+            cls.restock({item_id: quantity for _, item_id, quantity in reservations})
+        return len(reservations)
+
+    @classmethod
+    def finalize(cls, bill: Bill) -> Bill:
+        """
+        Finalize a draft bill: consume its reservations and take whatever they do not cover
+        out of stock in one conditional UPDATE.
+
+        Reservations are consumed even when they already expired but were not swept yet, since
+        their stock was never put back. Raises `StockShortage` (and changes nothing) when an
+        item is short, and `BillStateError` when the bill is not a draft any more.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            cls._lock_draft(bill, status=BillStatusChoices.FINALIZED, finalized_at=now, updated_at=now)
+            reserved = dict(
+                StockReservation.objects.select_for_update()
+                .filter(bill=bill, status=StockReservationStatusChoices.ACTIVE)
+                .values_list("item_id", "quantity")
+            )
+            requested = cls.requested_quantities(bill.pk)
+
+            cls.decrement(
+                {item_id: quantity - reserved.get(item_id, 0) for item_id, quantity in requested.items()}
+            )
+            cls.restock(
+                {item_id: quantity - requested.get(item_id, 0) for item_id, quantity in reserved.items()}
+            )
+
+            StockReservation.objects.filter(bill=bill, status=StockReservationStatusChoices.ACTIVE).update(
+                status=StockReservationStatusChoices.CONSUMED, updated_at=now
+            )
+        bill.status = BillStatusChoices.FINALIZED
+        bill.finalized_at = now
+        return bill
+
+    @classmethod
+    def release_expired(cls, batch_size: int = None) -> int:
+        """
+        Release every expired reservation, a batch per statement. Returns the number released.
+
+        Each batch is one transaction: a single statement marks the reservations released, and
+        `restock()` puts their stock back with the items locked in id order like a checkout's.
+        `SKIP LOCKED` leaves reservations being finalized right now to that transaction, so
+        concurrent sweepers never wait on each other.
+        """
+        batch_size = batch_size or cls.SWEEP_BATCH_SIZE
+        sql = cls.RELEASE_EXPIRED_SQL.format(
+            reservation_table=connection.ops.quote_name(StockReservation._meta.db_table),
+        )
+        total = 0
+        while True:
+            now = timezone.now()
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        sql,
+                        [StockReservationStatusChoices.ACTIVE, now, batch_size, StockReservationStatusChoices.RELEASED, now],
+                    )
+                    rows = cursor.fetchall()
+                totals = {}
+                for item_id, quantity in rows:
+                    totals[item_id] = totals.get(item_id, 0) + quantity
+                cls.restock(totals)
+            released = len(rows)
+            total += released
+            if released < batch_size:
+                break
+
+        if total:
+            logger.info(f"Released {total} expired stock reservation(s).")
+        return total
+
+
+class SalesRollupEngine:
+    """
+    Keeps the daily sales rollups (`DailyItemSales`, `DailyCategorySales`, `DailyTaxSales`) up
+    to date, so that revenue reports never aggregate raw bill lines.
+
+    `apply()` claims finalized bills that were not rolled up yet (setting `Bill.rolled_up_at`)
+    and adds their lines to the three tables in a single statement, so a bill is counted
+    exactly once however often it is passed in. With `SALES_ROLLUP_MODE = "inline"` it runs
+    inside the finalize transaction; otherwise `run()` (a cron job, an rq job or the
+    `roll_up_sales` command) picks up every finalized bill whose `rolled_up_at` is still empty.
+    That marker is set in the same transaction as the rollup, so a bill that commits long after
+    its `finalized_at` is still found; the partial index `bill_pending_rollup_idx` holds only
+    such bills, so finding them stays cheap however many were rolled up before.
+    """
+    INLINE: str = "inline"
+    DEFERRED: str = "deferred"
+    WATERMARK_NAME: str = "sales"
+    BATCH_SIZE: int = 1000
+
+    APPLY_SQL: str = """
+        WITH claimed AS (
+            UPDATE {bill} AS bill SET rolled_up_at = %(now)s
+            WHERE bill.id = ANY(%(bill_ids)s) AND bill.status = %(finalized)s AND bill.rolled_up_at IS NULL
+            RETURNING bill.id, bill.finalized_at, bill.additional_discount_percentage
+        ), lines AS (
+            SELECT
+                (claimed.finalized_at AT TIME ZONE %(time_zone)s)::date AS day,
+                line.id AS line_id,
+                line.item_id,
+                item.category_id,
+                line.quantity,
+                line.total AS gross_amount,
+                line.total * (100 - claimed.additional_discount_percentage) / 100 AS net_amount
+            FROM {bill_item} AS line
+            JOIN claimed ON claimed.id = line.bill_id
+            JOIN {item} AS item ON item.id = line.item_id
+        ), item_sales AS (
+            INSERT INTO {daily_item} AS target
+                (id, created_at, updated_at, day, item_id, quantity, line_count, gross_amount, net_amount)
+            SELECT gen_random_uuid(), %(now)s, %(now)s, day, item_id,
+                SUM(quantity), COUNT(*), SUM(gross_amount), SUM(net_amount)
+            FROM lines GROUP BY day, item_id
+            ON CONFLICT (day, item_id) DO UPDATE SET {increments}
+        ), category_sales AS (
+            INSERT INTO {daily_category} AS target
+                (id, created_at, updated_at, day, category_id, quantity, line_count, gross_amount, net_amount)
+            SELECT gen_random_uuid(), %(now)s, %(now)s, day, category_id,
+                SUM(quantity), COUNT(*), SUM(gross_amount), SUM(net_amount)
+            FROM lines GROUP BY day, category_id
+            ON CONFLICT (day, COALESCE(category_id, '{no_category}'::uuid)) DO UPDATE SET {increments}
+        ), tax_sales AS (
+            INSERT INTO {daily_tax} AS target
+                (id, created_at, updated_at, day, tax_id, quantity, line_count, gross_amount, net_amount)
+            SELECT gen_random_uuid(), %(now)s, %(now)s, lines.day, link.itemtax_id,
+                SUM(lines.quantity), COUNT(*), SUM(lines.gross_amount), SUM(lines.net_amount)
+            FROM lines JOIN {bill_item_taxes} AS link ON link.billitem_id = lines.line_id
+            GROUP BY lines.day, link.itemtax_id
+            ON CONFLICT (day, tax_id) DO UPDATE SET {increments}
+        )
+        SELECT COUNT(*) FROM claimed
+    """
+
+    INCREMENTS_SQL: str = """
+        quantity = target.quantity + EXCLUDED.quantity,
+        line_count = target.line_count + EXCLUDED.line_count,
+        gross_amount = target.gross_amount + EXCLUDED.gross_amount,
+        net_amount = target.net_amount + EXCLUDED.net_amount,
+        updated_at = EXCLUDED.updated_at
+    """
+
+    @classmethod
+    def rollup_models(cls) -> tuple:
+        return DailyItemSales, DailyCategorySales, DailyTaxSales
+
+    @classmethod
+    def apply(cls, bill_ids: Iterable) -> int:
+        """
+        Add the given bills to the rollups. Returns how many of them were not rolled up before.
+        """
+        bill_ids = list(bill_ids)
+        if not bill_ids:
+            return 0
+
+        quote = connection.ops.quote_name
+        sql = cls.APPLY_SQL.format(
+            bill=quote(Bill._meta.db_table),
+            bill_item=quote(BillItem._meta.db_table),
+            bill_item_taxes=quote(BillItem.taxes.through._meta.db_table),
+            item=quote(InventoryItem._meta.db_table),
+            daily_item=quote(DailyItemSales._meta.db_table),
+            daily_category=quote(DailyCategorySales._meta.db_table),
+            no_category=DailyCategorySales.NO_CATEGORY,
+            daily_tax=quote(DailyTaxSales._meta.db_table),
+            increments=cls.INCREMENTS_SQL,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql,
+                {
+                    "now": timezone.now(),
+                    "bill_ids": bill_ids,
+                    "finalized": BillStatusChoices.FINALIZED,
+                    "time_zone": django_settings.TIME_ZONE,
+                },
+            )
+            return cursor.fetchone()[0]
+
+    @classmethod
+    def on_finalized(cls, bill: Bill) -> None:
+        if django_settings.SALES_ROLLUP_MODE == cls.INLINE:
+            cls.apply([bill.pk])
+
+    @classmethod
+    def run(cls, batch_size: int = None) -> int:
+        """
+        Roll up every finalized bill not rolled up yet, a keyset batch per transaction.
+
+        The watermark only records the latest `finalized_at` rolled up (for reports); it does
+        not decide which bills are pending. Returns the number of bills rolled up.
+        """
+        batch_size = batch_size or cls.BATCH_SIZE
+        watermark, _ = SalesRollupWatermark.objects.get_or_create(name=cls.WATERMARK_NAME)
+        pending = Bill.objects.filter(status=BillStatusChoices.FINALIZED, rolled_up_at__isnull=True)
+
+        total = 0
+        last = None
+        while True:
+            batch = pending
+            if last:
+                batch = batch.filter(
+                    Q(finalized_at__gt=last[0]) | Q(finalized_at=last[0], id__gt=last[1])
+                )
+            rows = list(batch.order_by("finalized_at", "id").values_list("finalized_at", "id")[:batch_size])
+            if not rows:
+                break
+
+            last = rows[-1]
+            with transaction.atomic():
+                total += cls.apply([bill_id for _, bill_id in rows])
+                SalesRollupWatermark.objects.filter(pk=watermark.pk).filter(
+                    Q(last_finalized_at__isnull=True) | Q(last_finalized_at__lte=last[0])
+                ).update(last_finalized_at=last[0], last_bill_id=last[1], updated_at=timezone.now())
+            if len(rows) < batch_size:
+                break
+
+        if total:
+            logger.info(f"Rolled up sales of {total} bill(s).")
+        return total
+
+    @classmethod
+    def rebuild(cls, since: date = None, batch_size: int = None) -> int:
+        """
+        Drop the rollups from `since` (everything when `None`) and roll those bills up again.
+
+        Reports over the rebuilt days are incomplete until the rebuild finishes.
+        """
+        with transaction.atomic():
+            bills = Bill.objects.filter(status=BillStatusChoices.FINALIZED)
+            for model in cls.rollup_models():
+                rows = model.objects.all()
+                if since:
+                    rows = rows.filter(day__gte=since)
+                rows.delete()
+
+            if since:
+                bills = bills.filter(finalized_at__gte=timezone.make_aware(datetime.combine(since, dt_time.min)))
+            bills.filter(rolled_up_at__isnull=False).update(rolled_up_at=None)
+            SalesRollupWatermark.objects.filter(name=cls.WATERMARK_NAME).delete()
+
+        return cls.run(batch_size=batch_size)
+
+
+class BillNumberAllocator:
+    """
+    Hands out human-readable bill numbers from blocks leased in bulk ("hi/lo" allocation).
+
+    Each process leases a block of numbers at a time, with one `nextval()` on a Postgres sequence
+    that increments by the block size or one `INCRBY` of `BILL_NUMBER_BLOCK_SIZE` on a Redis counter
+    (`BILL_NUMBER_BACKEND`), and then numbers bills from memory. The sequence and its increment are
+    created by a migration; the allocator never runs DDL. Checkouts therefore never wait
+    on each other, and only one in every block size of them makes a round trip.
+
+    Numbers are unique but neither gap-free nor in creation order across processes:
+        - the unused rest of a block is lost when its process exits, so a restart leaves a gap
+          of up to `block size - 1`; a block size of 1 avoids that at one round trip per bill;
+        - like any sequence, a number taken by a transaction that rolls back is not reused;
+        - two workers number their bills from different blocks at the same time.
+    """
+    POSTGRES: str = "postgres"
+    REDIS: str = "redis"
+    SEQUENCE_NAME: str = "billing_bill_number_seq"
+    REDIS_KEY: str = "billing:bill-number"
+
+    _default = None
+
+    def __init__(self, backend: str = None, block_size: int = None) -> None:
+        self.backend = backend or django_settings.BILL_NUMBER_BACKEND
+        self.block_size = max(int(block_size or django_settings.BILL_NUMBER_BLOCK_SIZE), 1)
+        self.leases = 0
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def default(cls) -> "BillNumberAllocator":
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    @classmethod
+    def allocate(cls) -> int:
+        return cls.default().next()
+
+    def reset(self) -> None:
+        """
+        Forget the current block; the next number comes from a new lease.
+        """
+        self._next = 0
+        self._end = -1
+
+    def next(self) -> int:
+        with self._lock:
+            if self._next > self._end:
+                self._next, self._end = self._lease()
+                self.leases += 1
+            number = self._next
+            self._next += 1
+            return number
+
+    def _lease(self) -> tuple[int, int]:
+        """
+        Lease a new block; returns its first and last number.
+        """
+        if self.backend == self.REDIS:
+            end = int(django_settings.REDIS_CONN.incrby(self.REDIS_KEY, self.block_size))
+            return end - self.block_size + 1, end
+        if self.backend == self.POSTGRES:
+            return self._lease_from_sequence()
+        raise ValueError(f"Unknown bill number backend '{self.backend}'.")
+
+    def _lease_from_sequence(self) -> tuple[int, int]:
+        with connection.cursor() as cursor:
+            ## The block is whatever the sequence increments by, read with the value, so blocks
+            ## stay disjoint even while a migration changes the increment under running processes.
+            cursor.execute(
+                "SELECT nextval(%s), increment_by FROM pg_sequences "
+                "WHERE schemaname = current_schema() AND sequencename = %s",
+                [self.SEQUENCE_NAME, self.SEQUENCE_NAME],
+            )
+            end, increment = cursor.fetchone()
+        return end - increment + 1, end
+
+
+def _reset_bill_number_allocator() -> None:
+    ## A forked worker must not hand out what is left of the master's block.
+    if BillNumberAllocator._default is not None:
+        BillNumberAllocator._default.reset()
+
+
+os.register_at_fork(after_in_child=_reset_bill_number_allocator)
@@ -0,0 +1,65 @@
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def fast_password_hashing(settings):
+    ## Production iteration counts would dominate the run; no test measures hashing.
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@pytest.fixture
+def redis_conn(settings):
+    """
+    The configured Redis client; tests that need one are skipped without it.
+    """
+    redis_conn = getattr(settings, 'REDIS_CONN', None)
+    if redis_conn is None:
+        pytest.skip("USE_REDIS is off.")
+    try:
+        redis_conn.ping()
+    except Exception as ex:
+        pytest.skip(f"Redis is unreachable: {ex}")
+    return redis_conn
+
+
+@pytest.fixture
+def no_redis(settings):
+    """
+    Run the test as if USE_REDIS were off.
+    """
+    del settings.REDIS_CONN
+
+
+@pytest.fixture
+def make_item(db):
+    from inventory_app.models import InventoryItem
+
+    def make(price: str = "10.00", quantity: int = 10) -> InventoryItem:
+        item = InventoryItem(
+            name=f"item-{uuid4().hex[:12]}", sku=uuid4().hex[:12], price=Decimal(price), quantity=quantity
+        )
+        ## `InventoryItem.save()` assigns the `None` that `clean_text_attribute()` returns to `name`.
+        InventoryItem.objects.bulk_create([item])
+        return item
+
+    return make
+
+
+@pytest.fixture
+def make_bill(db):
+    from billing_app.models import Bill, BillItem
+
+    def make(*lines) -> Bill:
+        """
+        A draft bill with a line per `(item, quantity)`, its totals computed.
+        """
+        bill = Bill.objects.create()
+        for item, quantity in lines:
+            BillItem.objects.create(bill=bill, item=item, quantity=quantity)
+        bill.save()
+        return bill
+
+    return make
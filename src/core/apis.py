@@ -0,0 +1,31 @@
+from django.db import connections
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.boilerplate.response_template import Resp
+from utils.db_pool import DatabasePoolUtils
+
+from core import logger
+
+
+class DatabasePoolStatsAPI(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request: Request) -> Response:
+        resp = Resp()
+        alias = request.query_params.get("alias", "default")
+        if alias not in connections:
+            resp.error = "Invalid database alias."
+            resp.message = f"No database is configured under the alias '{alias}'."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp.to_response()
+
+        resp.message = f"Connection stats for database '{alias}' fetched successfully."
+        resp.data = DatabasePoolUtils.get_stats(alias=alias)
+        resp.status_code = status.HTTP_200_OK
+        return resp.to_response()
@@ -10,8 +10,13 @@ DEFAULT_APPS = [
 THIRD_PARTY_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
+    'adrf',
+    'django_rq',
 ]
 
 CUSTOM_APPS = [
-    'auth_app.apps.AuthAppConfig'
+    'auth_app.apps.AuthAppConfig',
+    'inventory_app.apps.InventoryAppConfig',
+    'billing_app.apps.BillingAppConfig',
+    'payment_app.apps.PaymentAppConfig',
 ]
\ No newline at end of file
@@ -0,0 +1,25 @@
+from functools import lru_cache
+
+from django.conf import settings as django_settings
+from django.http import HttpRequest
+
+
+@lru_cache(maxsize=1)
+def get_internal_ips() -> frozenset:
+    """
+    `INTERNAL_IPS` plus the gateway of every network this host is on (e.g. Docker's bridge),
+    resolved once on first use rather than when settings are imported.
+    """
+    import socket
+
+    _, _, ips = socket.gethostbyname_ex(socket.gethostname())
+    return frozenset(
+        [ip[: ip.rfind(".")] + ".1" for ip in ips] + list(django_settings.INTERNAL_IPS)
+    )
+
+
+def show_toolbar(request: HttpRequest) -> bool:
+    """
+    `SHOW_TOOLBAR_CALLBACK` for django-debug-toolbar.
+    """
+    return django_settings.DEBUG and request.META.get("REMOTE_ADDR") in get_internal_ips()
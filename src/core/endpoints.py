@@ -0,0 +1,9 @@
+from django.urls import path
+from core.apis import DatabasePoolStatsAPI
+
+
+PREFIX = "api/core/"
+
+urlpatterns = [
+    path('db-pool/', DatabasePoolStatsAPI.as_view(), name='database-pool-stats'),
+]
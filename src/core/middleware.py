@@ -14,6 +14,7 @@ THIRD_PARTY_MIDDLEWARE = [
 ]
 
 CUSTOM_MIDDLEWARE = [
+    'core.middlewares.replica_pinning.ReplicaPinningMiddleware',
     'middleware_app.middlewares.ip_checker.IpAddressChecker',
     'middleware_app.middlewares.request_logger.RequestLogger',
 ]
\ No newline at end of file
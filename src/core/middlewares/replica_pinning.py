@@ -0,0 +1,91 @@
+import base64
+import json
+
+from django.conf import settings as django_settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest, HttpResponse
+
+from core.routers import ReplicaRoutingState, _routing_state
+
+from core import logger
+
+
+class ReplicaPinningMiddleware:
+    """
+    Sets up read routing for each request and gives users read-your-writes consistency.
+
+    When a request writes, its user is pinned to the primary in Redis for
+    `DB_READ_YOUR_WRITES_SECONDS`, so their next reads do not hit a replica that has not
+    replayed that write yet. The pin applies to every worker since it lives in Redis.
+    """
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+    KEY_PREFIX: str = "db:primary-pin:"
+
+    def __init__(self, get_response) -> None:
+        if not django_settings.DB_REPLICA_ALIASES:
+            raise MiddlewareNotUsed("No read replicas configured.")
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        user_key = self.get_user_key(request)
+        read_only = request.method in self.SAFE_METHODS
+        state = ReplicaRoutingState(
+            user_key=user_key,
+            read_only=read_only,
+            pinned=read_only and self.is_pinned(user_key),
+        )
+
+        token = _routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+            if state.wrote:
+                self.pin(user_key)
+        return response
+
+    @classmethod
+    def get_user_key(cls, request: HttpRequest) -> str:
+        """
+        Identify the caller without touching the database.
+
+        The user id is read from the bearer token's claims WITHOUT verifying it: it only decides
+        where reads are routed, and a forged token can at worst send its own reads to the primary.
+        Anonymous callers are keyed by IP address.
+        """
+        header = request.META.get("HTTP_AUTHORIZATION", "")
+        if header.startswith("Bearer "):
+            try:
+                payload = header.split(" ", 1)[1].split(".")[1]
+                payload += "=" * (-len(payload) % 4)
+                claims = json.loads(base64.urlsafe_b64decode(payload))
+                user_id = claims.get(django_settings.SIMPLE_JWT.get("USER_ID_CLAIM", "user_id"))
+                if user_id:
+                    return f"user:{user_id}"
+            except (IndexError, ValueError, AttributeError):
+                pass
+        return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+    @classmethod
+    def is_pinned(cls, user_key: str) -> bool:
+        redis_conn = getattr(django_settings, "REDIS_CONN", None)
+        if redis_conn is None:
+            return False
+        try:
+            return bool(redis_conn.exists(f"{cls.KEY_PREFIX}{user_key}"))
+        except Exception as ex:
+            ## Without Redis we cannot tell whether the user just wrote; stay consistent.
+            logger.warning(f"Could not read primary pin for '{user_key}': {ex}")
+            return True
+
+    @classmethod
+    def pin(cls, user_key: str) -> None:
+        redis_conn = getattr(django_settings, "REDIS_CONN", None)
+        if redis_conn is None:
+            return
+        try:
+            redis_conn.set(
+                f"{cls.KEY_PREFIX}{user_key}", 1, ex=django_settings.DB_READ_YOUR_WRITES_SECONDS
+            )
+        except Exception as ex:
+            logger.warning(f"Could not pin '{user_key}' to the primary: {ex}")
@@ -0,0 +1,9 @@
+"""
+Loaded by `pytest.ini` (`-p core.pytest_plugin`) before pytest-django imports the settings.
+"""
+from pathlib import Path
+
+from dotenv import read_dotenv
+
+## Like `manage.py`: the settings read their environment from `src/.env`. A conftest is imported too late for this.
+read_dotenv(str(Path(__file__).resolve().parent.parent / ".env"))
@@ -0,0 +1,113 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings as django_settings
+from django.db import connections
+
+from core import logger
+
+
+class ReplicaRoutingState:
+    """
+    Routing decisions for the request currently being served.
+
+    `read_only` is set for safe HTTP methods; `pinned` sends every read to the primary, either
+    because the user wrote recently or because this very request has already written.
+    """
+
+    def __init__(self, user_key: str = None, read_only: bool = False, pinned: bool = False) -> None:
+        self.user_key = user_key
+        self.read_only = read_only
+        self.pinned = pinned
+        self.wrote = False
+
+
+_routing_state: ContextVar = ContextVar("replica_routing_state", default=None)
+
+
+class ReplicaLagMonitor:
+    """
+    Per-worker view of how far each replica is behind the primary.
+
+    Lag is sampled at most once every `DB_REPLICA_LAG_CHECK_INTERVAL` seconds per replica, so
+    routing a read normally costs a dictionary lookup.
+    """
+    ## A replica that has replayed everything it received is not lagging, no matter how old
+    ## its last replayed transaction is; otherwise the lag is the age of that transaction.
+    LAG_QUERY: str = (
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM (now() - pg_last_xact_replay_timestamp())), 0) END"
+    )
+    _samples: dict = {}
+
+    @classmethod
+    def get_lag(cls, alias: str):
+        """
+        Seconds the replica is behind, or `None` if it could not be reached.
+        """
+        now = time.monotonic()
+        sample = cls._samples.get(alias)
+        if sample and now - sample[0] < django_settings.DB_REPLICA_LAG_CHECK_INTERVAL:
+            return sample[1]
+
+        lag = None
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(cls.LAG_QUERY)
+                lag = float(cursor.fetchone()[0])
+        except Exception as ex:
+            logger.warning(f"Could not read replication lag of '{alias}': {ex}")
+
+        cls._samples[alias] = (now, lag)
+        return lag
+
+    @classmethod
+    def healthy_replicas(cls) -> list:
+        healthy = []
+        for alias in django_settings.DB_REPLICA_ALIASES:
+            lag = cls.get_lag(alias)
+            if lag is not None and lag <= django_settings.DB_REPLICA_MAX_LAG_SECONDS:
+                healthy.append(alias)
+        return healthy
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends reads of safe requests to a replica and everything else to the primary.
+
+    Reads go to the primary when:
+        - they happen outside an HTTP request (management commands, rq jobs);
+        - the request is not a GET/HEAD/OPTIONS;
+        - the user wrote within the last `DB_READ_YOUR_WRITES_SECONDS`, or this request already wrote;
+        - the primary connection is inside a transaction;
+        - no replica is within `DB_REPLICA_MAX_LAG_SECONDS` of the primary.
+    """
+    PRIMARY: str = "default"
+
+    def db_for_read(self, model, **hints):
+        state: ReplicaRoutingState = _routing_state.get()
+        if state is None or not state.read_only or state.pinned:
+            return self.PRIMARY
+
+        if connections[self.PRIMARY].in_atomic_block:
+            return self.PRIMARY
+
+        replicas = ReplicaLagMonitor.healthy_replicas()
+        if not replicas:
+            return self.PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state: ReplicaRoutingState = _routing_state.get()
+        if state is not None:
+            state.wrote = True
+            state.pinned = True
+        return self.PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        ## Every alias holds the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == self.PRIMARY
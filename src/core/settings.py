@@ -1,19 +1,24 @@
 from datetime import timedelta
 from pathlib import Path
-import redis
-from os import path, makedirs, environ
+from os import path, environ
+
+import django
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.functional import SimpleLazyObject
 
 from core.apps import DEFAULT_APPS, THIRD_PARTY_APPS, CUSTOM_APPS
 from core.middleware import DEFAULT_MIDDLEWARE, THIRD_PARTY_MIDDLEWARE, CUSTOM_MIDDLEWARE
+from utils.misc import str_to_bool
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = environ.get("SECRET_KEY", "t3mp0r4ry-s3cre4-k3y")
 
-DEBUG = eval(environ.get("DEBUG", "False"))
-if DEBUG:
-    import socket  # only if you haven't already imported this
-    hostname, _, ips = socket.gethostbyname_ex(socket.gethostname())
-    INTERNAL_IPS = [ip[: ip.rfind(".")] + ".1" for ip in ips] + ["127.0.0.1", "10.0.2.2"]
+DEBUG = str_to_bool(environ.get("DEBUG"), default=False)
+INTERNAL_IPS = ["127.0.0.1", "10.0.2.2"]
+## Docker gateway IPs need a hostname lookup; `core.debug` does it on the first request instead of at import.
+DEBUG_TOOLBAR_CONFIG = {
+    "SHOW_TOOLBAR_CALLBACK": "core.debug.show_toolbar",
+}
 ENV_TYPE = environ.get("ENV_TYPE", "PROD").lower()
 MAX_ITEMS_PER_PAGE = 15
 
@@ -56,6 +61,18 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'core.wsgi.application'
 
+## Connection reuse: by default every worker keeps its connection open for `DB_CONN_MAX_AGE`
+## seconds and pings it before reuse. With `DB_USE_POOL` each worker instead owns a psycopg 3
+## pool; total server connections are then `workers * DB_POOL_MAX_SIZE`. The `pool` option needs
+## Django 5.1, which `requirements.in` cannot allow yet (see the note on its Django pin).
+DB_USE_POOL = str_to_bool(environ.get("DB_USE_POOL"), default=False)
+if DB_USE_POOL and django.VERSION < (5, 1):
+    raise ImproperlyConfigured(f"DB_USE_POOL needs Django 5.1 or later; this is Django {django.get_version()}.")
+DB_CONN_MAX_AGE = int(environ.get("DB_CONN_MAX_AGE", 60))
+DB_POOL_MIN_SIZE = int(environ.get("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(environ.get("DB_POOL_MAX_SIZE", 4))
+DB_POOL_TIMEOUT = float(environ.get("DB_POOL_TIMEOUT", 10))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -63,20 +80,95 @@ DATABASES = {
         'HOST': environ['DB_HOST'],
         'PORT': environ['DB_PORT'],
         'USER': environ['DB_USER'],
-        'PASSWORD': environ['DB_PASSWORD']
+        'PASSWORD': environ['DB_PASSWORD'],
+        ## Django refuses persistent connections on top of a pool.
+        'CONN_MAX_AGE': 0 if DB_USE_POOL else DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': not DB_USE_POOL,
+        'OPTIONS': {},
     }
 }
 
-USE_REDIS = eval(environ.get("USE_REDIS", "True"))
+if DB_USE_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': DB_POOL_MIN_SIZE,
+        'max_size': DB_POOL_MAX_SIZE,
+        'timeout': DB_POOL_TIMEOUT,
+    }
+
+## Read replicas as "host:port, host:port"; each one is exposed as `replica_<n>` and shares the
+## primary's credentials. Safe reads are spread across them by `core.routers.PrimaryReplicaRouter`.
+DB_REPLICAS = [replica for replica in environ.get("DB_REPLICAS", "").split(", ") if replica]
+DB_REPLICA_ALIASES = []
+for index, replica in enumerate(DB_REPLICAS):
+    replica_host, _, replica_port = replica.partition(":")
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'PORT': replica_port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DB_REPLICA_ALIASES.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+## Replicas further behind the primary than this are skipped until they catch up.
+DB_REPLICA_MAX_LAG_SECONDS = float(environ.get("DB_REPLICA_MAX_LAG_SECONDS", 5))
+DB_REPLICA_LAG_CHECK_INTERVAL = float(environ.get("DB_REPLICA_LAG_CHECK_INTERVAL", 2))
+## After a write, the same user's reads stay on the primary for this many seconds.
+DB_READ_YOUR_WRITES_SECONDS = int(environ.get("DB_READ_YOUR_WRITES_SECONDS", 10))
+
+def get_redis_client(url: str):
+    import redis
+
+    return redis.Redis.from_url(url)
+
+
+USE_REDIS = str_to_bool(environ.get("USE_REDIS"), default=True)
+REDIS_HOST = environ.get("REDIS_HOST", "localhost")
+REDIS_PORT = int(environ.get("REDIS_PORT", 6379))
+REDIS_DB = int(environ.get("REDIS_DB", 0))
+REDIS_PASSWORD = None
+REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}"
 if USE_REDIS:
-    REDIS_HOST = environ.get("REDIS_HOST", "localhost")
-    REDIS_PORT = int(environ.get("REDIS_PORT", 6379))
-    REDIS_DB = int(environ.get("REDIS_DB", 0))
-    REDIS_PASSWORD = None
+    ## The client (and the `redis` package) is only created the first time something uses it.
+    REDIS_CONN = SimpleLazyObject(lambda: get_redis_client(REDIS_URL))
+
+## Defined even without Redis: `django_rq` refuses to import without it. Nothing is queued then.
+RQ_QUEUES = {
+    'default': {'URL': REDIS_URL, 'DB': REDIS_DB, 'DEFAULT_TIMEOUT': 360},
+    'low': {'URL': REDIS_URL, 'DB': REDIS_DB, 'DEFAULT_TIMEOUT': 900},
+}
+
+## Periodic jobs run by `python manage.py runcrons`, which the host's cron should call every minute.
+## Opt-in: `django_cron` 0.6 uses `Meta.index_together`, which Django 5.1 removed.
+CRON_ENABLED = str_to_bool(environ.get("CRON_ENABLED"), default=False)
+CRON_CLASSES = [
+    'billing_app.cron.ReleaseExpiredReservationsCronJob',
+    'billing_app.cron.RollUpSalesCronJob',
+] if CRON_ENABLED else []
+if CRON_ENABLED:
+    INSTALLED_APPS.append('django_cron')
+
 
-    REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}"
-    REDIS_CONN = redis.Redis.from_url(REDIS_URL)
+## Run in every gunicorn worker after it loads the app, before it takes traffic (see `core.warmup`).
+WORKER_WARMUP_HOOKS = [
+    'core.warmup.warm_url_resolver',
+    'core.warmup.warm_database',
+    'core.warmup.warm_redis',
+    'billing_app.utils.warm_tax_engine',
+]
 
+## The first hasher hashes new passwords; it shares the `pbkdf2_sha256` prefix with Django's own, which it replaces.
+PASSWORD_HASHERS = [
+    'auth_app.hashers.CalibratedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+## PBKDF2 iterations picked by `manage.py calibrate_password_hasher` for PASSWORD_HASH_BUDGET_MS; 0 is Django's default.
+## The hasher never goes below its own floor (`CalibratedPBKDF2PasswordHasher.MIN_ITERATIONS`).
+PASSWORD_HASH_ITERATIONS = int(environ.get('PASSWORD_HASH_ITERATIONS', 0))
+PASSWORD_HASH_BUDGET_MS = float(environ.get('PASSWORD_HASH_BUDGET_MS', 100))
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -95,9 +187,18 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'auth_app.authentication.CachedPrincipalJWTAuthentication',
+    ),
+    ## Client IPs (login throttling) come from REMOTE_ADDR when 0; otherwise from X-Forwarded-For, skipping
+    ## this many trusted proxies. Never set it higher than the proxies actually in front of the app.
+    'NUM_PROXIES': int(environ.get('NUM_PROXIES', 0)),
 }
+## Authenticated users' id/flags are cached this long in Redis and, much shorter, in each worker.
+AUTH_PRINCIPAL_CACHE_SECONDS = int(environ.get('AUTH_PRINCIPAL_CACHE_SECONDS', 300))
+AUTH_PRINCIPAL_LOCAL_CACHE_SECONDS = float(environ.get('AUTH_PRINCIPAL_LOCAL_CACHE_SECONDS', 5))
+## Revoked token ids live in Redis; each worker mirrors them in a Bloom filter refreshed this often.
+TOKEN_REVOCATION_SYNC_SECONDS = float(environ.get('TOKEN_REVOCATION_SYNC_SECONDS', 2))
+TOKEN_REVOCATION_BLOOM_CAPACITY = int(environ.get('TOKEN_REVOCATION_BLOOM_CAPACITY', 100000))
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
@@ -115,11 +216,14 @@ if ENV_TYPE == "dev":
     SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"] = timedelta(hours=8)
     SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"] = timedelta(days=15)
 
+## Parsed RS256 public keys are kept this long before they are parsed again (picks up rotated JWKs).
+JWKS_KEY_TTL_SECONDS = int(environ.get('JWKS_KEY_TTL_SECONDS', 3600))
+## Verified tokens remembered per process, until they expire, so repeated tokens skip signature checks.
+JWT_VERIFIED_TOKEN_CACHE_SIZE = int(environ.get('JWT_VERIFIED_TOKEN_CACHE_SIZE', 1024))
 
-## Create directory for logs
+
+## The log directory is created by the file handler on its first write, not at import.
 LOG_DIR = path.join(BASE_DIR.parent, 'logs/')
-if not path.exists(LOG_DIR):
-    makedirs(LOG_DIR)
 
 ENV_LOG_FILE = path.join(LOG_DIR, f'{ENV_TYPE}_root.log')
 DJANGO_LOG_FILE = path.join(LOG_DIR, 'django.log')
@@ -143,7 +247,7 @@ LOGGING = {
             'formatter': 'local',
         },
         'root_file': {
-            'class': 'logging.FileHandler',
+            'class': 'utils.log_handlers.LazyDirectoryFileHandler',
             'filename': ENV_LOG_FILE,
             'formatter': 'verbose',
             'encoding': 'utf-8',
@@ -165,8 +269,8 @@ MAC_HEADER = environ.get("MAC_HEADER", "mac")
 
 LANGUAGE_CODE = environ.get("LANGUAGE_CODE", "en-us")
 TIME_ZONE = environ.get("TIME_ZONE", "utc")
-USE_I18N = eval(environ.get("USE_I18N", "True"))
-USE_TZ = eval(environ.get("USE_TZ", "True"))
+USE_I18N = str_to_bool(environ.get("USE_I18N"), default=True)
+USE_TZ = str_to_bool(environ.get("USE_TZ"), default=True)
 
 #(prithoo): Salt sizes used in determining the user part in the permanent token;
 #           Looked cleaner when decalred in the `conf` module of the project.
@@ -175,6 +279,8 @@ SALT_02_SIZE = int(environ.get('SALT_02_SIZE', 6))
 
 STATIC_URL = '/static/'
 STATIC_ROOT = 'static'
+MEDIA_URL = '/media/'
+MEDIA_ROOT = environ.get('MEDIA_ROOT', path.join(BASE_DIR, 'media'))
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'auth_app.User'
 CORS_ORIGIN_WHITELIST = environ.get('CORS_ORIGIN_WHITELIST', '').split(', ')
@@ -185,11 +291,42 @@ EMAIL_HOST = environ.get('EMAIL_HOST', 'smtp.google.com')
 EMAIL_PORT = environ.get('EMAIL_PORT', 587)
 EMAIL_HOST_USER = environ.get('EMAIL_HOST_USER', 'email.user')
 EMAIL_HOST_PASSWORD = environ.get('EMAIL_HOST_PASSWORD', 'email.password')
-EMAIL_USE_TLS = eval(environ.get('EMAIL_USE_TLS', 'True'))
-EMAIL_USE_SSL = eval(environ.get('EMAIL_USE_SSL', 'False'))
+EMAIL_USE_TLS = str_to_bool(environ.get('EMAIL_USE_TLS'), default=True)
+EMAIL_USE_SSL = str_to_bool(environ.get('EMAIL_USE_SSL'), default=False)
 
 OTP_ATTEMPT_LIMIT = int(environ.get('OTP_ATTEMPT_LIMIT', 10000))
 OTP_ATTEMPT_TIMEOUT = int(environ.get('OTP_ATTEMPT_TIMEOUT', 0))
+## Failed logins are counted in Redis over this sliding window, per user (up to OTP_ATTEMPT_LIMIT) and per client IP.
+LOGIN_THROTTLE_WINDOW_SECONDS = int(environ.get('LOGIN_THROTTLE_WINDOW_SECONDS', 900))
+LOGIN_THROTTLE_IP_LIMIT = int(environ.get('LOGIN_THROTTLE_IP_LIMIT', 100))
+
+## 'compound' applies each tax on top of the previous ones, 'simple' applies all of them to the base amount.
+TAX_CALCULATION_MODE = environ.get('TAX_CALCULATION_MODE', 'compound')
+TAX_ENGINE_GENERATION_CHECK_SECONDS = float(environ.get('TAX_ENGINE_GENERATION_CHECK_SECONDS', 5))
+## Draft bills hold reserved stock this long; the sweeper (a cron job) releases it afterwards, every so many minutes.
+STOCK_RESERVATION_TTL_SECONDS = int(environ.get('STOCK_RESERVATION_TTL_SECONDS', 900))
+STOCK_RESERVATION_SWEEP_MINUTES = int(environ.get('STOCK_RESERVATION_SWEEP_MINUTES', 1))
+## 'inline' rolls sales up while finalizing a bill, 'deferred' leaves it to the `roll_up_sales` job
+## (a cron job every so many minutes, which also picks up anything the inline mode left behind).
+SALES_ROLLUP_MODE = environ.get('SALES_ROLLUP_MODE', 'deferred')
+SALES_ROLLUP_EVERY_MINUTES = int(environ.get('SALES_ROLLUP_EVERY_MINUTES', 5))
+## Open bills are recomputed after tax/price changes in chunks of this size, pausing in between.
+BILL_RECOMPUTE_CHUNK_SIZE = int(environ.get('BILL_RECOMPUTE_CHUNK_SIZE', 200))
+BILL_RECOMPUTE_THROTTLE_SECONDS = float(environ.get('BILL_RECOMPUTE_THROTTLE_SECONDS', 0.05))
+## Bills locked during a recompute are retried one at a time, waiting this long for each lock, this many times.
+BILL_RECOMPUTE_LOCK_TIMEOUT_MS = int(environ.get('BILL_RECOMPUTE_LOCK_TIMEOUT_MS', 2000))
+BILL_RECOMPUTE_LOCK_RETRIES = int(environ.get('BILL_RECOMPUTE_LOCK_RETRIES', 3))
+## Bill numbers are leased in blocks from a Postgres sequence or a Redis counter ('postgres'/'redis');
+## a process that exits loses the rest of its block, so this is also the largest gap a restart leaves.
+## With 'postgres' the block is the sequence's increment, set by a billing_app migration (ALTER SEQUENCE to change it).
+BILL_NUMBER_BACKEND = environ.get('BILL_NUMBER_BACKEND', 'postgres')
+BILL_NUMBER_BLOCK_SIZE = int(environ.get('BILL_NUMBER_BLOCK_SIZE', 20))
+## Retries with the same payment idempotency key are answered from Redis for this long, then from the ledger.
+PAYMENT_IDEMPOTENCY_TTL_SECONDS = int(environ.get('PAYMENT_IDEMPOTENCY_TTL_SECONDS', 86400))
+## Payment webhooks are signed with this secret and refused when it is empty.
+PAYMENT_WEBHOOK_SECRET = environ.get('PAYMENT_WEBHOOK_SECRET', '')
+PAYMENT_WEBHOOK_TOLERANCE_SECONDS = int(environ.get('PAYMENT_WEBHOOK_TOLERANCE_SECONDS', 300))
+PAYMENT_WEBHOOK_BATCH_SIZE = int(environ.get('PAYMENT_WEBHOOK_BATCH_SIZE', 200))
 
 AWS_ACCESS_KEY_ID = environ.get("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = environ.get("AWS_SECRET_ACCESS_KEY")
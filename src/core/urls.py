@@ -20,5 +20,8 @@ from django.urls import path, include
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('auth_app.endpoints')),
-    path('api/inventory/', include('inventory_app.endpoints'))
+    path('api/billing/', include('billing_app.endpoints')),
+    path('api/core/', include('core.endpoints')),
+    path('api/inventory/', include('inventory_app.endpoints')),
+    path('api/payments/', include('payment_app.endpoints')),
 ]
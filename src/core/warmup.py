@@ -0,0 +1,75 @@
+import gc
+import time
+
+from django.conf import settings as django_settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from core import logger
+
+
+class WorkerWarmup:
+    """
+    Hooks that let gunicorn workers start warm when the app is preloaded in the master.
+
+    Called from `gunicorn.conf.py`:
+        - `preload()` in the master once the app is imported: import everything lazy, then
+          freeze the heap so forked workers keep sharing those pages instead of copying them
+          the first time the garbage collector touches them.
+        - `before_fork()` in the master before every fork: drop connections the children must not share.
+        - `warm()` in each worker once it has loaded the app: run `WORKER_WARMUP_HOOKS`.
+    """
+
+    @classmethod
+    def preload(cls) -> None:
+        warm_url_resolver()
+        gc.collect()
+        gc.freeze()
+        logger.info(f"Preloaded application; {gc.get_freeze_count()} objects frozen for copy-on-write sharing.")
+
+    @classmethod
+    def before_fork(cls) -> None:
+        for connection in connections.all(initialized_only=True):
+            connection.close()
+            ## A psycopg pool runs background threads that do not survive `fork()`.
+            if hasattr(connection, "close_pool"):
+                connection.close_pool()
+
+    @classmethod
+    def warm(cls) -> None:
+        for hook_path in django_settings.WORKER_WARMUP_HOOKS:
+            started = time.perf_counter()
+            try:
+                import_string(hook_path)()
+            except Exception as ex:
+                ## A cold cache is slower, not broken; never keep a worker from serving.
+                logger.warning(f"Warm-up hook '{hook_path}' failed: {ex}")
+                continue
+            logger.info(f"Warm-up hook '{hook_path}' took {(time.perf_counter() - started) * 1000:.1f} ms.")
+
+
+def warm_url_resolver() -> None:
+    """
+    Import every view module and build the URL resolver's lookup tables.
+    """
+    from django.urls import get_resolver
+
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver._populate()
+
+
+def warm_database() -> None:
+    """
+    Open this worker's connection (or pool) to every configured database.
+    """
+    for alias in connections:
+        connections[alias].ensure_connection()
+
+
+def warm_redis() -> None:
+    """
+    Open this worker's Redis connection; redis-py discards connections inherited from the master on its own.
+    """
+    if getattr(django_settings, "USE_REDIS", False):
+        django_settings.REDIS_CONN.ping()
@@ -1,6 +1,7 @@
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from adrf.views import APIView as AsyncAPIView
 from inventory_app.helpers import (
     InventoryItemCategoryHelpers,
     InventoryItemHelpers,
@@ -142,3 +143,44 @@ class IncomingShipmentLineManagementAPI(APIView):
         _id = request.data.get("id")
         resp = IncomingShipmentLineHelpers.delete(user=request.user, _id=_id)
         return resp.to_response()
+
+
+class InventoryItemCategoryAsyncAPI(AsyncAPIView):
+    permission_classes = (IsAuthenticated,)
+
+    async def get(self, request: Request) -> Response:
+        resp = await InventoryItemCategoryHelpers._alist(
+            page_no=request.query_params.get("page", 1)
+        )
+        return resp.to_response()
+
+
+class InventoryItemAsyncAPI(AsyncAPIView):
+    permission_classes = (IsAuthenticated,)
+
+    async def get(self, request: Request) -> Response:
+        resp = await InventoryItemHelpers.asearch(
+            query=request.query_params.get("query"),
+        )
+        return resp.to_response()
+
+
+class InventoryItemManagementAsyncAPI(AsyncAPIView):
+    permission_classes = (IsAuthenticated,)
+
+    async def get(self, request: Request) -> Response:
+        _id = request.query_params.get("id")
+        name = request.query_params.get("name")
+        resp = await InventoryItemHelpers.aget(_id=_id, name=name)
+        return resp.to_response()
+
+
+class IncomingShipmentAsyncAPI(AsyncAPIView):
+    permission_classes = (IsAuthenticated,)
+
+    async def get(self, request: Request) -> Response:
+        if query := request.query_params.get("query"):
+            resp = await IncomingShipmentHelpers.asearch(query=query)
+        else:
+            resp = await IncomingShipmentHelpers.aget(_id=request.query_params.get("id"))
+        return resp.to_response()
@@ -8,6 +8,10 @@ from inventory_app.apis import (
     IncomingShipmentManagementAPI,
     IncomingShipmentLineAPI,
     IncomingShipmentLineManagementAPI,
+    InventoryItemCategoryAsyncAPI,
+    InventoryItemAsyncAPI,
+    InventoryItemManagementAsyncAPI,
+    IncomingShipmentAsyncAPI,
 )
 
 
@@ -50,4 +54,25 @@ urlpatterns = [
         IncomingShipmentLineManagementAPI.as_view(),
         name="incoming-shipment-line-manage",
     ),
+    ## Async read-only variants; these only pay off when served by ASGI workers.
+    path(
+        "async/categories/",
+        InventoryItemCategoryAsyncAPI.as_view(),
+        name="inventory-item-category-list-async",
+    ),
+    path(
+        "async/items/",
+        InventoryItemAsyncAPI.as_view(),
+        name="inventory-item-search-async",
+    ),
+    path(
+        "async/items/manage/",
+        InventoryItemManagementAsyncAPI.as_view(),
+        name="inventory-item-get-async",
+    ),
+    path(
+        "async/shipments/",
+        IncomingShipmentAsyncAPI.as_view(),
+        name="incoming-shipment-get-search-async",
+    ),
 ]
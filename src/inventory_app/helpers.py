@@ -5,7 +5,7 @@ from django.contrib.postgres.search import (
     SearchQuery,
     SearchRank,
 )
-from django.db.models import Q, QuerySet, F, Value
+from django.db.models import Q, QuerySet, F, Value, Prefetch
 from django.utils import timezone
 from inventory_app.models import (
     InventoryItem,
@@ -80,6 +80,32 @@ class InventoryItemCategoryHelpers:
         logger.info(resp.to_text())
         return resp
 
+    @classmethod
+    async def _alist(cls, page_no: int = 1, return_objs: bool = False) -> Resp:
+        """
+        Async variant of `_list`; pages with a plain slice since `Paginator` is sync-only.
+        """
+        resp = Resp()
+        try:
+            page_no = max(int(page_no), 1)
+        except (TypeError, ValueError):
+            page_no = 1
+
+        offset = (page_no - 1) * ITEMS_PER_PAGE
+        categories = [
+            category
+            async for category in cls.Model.objects.all().order_by("name")[
+                offset : offset + ITEMS_PER_PAGE
+            ]
+        ]
+
+        resp.message = f"Categories list fetched successfully for page {page_no}."
+        resp.data = categories if return_objs else cls.Serializer(categories, many=True).data
+        resp.status_code = status.HTTP_200_OK
+
+        logger.info(resp.to_text())
+        return resp
+
     @classmethod
     def exists(cls, name: str, _id: str = None) -> bool:
         return cls.Model.objects.filter(
@@ -304,6 +330,85 @@ class InventoryItemHelpers:
         logger.info(resp.to_text())
         return resp
 
+    @classmethod
+    async def aget(
+        cls, _id: str, name: str, return_obj: bool = False, *args, **kwargs
+    ) -> Resp:
+        """
+        Async variant of `get`.
+        """
+        resp = Resp()
+        items_qs = cls.Model.objects.select_related("category")
+        if _id and not name:
+            item_obj = await items_qs.filter(id=_id).afirst()
+        elif name and not _id:
+            item_obj = await items_qs.filter(name__iexact=name).afirst()
+        else:
+            resp.error = "Invalid parameters."
+            resp.message = "Provide either 'id' or 'name' to fetch the inventory item."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp
+
+        if not item_obj:
+            resp.error = "Inventory item not found."
+            resp.message = f"Inventory item ({_id if _id else name}) not found with the provided parameters."
+            resp.status_code = status.HTTP_404_NOT_FOUND
+
+            logger.error(resp.to_text())
+            return resp
+
+        resp.message = f"Inventory item ({_id if _id else name}) fetched successfully."
+        resp.data = item_obj if return_obj else cls.OUTPUT_SERIALIZER(item_obj).data
+        resp.status_code = status.HTTP_200_OK
+
+        logger.info(resp.to_text())
+        return resp
+
+    @classmethod
+    async def asearch(cls, query: str, return_objs: bool = False) -> Resp:
+        """
+        Async variant of `search`; fetches the matches in one query instead of `exists()` + fetch.
+        """
+        resp = Resp()
+        if not query:
+            resp.error = "Query parameter is required."
+            resp.message = "The 'query' parameter is required to perform a search."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp
+
+        items_qs = (
+            cls.Model.objects.select_related("category")
+            .annotate(
+                similarity=5 * TrigramSimilarity("name", query)
+                + 3 * TrigramSimilarity("description", query)
+                + 1 * TrigramSimilarity("sku", query)
+            )
+            .filter(similarity__gte=0.25)
+            .order_by("-similarity")
+        )
+        items = [item async for item in items_qs]
+
+        if not items:
+            resp.error = "No matching inventory items found."
+            resp.message = f"No inventory items found matching the query '{query}'."
+            resp.status_code = status.HTTP_404_NOT_FOUND
+
+            logger.error(resp.to_text())
+            return resp
+
+        resp.message = (
+            f"Inventory items matching the query '{query}' fetched successfully."
+        )
+        resp.data = items if return_objs else cls.OUTPUT_SERIALIZER(items, many=True).data
+        resp.status_code = status.HTTP_200_OK
+
+        logger.info(resp.to_text())
+        return resp
+
     @classmethod
     def create(cls, data: dict, return_obj: bool = False) -> Resp:
         resp = Resp()
@@ -691,6 +796,101 @@ class IncomingShipmentHelpers:
         logger.info(resp.to_text())
         return resp
 
+    @classmethod
+    def _output_queryset(cls) -> QuerySet:
+        """
+        Everything `OUTPUT_SERIALIZER` touches, loaded up front so that serializing never
+        queries lazily (which is not allowed from async code).
+        """
+        return cls.Model.objects.select_related("received_by").prefetch_related(
+            Prefetch(
+                "lines",
+                queryset=IncomingShipmentLine.objects.select_related("item__category"),
+            )
+        )
+
+    @classmethod
+    async def aget(cls, _id: str, return_obj: bool = False, *args, **kwargs) -> Resp:
+        """
+        Async variant of `get`.
+        """
+        resp = Resp()
+        if not _id:
+            resp.error = "ID parameter is required."
+            resp.message = (
+                "The 'id' parameter is required to fetch the incoming shipment."
+            )
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+            logger.error(resp.to_text())
+            return resp
+
+        shipment_obj = await cls._output_queryset().filter(id=_id).afirst()
+        if not shipment_obj:
+            resp.error = "Incoming shipment not found."
+            resp.message = f"Incoming shipment with id '{_id}' not found."
+            resp.status_code = status.HTTP_404_NOT_FOUND
+            logger.error(resp.to_text())
+            return resp
+
+        resp.message = f"Incoming shipment with id '{_id}' fetched successfully."
+        resp.data = (
+            shipment_obj if return_obj else cls.OUTPUT_SERIALIZER(shipment_obj).data
+        )
+        resp.status_code = status.HTTP_200_OK
+        logger.info(resp.to_text())
+        return resp
+
+    @classmethod
+    async def asearch(cls, query: str, return_objs: bool = False) -> Resp:
+        """
+        Async variant of `search`.
+        """
+        resp = Resp()
+        if not query:
+            resp.error = "Query parameter is required."
+            resp.message = "The 'query' parameter is required to perform a search."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp
+
+        shipments_qs = (
+            cls._output_queryset()
+            .annotate(
+                search=SearchVector("reference", weight="A")
+                + SearchVector("supplier_name", weight="B")
+                + SearchVector("notes", weight="C")
+                + SearchVector(F("received_by__username"), weight="D")
+                + SearchVector(F("received_by__first_name"), weight="D")
+                + SearchVector(F("received_by__last_name"), weight="D")
+            )
+            .filter(search=SearchQuery(query))
+            .annotate(rank=SearchRank(F("search"), SearchQuery(query)))
+            .order_by("-rank")
+        )
+        shipments = [shipment async for shipment in shipments_qs]
+
+        if not shipments:
+            resp.error = "No matching incoming shipments found."
+            resp.message = f"No incoming shipments found matching the query '{query}'."
+            resp.status_code = status.HTTP_404_NOT_FOUND
+
+            logger.error(resp.to_text())
+            return resp
+
+        resp.message = (
+            f"Incoming shipments matching the query '{query}' fetched successfully."
+        )
+        resp.data = (
+            shipments
+            if return_objs
+            else cls.OUTPUT_SERIALIZER(shipments, many=True).data
+        )
+        resp.status_code = status.HTTP_200_OK
+
+        logger.info(resp.to_text())
+        return resp
+
     @classmethod
     def create(cls, user: User, data: dict, return_obj: bool = False) -> Resp:
         resp = Resp()
@@ -0,0 +1,34 @@
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated, AllowAny
+
+from payment_app.helpers import PaymentHelpers, PaymentWebhookHelpers
+from payment_app.utils import WebhookSignature
+from payment_app import logger
+
+
+class PaymentAPI(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request: Request) -> Response:
+        resp = PaymentHelpers.get(_id=request.query_params.get("id"), bill_id=request.query_params.get("bill"))
+        return resp.to_response()
+
+    def post(self, request: Request) -> Response:
+        resp = PaymentHelpers.create(
+            data=request.data,
+            idempotency_key=request.headers.get("Idempotency-Key"),
+            user=request.user,
+        )
+        return resp.to_response()
+
+
+class PaymentWebhookAPI(APIView):
+    ## Callers prove who they are with the body's signature; skip JWT parsing on this hot path.
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def post(self, request: Request) -> Response:
+        resp = PaymentWebhookHelpers.receive(body=request.body, signature=request.headers.get(WebhookSignature.HEADER))
+        return resp.to_response()
@@ -0,0 +1,10 @@
+from django.urls import path
+from payment_app.apis import PaymentAPI, PaymentWebhookAPI
+
+
+PREFIX = "api/payments/"
+
+urlpatterns = [
+    path("", PaymentAPI.as_view(), name="payment-get-create"),
+    path("webhooks/", PaymentWebhookAPI.as_view(), name="payment-webhook"),
+]
@@ -0,0 +1,289 @@
+import hashlib
+import json
+
+from rest_framework import status
+from django.conf import settings as django_settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from billing_app.model_choices import BillStatusChoices
+from billing_app.models import Bill
+from core.boilerplate.response_template import Resp
+from payment_app.models import Payment
+from payment_app.serializers import PaymentInputSerializer, PaymentOutputSerializer
+from payment_app.utils import IdempotencyStore, PaymentWebhookStream, WebhookSignature
+from payment_app import logger
+
+
+class PaymentHelpers:
+    OUTPUT_SERIALIZER = PaymentOutputSerializer
+    Model = Payment
+    MAX_IDEMPOTENCY_KEY_LENGTH: int = 128
+
+    @classmethod
+    def fingerprint(cls, data: dict) -> str:
+        return hashlib.sha256(json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest()
+
+    @classmethod
+    def get(cls, _id: str = None, bill_id: str = None) -> Resp:
+        resp = Resp()
+        if not _id and not bill_id:
+            resp.error = "ID parameter is required."
+            resp.message = "Either the 'id' of a payment or the 'bill' it was made against is required."
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp
+
+        if _id:
+            payment = cls.Model.objects.filter(id=_id).first()
+            if not payment:
+                resp.error = "Payment not found."
+                resp.message = f"Payment with id '{_id}' not found."
+                resp.status_code = status.HTTP_404_NOT_FOUND
+
+                logger.error(resp.to_text())
+                return resp
+
+            resp.message = f"Payment '{_id}' fetched successfully."
+            resp.data = cls.OUTPUT_SERIALIZER(payment).data
+            resp.status_code = status.HTTP_200_OK
+
+            logger.info(resp.to_text())
+            return resp
+
+        payments = cls.Model.objects.filter(bill_id=bill_id).order_by("created_at")
+        resp.message = f"Payments for bill '{bill_id}' fetched successfully."
+        resp.data = cls.OUTPUT_SERIALIZER(payments, many=True).data
+        resp.status_code = status.HTTP_200_OK
+
+        logger.info(resp.to_text())
+        return resp
+
+    @classmethod
+    def create(cls, data: dict, idempotency_key: str, user=None) -> Resp:
+        """
+        Record a payment exactly once per idempotency key.
+
+        The key is claimed in Redis first, so concurrent retries never reach the database and
+        finished ones are answered from the stored response. A key Redis does not know about is
+        looked up in the ledger before anything is written, and the unique ledger column settles
+        any race left while Redis is unavailable.
+        """
+        resp = Resp()
+        if not idempotency_key or len(idempotency_key) > cls.MAX_IDEMPOTENCY_KEY_LENGTH:
+            resp.error = "Invalid idempotency key."
+            resp.message = (
+                f"An 'Idempotency-Key' header of at most {cls.MAX_IDEMPOTENCY_KEY_LENGTH} characters is required."
+            )
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp
+
+        deserialized = PaymentInputSerializer(data=data)
+        if not deserialized.is_valid():
+            resp.error = "Invalid data."
+            resp.message = f"{deserialized.errors}"
+            resp.data = data
+            resp.status_code = status.HTTP_400_BAD_REQUEST
+
+            logger.error(resp.to_text())
+            return resp
+
+        validated = deserialized.validated_data
+        fingerprint = cls.fingerprint(validated)
+
+        claimed, record = IdempotencyStore.claim(idempotency_key, fingerprint)
+        if not claimed:
+            return cls._replay(idempotency_key, fingerprint, record)
+
+        try:
+            stored = (
+                cls.Model.objects.filter(idempotency_key=idempotency_key)
+                .values("request_fingerprint", "response_status", "response_body")
+                .first()
+            )
+            if stored:
+                record = cls._stored_record(stored)
+            else:
+                try:
+                    resp = cls._record(validated, idempotency_key, fingerprint, user)
+                except IntegrityError:
+                    ## Another request recorded this key while Redis was unavailable.
+                    stored = (
+                        cls.Model.objects.filter(idempotency_key=idempotency_key)
+                        .values("request_fingerprint", "response_status", "response_body")
+                        .first()
+                    )
+                    if not stored:
+                        raise
+                    record = cls._stored_record(stored)
+        except Exception:
+            IdempotencyStore.release(idempotency_key)
+            raise
+
+        if record:
+            IdempotencyStore.complete(idempotency_key, record["fingerprint"], record["status"], record["body"])
+            return cls._replay(idempotency_key, fingerprint, record)
+
+        if resp.error:
+            ## Nothing was recorded; the client may retry the same key once the problem is fixed.
+            IdempotencyStore.release(idempotency_key)
+        else:
+            IdempotencyStore.complete(idempotency_key, fingerprint, resp.status_code, resp.data)
+        return resp
+
+    @classmethod
+    def _record(cls, validated: dict, idempotency_key: str, fingerprint: str, user=None) -> Resp:
+        """
+        Apply the payment to its bill with one conditional delta UPDATE and append it to the ledger.
+        """
+        resp = Resp()
+        bill_id = validated["bill"]
+        amount = validated["amount"]
+        now = timezone.now()
+
+        with transaction.atomic():
+            updated = (
+                Bill.objects.filter(pk=bill_id, due_amount__gte=amount)
+                .exclude(status=BillStatusChoices.CANCELLED)
+                .update(
+                    paid_amount=F("paid_amount") + amount,
+                    due_amount=F("due_amount") - amount,
+                    updated_at=now,
+                )
+            )
+            if not updated:
+                return cls._rejection(bill_id, amount)
+
+            paid_amount, due_amount = Bill.objects.filter(pk=bill_id).values_list("paid_amount", "due_amount").get()
+            payment = cls.Model(
+                bill_id=bill_id,
+                amount=amount,
+                method=validated["method"],
+                reference=validated.get("reference"),
+                idempotency_key=idempotency_key,
+                request_fingerprint=fingerprint,
+                response_status=status.HTTP_201_CREATED,
+                response_body={},
+                received_by=user if getattr(user, "is_authenticated", False) else None,
+            )
+            payment.save()
+            ## Through JSON now (UUIDs, datetimes), so this answer and every replay of it are identical.
+            payment.response_body = json.loads(
+                json.dumps(
+                    {
+                        **cls.OUTPUT_SERIALIZER(payment).data,
+                        "billPaidAmount": str(paid_amount),
+                        "billDueAmount": str(due_amount),
+                    },
+                    cls=DjangoJSONEncoder,
+                )
+            )
+            payment.save(update_fields=["response_body"])
+
+        resp.message = f"Payment of {amount} recorded against bill '{bill_id}'."
+        resp.data = payment.response_body
+        resp.status_code = status.HTTP_201_CREATED
+
+        logger.info(resp.to_text())
+        return resp
+
+    @classmethod
+    def _rejection(cls, bill_id, amount) -> Resp:
+        resp = Resp()
+        bill = Bill.objects.filter(pk=bill_id).values("status", "due_amount").first()
+        if not bill:
+            resp.error = "Bill not found."
+            resp.message = f"Bill with id '{bill_id}' not found."
+            resp.status_code = status.HTTP_404_NOT_FOUND
+        elif bill["status"] == BillStatusChoices.CANCELLED:
+            resp.error = "Invalid bill status."
+            resp.message = f"Bill '{bill_id}' is cancelled."
+            resp.status_code = status.HTTP_409_CONFLICT
+        else:
+            resp.error = "Overpayment."
+            resp.message = f"The payment ({amount}) is more than the amount due on bill '{bill_id}' ({bill['due_amount']})."
+            resp.status_code = status.HTTP_409_CONFLICT
+
+        logger.error(resp.to_text())
+        return resp
+
+    @classmethod
+    def _stored_record(cls, stored: dict) -> dict:
+        return {
+            "state": IdempotencyStore.DONE,
+            "fingerprint": stored["request_fingerprint"],
+            "status": stored["response_status"],
+            "body": stored["response_body"],
+        }
+
+    @classmethod
+    def _replay(cls, idempotency_key: str, fingerprint: str, record: dict) -> Resp:
+        resp = Resp()
+        if record.get("fingerprint") != fingerprint:
+            resp.error = "Idempotency key reused."
+            resp.message = f"Idempotency key '{idempotency_key}' was already used for a different payment."
+            resp.status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+
+            logger.error(resp.to_text())
+            return resp
+
+        if record.get("state") != IdempotencyStore.DONE:
+            resp.error = "Request in progress."
+            resp.message = f"A payment with idempotency key '{idempotency_key}' is still being processed; retry shortly."
+            resp.status_code = status.HTTP_409_CONFLICT
+
+            logger.error(resp.to_text())
+            return resp
+
+        resp.message = f"Replayed the result of idempotency key '{idempotency_key}'."
+        resp.data = record["body"]
+        resp.status_code = record["status"]
+
+        logger.info(resp.to_text())
+        return resp
+
+
+class PaymentWebhookHelpers:
+    @classmethod
+    def receive(cls, body: bytes, signature: str) -> Resp:
+        """
+        Verify a webhook and queue it; applying it to the ledger is `drain_payment_webhooks`' job.
+
+        Without Redis the event is applied inline instead.
+        """
+        resp = Resp()
+        secret = django_settings.PAYMENT_WEBHOOK_SECRET
+        if not secret:
+            resp.error = "Webhooks not configured."
+            resp.message = "PAYMENT_WEBHOOK_SECRET is not set; refusing unverifiable webhooks."
+            resp.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+            logger.error(resp.to_text())
+            return resp
+
+        if not WebhookSignature.verify(
+            secret, body, signature or "", django_settings.PAYMENT_WEBHOOK_TOLERANCE_SECONDS
+        ):
+            resp.error = "Invalid signature."
+            resp.message = f"The '{WebhookSignature.HEADER}' header is missing, expired or does not match the body."
+            resp.status_code = status.HTTP_401_UNAUTHORIZED
+
+            logger.error(resp.to_text())
+            return resp
+
+        if getattr(django_settings, "REDIS_CONN", None) is None:
+            PaymentWebhookStream.apply([body])
+        elif PaymentWebhookStream.append(body):
+            from payment_app.jobs import drain_payment_webhooks
+
+            drain_payment_webhooks.delay()
+
+        resp.message = "Webhook received."
+        resp.data = {"received": True}
+        resp.status_code = status.HTTP_200_OK
+        return resp
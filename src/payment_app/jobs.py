@@ -0,0 +1,8 @@
+from django_rq import job
+
+from payment_app.utils import PaymentWebhookStream
+
+
+@job("default")
+def drain_payment_webhooks() -> int:
+    return PaymentWebhookStream.drain()
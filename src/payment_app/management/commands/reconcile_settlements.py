@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payment_app.utils import SettlementReconciler
+
+
+class Command(BaseCommand):
+    help = (
+        "Match an end-of-day settlement file (CSV: bill_number,amount,reference[,method]) to open bills, "
+        "record the matched payments and write the rows that could not be applied to an exceptions report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Settlement CSV file.")
+        parser.add_argument(
+            "--exceptions", default=None, help="Exceptions report path; defaults to '<path>.exceptions.csv'."
+        )
+        parser.add_argument("--workers", type=int, default=None, help="Parser processes; defaults to the CPU count.")
+        parser.add_argument("--chunk-size", type=int, default=None, help="Payments applied per statement.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        reconciler = SettlementReconciler(options["path"], workers=options["workers"], chunk_size=options["chunk_size"])
+        stats = reconciler.run()
+
+        exceptions_path = options["exceptions"] or f"{options['path']}.exceptions.csv"
+        reconciler.write_exceptions(exceptions_path)
+
+        self.stdout.write(
+            f"{stats['rows']} row(s): {stats['applied']} applied, {stats['alreadyReconciled']} already reconciled, "
+            f"{stats['rejected']} rejected by a concurrent change, "
+            f"{stats['exceptions']} exception(s) in {exceptions_path}."
+        )
+        self.stdout.write(self.style.SUCCESS(f"Reconciled in {time.perf_counter() - started:.2f}s."))
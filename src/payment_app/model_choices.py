@@ -0,0 +1,14 @@
+class PaymentMethodChoices:
+    CASH = "cash"
+    CARD = "card"
+    UPI = "upi"
+    BANK_TRANSFER = "bank_transfer"
+    OTHER = "other"
+
+    METHOD_CHOICES = [
+        (CASH, "Cash"),
+        (CARD, "Card"),
+        (UPI, "UPI"),
+        (BANK_TRANSFER, "Bank Transfer"),
+        (OTHER, "Other"),
+    ]
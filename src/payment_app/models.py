@@ -1,3 +1,46 @@
+from django.conf import settings as django_settings
 from django.db import models
 
-# Create your models here.
+from billing_app.models import Bill
+from core.boilerplate.base_model import BaseModel
+from payment_app.model_choices import PaymentMethodChoices
+
+
+class Payment(BaseModel):
+    """
+    One payment against a bill; the ledger is append-only.
+
+    `idempotency_key` is the client's key for the request that recorded the payment, and
+    `response_status`/`response_body` are what that request answered, so a retry with the same
+    key gets the same answer even after the Redis copy is gone.
+    """
+
+    bill = models.ForeignKey(Bill, on_delete=models.PROTECT, related_name="payments")
+    amount = models.DecimalField(max_digits=32, decimal_places=2)
+    method = models.CharField(
+        max_length=32, choices=PaymentMethodChoices.METHOD_CHOICES, default=PaymentMethodChoices.CASH
+    )
+    reference = models.CharField(max_length=255, blank=True, null=True)
+    idempotency_key = models.CharField(max_length=128, unique=True)
+    request_fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField()
+    response_body = models.JSONField()
+    received_by = models.ForeignKey(
+        django_settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+
+    def __str__(self):
+        return f"{self.amount} ({self.method}) for bill {self.bill_id}"
+
+    def save(self, *args, **kwargs):
+        if self.reference:
+            self.clean_text_attribute("reference")
+        super(Payment, self).save(*args, **kwargs)
+
+    class Meta:
+        verbose_name = "Payment"
+        verbose_name_plural = "Payments"
+        indexes = (models.Index(fields=("bill", "created_at")),)
@@ -0,0 +1,25 @@
+from decimal import Decimal
+
+from rest_framework.serializers import (
+    ModelSerializer,
+    Serializer,
+    CharField,
+    ChoiceField,
+    DecimalField,
+    UUIDField,
+)
+from payment_app.model_choices import PaymentMethodChoices
+from payment_app.models import Payment
+
+
+class PaymentInputSerializer(Serializer):
+    bill = UUIDField()
+    amount = DecimalField(max_digits=32, decimal_places=2, min_value=Decimal("0.01"))
+    method = ChoiceField(choices=PaymentMethodChoices.METHOD_CHOICES, default=PaymentMethodChoices.CASH)
+    reference = CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+
+
+class PaymentOutputSerializer(ModelSerializer):
+    class Meta:
+        model = Payment
+        exclude = ("request_fingerprint", "response_status", "response_body")
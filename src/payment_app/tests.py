@@ -1,3 +1,155 @@
-from django.test import TestCase
+import json
+from decimal import Decimal
+from uuid import uuid4
 
-# Create your tests here.
+import pytest
+
+from payment_app.helpers import PaymentHelpers
+from payment_app.models import Payment
+from payment_app.utils import IdempotencyStore, PaymentWebhookStream, SettlementReconciler
+
+
+@pytest.fixture
+def idempotency_key():
+    key = f"test-{uuid4().hex}"
+    yield key
+    IdempotencyStore.release(key)
+
+
+@pytest.mark.django_db
+class TestPaymentIdempotency:
+
+    def pay(self, bill, amount: str, key: str):
+        return PaymentHelpers.create(data={"bill": str(bill.id), "amount": amount}, idempotency_key=key)
+
+    def assert_paid_once(self, bill, paid: str, due: str):
+        bill.refresh_from_db()
+        assert Payment.objects.filter(bill=bill).count() == 1
+        assert (bill.paid_amount, bill.due_amount) == (Decimal(paid), Decimal(due))
+
+    def test_retry_is_answered_without_paying_again(self, make_item, make_bill, idempotency_key):
+        bill = make_bill((make_item(price="10.00"), 1))
+
+        first = self.pay(bill, "4.00", idempotency_key)
+        retry = self.pay(bill, "4.00", idempotency_key)
+
+        assert (first.status_code, retry.status_code) == (201, 201)
+        assert retry.data == first.data
+        self.assert_paid_once(bill, paid="4.00", due="6.00")
+
+    def test_ledger_answers_retries_without_redis(self, no_redis, make_item, make_bill, idempotency_key):
+        bill = make_bill((make_item(price="10.00"), 1))
+
+        first = self.pay(bill, "4.00", idempotency_key)
+        retry = self.pay(bill, "4.00", idempotency_key)
+
+        assert retry.status_code == 201
+        assert retry.data["id"] == first.data["id"]
+        self.assert_paid_once(bill, paid="4.00", due="6.00")
+
+    def test_key_reused_for_another_payment_is_refused(self, make_item, make_bill, idempotency_key):
+        bill = make_bill((make_item(price="10.00"), 1))
+
+        self.pay(bill, "4.00", idempotency_key)
+        reused = self.pay(bill, "5.00", idempotency_key)
+
+        assert reused.status_code == 422
+        self.assert_paid_once(bill, paid="4.00", due="6.00")
+
+    def test_refused_payment_leaves_the_key_free(self, make_item, make_bill, idempotency_key):
+        bill = make_bill((make_item(price="10.00"), 1))
+
+        overpaid = self.pay(bill, "11.00", idempotency_key)
+        assert overpaid.status_code == 409
+        assert not Payment.objects.filter(bill=bill).exists()
+
+        assert self.pay(bill, "10.00", idempotency_key).status_code == 201
+        self.assert_paid_once(bill, paid="10.00", due="0.00")
+
+
+@pytest.mark.django_db
+class TestSettlementReconciler:
+
+    @pytest.fixture
+    def bills(self, make_item, make_bill):
+        item = make_item(price="10.00", quantity=100)
+        return make_bill((item, 1)), make_bill((item, 1))
+
+    @pytest.fixture
+    def settlement_file(self, tmp_path, bills):
+        first, second = bills
+        path = tmp_path / "settlement.csv"
+        path.write_text(
+            "bill_number,amount,reference\n"
+            f"{first.number},4.00,ref-a\n"
+            f"{second.number},10.00,ref-b\n"
+            f"{second.number},1.00,ref-c\n"
+            f"{max(first.number, second.number) + 1000},5.00,ref-d\n"
+            f"{first.number},1.00,ref-a\n"
+            f"{first.number},not-an-amount,ref-e\n"
+        )
+        return str(path)
+
+    def test_matches_are_applied_and_the_rest_reported(self, bills, settlement_file):
+        reconciler = SettlementReconciler(settlement_file, workers=1)
+        stats = reconciler.run()
+
+        assert stats["rows"] == 6
+        assert (stats["matched"], stats["applied"], stats["exceptions"]) == (2, 2, 4)
+        assert {line: reason for line, _, _, _, reason in reconciler.exceptions} == {
+            4: "more than the amount due (0.00)",
+            5: "no open bill with this number",
+            6: "duplicate reference in file",
+            7: "invalid bill number or amount",
+        }
+
+        first, second = bills
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert (first.paid_amount, first.due_amount) == (Decimal("4.00"), Decimal("6.00"))
+        assert (second.paid_amount, second.due_amount) == (Decimal("10.00"), Decimal("0.00"))
+        assert Payment.objects.filter(idempotency_key__startswith=SettlementReconciler.KEY_PREFIX).count() == 2
+
+    def test_running_a_file_again_changes_nothing(self, bills, settlement_file):
+        SettlementReconciler(settlement_file, workers=1).run()
+        stats = SettlementReconciler(settlement_file, workers=1).run()
+
+        assert stats["applied"] == 0
+        first, _ = bills
+        first.refresh_from_db()
+        assert (first.paid_amount, first.due_amount) == (Decimal("4.00"), Decimal("6.00"))
+        assert Payment.objects.filter(idempotency_key__startswith=SettlementReconciler.KEY_PREFIX).count() == 2
+
+    def test_rows_recorded_before_do_not_use_up_the_amount_due(self, tmp_path, bills):
+        first, _ = bills
+        earlier, later = tmp_path / "earlier.csv", tmp_path / "later.csv"
+        earlier.write_text(f"bill_number,amount,reference\n{first.number},4.00,ref-a\n")
+        later.write_text(f"bill_number,amount,reference\n{first.number},4.00,ref-a\n{first.number},6.00,ref-f\n")
+        SettlementReconciler(str(earlier), workers=1).run()
+
+        stats = SettlementReconciler(str(later), workers=1).run()
+
+        assert (stats["applied"], stats["alreadyReconciled"]) == (1, 1)
+        first.refresh_from_db()
+        assert (first.paid_amount, first.due_amount) == (Decimal("10.00"), Decimal("0.00"))
+
+
+@pytest.mark.django_db
+class TestPaymentWebhookStream:
+
+    def event(self, event_id: str, bill, amount: str) -> bytes:
+        return json.dumps(
+            {"id": event_id, "type": PaymentWebhookStream.EVENT_TYPE, "data": {"bill": str(bill.id), "amount": amount}}
+        ).encode()
+
+    def test_redelivered_events_do_not_use_up_the_amount_due(self, make_item, make_bill):
+        bill = make_bill((make_item(price="100.00"), 1))
+        first, second = f"evt-{uuid4().hex}", f"evt-{uuid4().hex}"
+        assert PaymentWebhookStream.apply([self.event(first, bill, "50.00")]) == 1
+
+        recorded = PaymentWebhookStream.apply([self.event(first, bill, "50.00"), self.event(second, bill, "50.00")])
+
+        assert recorded == 1
+        bill.refresh_from_db()
+        assert (bill.paid_amount, bill.due_amount) == (Decimal("100.00"), Decimal("0.00"))
+        assert Payment.objects.filter(bill=bill).count() == 2
@@ -0,0 +1,627 @@
+import csv
+import hashlib
+import hmac
+import json
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from uuid import UUID, uuid4
+
+from django.conf import settings as django_settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from billing_app.model_choices import BillStatusChoices
+from billing_app.models import Bill
+from payment_app.model_choices import PaymentMethodChoices
+from payment_app.models import Payment
+from payment_app import logger
+
+
+class IdempotencyStore:
+    """
+    Redis side of payment idempotency: one key per client idempotency key.
+
+    `claim()` is a single `SET NX`, so exactly one request gets to process a key; later ones
+    find either `processing` (still running) or `done` with the stored response. Redis is an
+    accelerator here: the durable record is `Payment.idempotency_key`, and when Redis is down
+    or has evicted a key, callers fall back to it.
+    """
+    KEY_PREFIX: str = "payments:idempotency:"
+    PROCESSING: str = "processing"
+    DONE: str = "done"
+    ## How long an unfinished claim blocks retries if its worker died mid-request.
+    PROCESSING_TTL_SECONDS: int = 60
+
+    @classmethod
+    def _key(cls, idempotency_key: str) -> str:
+        return cls.KEY_PREFIX + idempotency_key
+
+    @classmethod
+    def _redis(cls):
+        return getattr(django_settings, "REDIS_CONN", None)
+
+    @classmethod
+    def claim(cls, idempotency_key: str, fingerprint: str) -> tuple[bool, dict]:
+        """
+        Try to claim a key for processing.
+
+        Returns `(True, None)` when this request should process it (also when Redis cannot be
+        reached) and `(False, record)` when another request claimed or finished it.
+        """
+        redis_conn = cls._redis()
+        if redis_conn is None:
+            return True, None
+        record = json.dumps({"state": cls.PROCESSING, "fingerprint": fingerprint})
+        try:
+            if redis_conn.set(cls._key(idempotency_key), record, nx=True, ex=cls.PROCESSING_TTL_SECONDS):
+                return True, None
+            existing = redis_conn.get(cls._key(idempotency_key))
+        except Exception as ex:
+            logger.warning(f"Idempotency store unavailable, using the database only: {ex}")
+            return True, None
+
+        if existing is None:
+            ## Expired between the two commands; treat it like a request still in progress.
+            return False, {"state": cls.PROCESSING, "fingerprint": fingerprint}
+        return False, json.loads(existing)
+
+    @classmethod
+    def complete(cls, idempotency_key: str, fingerprint: str, status_code: int, body: dict) -> None:
+        redis_conn = cls._redis()
+        if redis_conn is None:
+            return
+        record = json.dumps(
+            {"state": cls.DONE, "fingerprint": fingerprint, "status": status_code, "body": body},
+            cls=DjangoJSONEncoder,
+        )
+        try:
+            redis_conn.set(
+                cls._key(idempotency_key), record, ex=django_settings.PAYMENT_IDEMPOTENCY_TTL_SECONDS
+            )
+        except Exception as ex:
+            logger.warning(f"Could not store the result of idempotency key '{idempotency_key}': {ex}")
+
+    @classmethod
+    def release(cls, idempotency_key: str) -> None:
+        """
+        Drop a claim that did not record anything, so the client can retry with the same key.
+        """
+        redis_conn = cls._redis()
+        if redis_conn is None:
+            return
+        try:
+            redis_conn.delete(cls._key(idempotency_key))
+        except Exception as ex:
+            logger.warning(f"Could not release idempotency key '{idempotency_key}': {ex}")
+
+
+class BulkPaymentWriter:
+    """
+    Appends many payments to the ledger and applies them to their bills in one statement.
+
+    Payments whose idempotency key is already in the ledger are skipped, and the rest are
+    summed per bill and applied with one conditional UPDATE: a bill is only charged while it is
+    not cancelled and still has at least that much due, exactly like the single-payment API.
+    Payments are inserted only for the bills that UPDATE changed; those for the other bills are
+    reported back as rejected and nothing of them is written. Writing the same batch twice
+    changes nothing.
+
+    Idempotency keys must be unique within a batch.
+    """
+    APPLY_SQL: str = """
+        WITH incoming (id, bill_id, amount, method, reference, idempotency_key, request_fingerprint) AS (
+            VALUES {values}
+        ), fresh AS (
+            SELECT incoming.* FROM incoming
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {payment} AS payment WHERE payment.idempotency_key = incoming.idempotency_key
+            )
+        ), totals AS (
+            SELECT bill_id, SUM(amount) AS amount FROM fresh GROUP BY bill_id
+        ), updated AS (
+            UPDATE {bill} AS bill
+            SET paid_amount = bill.paid_amount + totals.amount,
+                due_amount = bill.due_amount - totals.amount,
+                updated_at = %s
+            FROM totals
+            WHERE bill.id = totals.bill_id
+                AND bill.due_amount >= totals.amount
+                AND bill.status <> %s
+            RETURNING bill.id
+        ), inserted AS (
+            INSERT INTO {payment} (
+                id, created_at, updated_at, bill_id, amount, method, reference,
+                idempotency_key, request_fingerprint, response_status, response_body
+            )
+            SELECT id, %s, %s, bill_id, amount, method, reference,
+                idempotency_key, request_fingerprint, 201, '{{}}'::jsonb
+            FROM fresh
+            WHERE bill_id IN (SELECT id FROM updated)
+            RETURNING idempotency_key
+        )
+        SELECT 'inserted', idempotency_key FROM inserted
+        UNION ALL
+        SELECT 'rejected', idempotency_key FROM fresh WHERE bill_id NOT IN (SELECT id FROM updated)
+    """
+    ## A key inserted by a concurrent transaction after our NOT EXISTS fails the whole
+    ## statement; run it again and that payment is then seen as already recorded.
+    MAX_ATTEMPTS: int = 3
+
+    @classmethod
+    def write(cls, payments: list[tuple]) -> tuple[set, set]:
+        """
+        Write `(bill_id, amount, method, reference, idempotency_key, fingerprint)` tuples.
+
+        Returns the idempotency keys that were inserted and those rejected because their bill
+        was cancelled or had less due than the payments; keys in neither were already recorded.
+        """
+        if not payments:
+            return set(), set()
+        values, params = [], []
+        for bill_id, amount, method, reference, idempotency_key, fingerprint in payments:
+            values.append("(%s::uuid, %s::uuid, %s::numeric, %s, %s, %s, %s)")
+            params.extend((uuid4(), bill_id, amount, method, reference, idempotency_key, fingerprint))
+
+        sql = cls.APPLY_SQL.format(
+            values=", ".join(values),
+            payment=connection.ops.quote_name(Payment._meta.db_table),
+            bill=connection.ops.quote_name(Bill._meta.db_table),
+        )
+        for attempt in range(1, cls.MAX_ATTEMPTS + 1):
+            now = timezone.now()
+            try:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(sql, [*params, now, BillStatusChoices.CANCELLED, now, now])
+                    results = cursor.fetchall()
+                break
+            except IntegrityError:
+                if attempt == cls.MAX_ATTEMPTS:
+                    raise
+                logger.warning("A payment of this batch was recorded concurrently; writing the batch again.")
+
+        inserted = {key for kind, key in results if kind == "inserted"}
+        rejected = {key for kind, key in results if kind == "rejected"}
+        return inserted, rejected
+
+
+def parse_settlement_lines(first_line_number: int, lines: list[str], columns: dict) -> tuple[list, list]:
+    """
+    Parse a chunk of settlement file lines; runs in `SettlementReconciler`'s process pool.
+
+    Returns `(rows, exceptions)`: rows are `(bill_number, line_number, reference, amount, method)`
+    tuples, exceptions are `(line_number, reference, bill_number, amount, reason)`.
+    """
+    rows, exceptions = [], []
+    for offset, record in enumerate(csv.reader(lines)):
+        line_number = first_line_number + offset
+        if not record or not any(field.strip() for field in record):
+            continue
+        try:
+            fields = {name: record[index].strip() for name, index in columns.items() if index < len(record)}
+            reference = fields.get("reference", "")
+            raw_number, raw_amount = fields.get("bill_number", ""), fields.get("amount", "")
+        except Exception as ex:
+            exceptions.append((line_number, "", "", "", f"unreadable row: {ex}"))
+            continue
+
+        try:
+            bill_number = int(raw_number)
+            amount = Decimal(raw_amount).quantize(Decimal("0.01"))
+        except (ValueError, ArithmeticError):
+            exceptions.append((line_number, reference, raw_number, raw_amount, "invalid bill number or amount"))
+            continue
+        if not reference:
+            exceptions.append((line_number, reference, raw_number, raw_amount, "missing reference"))
+            continue
+        if len(reference) > SettlementReconciler.MAX_REFERENCE_LENGTH:
+            exceptions.append((line_number, reference, raw_number, raw_amount, "reference is too long"))
+            continue
+        if amount <= 0:
+            exceptions.append((line_number, reference, raw_number, raw_amount, "amount must be positive"))
+            continue
+
+        method = fields.get("method") or PaymentMethodChoices.BANK_TRANSFER
+        if method not in SettlementReconciler.METHODS:
+            method = PaymentMethodChoices.OTHER
+        rows.append((bill_number, line_number, reference, amount, method))
+    return rows, exceptions
+
+
+class SettlementReconciler:
+    """
+    Matches an end-of-day settlement file to open bills and records the payments.
+
+    The file (CSV with a `bill_number,amount,reference[,method]` header, one record per line)
+    is read in chunks of lines that a process pool parses. Rows are sorted by bill number and
+    merged in one pass against open bills (`due_amount > 0`, not cancelled) read in keyset
+    order, so matching is linear and costs one query per page of bills, not one per row.
+
+    Matched payments are written `CHUNK_SIZE` at a time by `BulkPaymentWriter`, keyed
+    `settlement:<reference>` so re-running a file is harmless. Every row that is not applied
+    goes to the exceptions report.
+    """
+    KEY_PREFIX: str = "settlement:"
+    ## What is left of `Payment.idempotency_key` after the prefix.
+    MAX_REFERENCE_LENGTH: int = 128 - len(KEY_PREFIX)
+    REQUIRED_COLUMNS: tuple = ("bill_number", "amount", "reference")
+    OPTIONAL_COLUMNS: tuple = ("method",)
+    METHODS: frozenset = frozenset(choice for choice, _ in PaymentMethodChoices.METHOD_CHOICES)
+    PARSE_CHUNK_LINES: int = 5000
+    BILL_PAGE_SIZE: int = 2000
+    CHUNK_SIZE: int = 1000
+
+    def __init__(self, path: str, workers: int = None, chunk_size: int = None) -> None:
+        self.path = path
+        self.workers = workers
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.exceptions = []
+        self.stats = {"rows": 0, "matched": 0, "applied": 0, "alreadyReconciled": 0, "rejected": 0, "exceptions": 0}
+
+    def run(self) -> dict:
+        rows = self.parse()
+        self.stats["rows"] = len(rows) + len(self.exceptions)
+        rows.sort()
+
+        chunk = []
+        for match in self.match(rows, self.reconciled_references(rows)):
+            chunk.append(match)
+            if len(chunk) >= self.chunk_size:
+                self.apply(chunk)
+                chunk = []
+        if chunk:
+            self.apply(chunk)
+
+        self.exceptions.sort()
+        self.stats["exceptions"] = len(self.exceptions)
+        return self.stats
+
+    def parse(self) -> list:
+        with open(self.path, newline="", encoding="utf-8-sig") as settlement_file:
+            header = next(csv.reader([settlement_file.readline()]), [])
+            header = [name.strip().lower() for name in header]
+            if missing := [name for name in self.REQUIRED_COLUMNS if name not in header]:
+                raise ValueError(f"Settlement file is missing the column(s): {', '.join(missing)}.")
+            columns = {
+                name: header.index(name) for name in self.REQUIRED_COLUMNS + self.OPTIONAL_COLUMNS if name in header
+            }
+
+            rows = []
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = [
+                    pool.submit(parse_settlement_lines, first_line, lines, columns)
+                    for first_line, lines in self._line_chunks(settlement_file, first_line=2)
+                ]
+                for future in futures:
+                    chunk_rows, chunk_exceptions = future.result()
+                    rows.extend(chunk_rows)
+                    self.exceptions.extend(chunk_exceptions)
+        return rows
+
+    def _line_chunks(self, settlement_file, first_line: int):
+        lines = []
+        for line in settlement_file:
+            lines.append(line)
+            if len(lines) >= self.PARSE_CHUNK_LINES:
+                yield first_line, lines
+                first_line += len(lines)
+                lines = []
+        if lines:
+            yield first_line, lines
+
+    def open_bills(self, first_number: int, last_number: int):
+        """
+        `(number, id, due_amount)` of open bills numbered in the given range, in number order.
+        """
+        bills = (
+            Bill.objects.filter(number__gte=first_number, number__lte=last_number, due_amount__gt=0)
+            .exclude(status=BillStatusChoices.CANCELLED)
+            .order_by("number")
+        )
+        last = None
+        while True:
+            page = bills.filter(number__gt=last) if last is not None else bills
+            page = list(page.values_list("number", "id", "due_amount")[: self.BILL_PAGE_SIZE])
+            yield from page
+            if len(page) < self.BILL_PAGE_SIZE:
+                return
+            last = page[-1][0]
+
+    def reconciled_references(self, rows: list) -> set:
+        """
+        References of the rows whose payment is already in the ledger (from an earlier run of the file).
+        """
+        references = set()
+        keys = list({self.KEY_PREFIX + reference for _, _, reference, _, _ in rows})
+        for start in range(0, len(keys), self.BILL_PAGE_SIZE):
+            references.update(
+                key[len(self.KEY_PREFIX):]
+                for key in Payment.objects.filter(idempotency_key__in=keys[start : start + self.BILL_PAGE_SIZE])
+                .values_list("idempotency_key", flat=True)
+            )
+        return references
+
+    def match(self, rows: list, reconciled: set = frozenset()):
+        """
+        Merge rows sorted by bill number with open bills in the same order; yields matches.
+
+        Rows in `reconciled` were recorded before: the bills' `due_amount` already has them
+        taken off, so they are reported and must not count against it again.
+        """
+        if not rows:
+            return
+        seen_references = set()
+        bills = self.open_bills(rows[0][0], rows[-1][0])
+        bill = next(bills, None)
+        remaining_due = bill[2] if bill else None
+
+        for bill_number, line_number, reference, amount, method in rows:
+            if reference in seen_references:
+                self._exception(line_number, reference, bill_number, amount, "duplicate reference in file")
+                continue
+            seen_references.add(reference)
+            if reference in reconciled:
+                self.stats["alreadyReconciled"] += 1
+                self._exception(line_number, reference, bill_number, amount, "already reconciled")
+                continue
+
+            while bill is not None and bill[0] < bill_number:
+                bill = next(bills, None)
+                remaining_due = bill[2] if bill else None
+
+            if bill is None or bill[0] != bill_number:
+                self._exception(line_number, reference, bill_number, amount, "no open bill with this number")
+                continue
+            if amount > remaining_due:
+                self._exception(
+                    line_number, reference, bill_number, amount, f"more than the amount due ({remaining_due})"
+                )
+                continue
+
+            remaining_due -= amount
+            self.stats["matched"] += 1
+            yield bill[1], bill_number, line_number, reference, amount, method
+
+    def apply(self, matches: list) -> None:
+        payments = [
+            (
+                bill_id,
+                amount,
+                method,
+                reference,
+                self.KEY_PREFIX + reference,
+                hashlib.sha256(f"{bill_number}|{amount}|{reference}|{method}".encode()).hexdigest(),
+            )
+            for bill_id, bill_number, line_number, reference, amount, method in matches
+        ]
+        inserted, rejected = BulkPaymentWriter.write(payments)
+
+        for bill_id, bill_number, line_number, reference, amount, method in matches:
+            key = self.KEY_PREFIX + reference
+            if key in rejected:
+                ## Paid or cancelled since the bill was read; nothing of it was recorded.
+                self.stats["rejected"] += 1
+                self._exception(
+                    line_number, reference, bill_number, amount, "bill cancelled or paid concurrently; not applied"
+                )
+            elif key not in inserted:
+                self.stats["alreadyReconciled"] += 1
+                self._exception(line_number, reference, bill_number, amount, "already reconciled")
+        self.stats["applied"] += len(inserted)
+        logger.info(f"Applied {len(inserted)} settlement payment(s) of {len(matches)} matched.")
+
+    def _exception(self, line_number, reference, bill_number, amount, reason) -> None:
+        self.exceptions.append((line_number, reference, bill_number, amount, reason))
+
+    def write_exceptions(self, path: str) -> None:
+        with open(path, "w", newline="") as report:
+            writer = csv.writer(report)
+            writer.writerow(("line", "reference", "bill_number", "amount", "reason"))
+            writer.writerows(self.exceptions)
+
+
+class WebhookSignature:
+    """
+    `X-Webhook-Signature: t=<unix seconds>,v1=<hex HMAC-SHA256 of "<t>.<raw body>">`.
+
+    The timestamp is part of the signed message, so a captured request can only be replayed
+    within `PAYMENT_WEBHOOK_TOLERANCE_SECONDS`; replays inside that window are deduplicated by
+    event id anyway.
+    """
+    HEADER: str = "X-Webhook-Signature"
+
+    @classmethod
+    def sign(cls, secret: str, body: bytes, timestamp: int = None) -> str:
+        timestamp = int(time.time()) if timestamp is None else timestamp
+        digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+        return f"t={timestamp},v1={digest}"
+
+    @classmethod
+    def verify(cls, secret: str, body: bytes, header: str, tolerance: int) -> bool:
+        try:
+            parts = dict(part.strip().split("=", 1) for part in header.split(","))
+            timestamp = int(parts["t"])
+            signature = parts["v1"]
+        except (AttributeError, KeyError, ValueError):
+            return False
+        if abs(time.time() - timestamp) > tolerance:
+            return False
+        expected = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+
+class PaymentWebhookStream:
+    """
+    Payment webhooks, received as fast as possible and applied to the ledger in batches.
+
+    The endpoint only verifies the signature and `XADD`s the raw body to a Redis stream; in the
+    same round trip it sets a short-lived "drain scheduled" flag and enqueues `drain_payment_webhooks`
+    only when it was the one to set it, so a burst of webhooks queues one job, not one per event.
+
+    The job reads the stream through a consumer group in batches of `PAYMENT_WEBHOOK_BATCH_SIZE`,
+    applies each batch with `BulkPaymentWriter` (one statement; the ledger key is
+    `webhook:<event id>`, which deduplicates redeliveries), then acknowledges and deletes the
+    entries. Entries left pending by a worker that died are claimed again after `CLAIM_IDLE_MS`.
+    """
+    STREAM: str = "payments:webhooks"
+    GROUP: str = "payment-ledger"
+    SCHEDULED_KEY: str = "payments:webhooks:drain-scheduled"
+    SCHEDULED_TTL_SECONDS: int = 60
+    CLAIM_IDLE_MS: int = 60000
+    MAX_LENGTH: int = 100000
+    KEY_PREFIX: str = "webhook:"
+    EVENT_TYPE: str = "payment.succeeded"
+    MAX_EVENT_ID_LENGTH: int = 128 - len(KEY_PREFIX)
+
+    @classmethod
+    def _redis(cls):
+        return getattr(django_settings, "REDIS_CONN", None)
+
+    @classmethod
+    def append(cls, body: bytes) -> bool:
+        """
+        Add an event to the stream; returns whether the caller should enqueue a drain job.
+        """
+        pipeline = cls._redis().pipeline(transaction=False)
+        pipeline.xadd(cls.STREAM, {"body": body}, maxlen=cls.MAX_LENGTH, approximate=True)
+        pipeline.set(cls.SCHEDULED_KEY, 1, nx=True, ex=cls.SCHEDULED_TTL_SECONDS)
+        _, scheduled = pipeline.execute()
+        return bool(scheduled)
+
+    @classmethod
+    def _ensure_group(cls, redis_conn) -> None:
+        try:
+            redis_conn.xgroup_create(cls.STREAM, cls.GROUP, id="0", mkstream=True)
+        except Exception as ex:
+            if "BUSYGROUP" not in str(ex):
+                raise
+
+    @classmethod
+    def _read(cls, redis_conn, consumer: str, count: int) -> list:
+        claimed = redis_conn.xautoclaim(cls.STREAM, cls.GROUP, consumer, cls.CLAIM_IDLE_MS, count=count)[1]
+        if claimed:
+            return claimed
+        response = redis_conn.xreadgroup(cls.GROUP, consumer, {cls.STREAM: ">"}, count=count)
+        return response[0][1] if response else []
+
+    @classmethod
+    def drain(cls, batch_size: int = None) -> int:
+        """
+        Apply every event in the stream; returns how many payments were recorded.
+        """
+        redis_conn = cls._redis()
+        batch_size = batch_size or django_settings.PAYMENT_WEBHOOK_BATCH_SIZE
+        consumer = f"{socket.gethostname()}-{os.getpid()}"
+        cls._ensure_group(redis_conn)
+
+        recorded = 0
+        while True:
+            entries = cls._read(redis_conn, consumer, batch_size)
+            if not entries:
+                ## Events added after this find the flag gone and schedule another drain.
+                redis_conn.delete(cls.SCHEDULED_KEY)
+                entries = cls._read(redis_conn, consumer, batch_size)
+                if not entries:
+                    return recorded
+                redis_conn.set(cls.SCHEDULED_KEY, 1, ex=cls.SCHEDULED_TTL_SECONDS)
+
+            recorded += cls.apply([fields[b"body"] for _, fields in entries if b"body" in fields])
+            entry_ids = [entry_id for entry_id, _ in entries]
+            pipeline = redis_conn.pipeline(transaction=False)
+            pipeline.xack(cls.STREAM, cls.GROUP, *entry_ids)
+            pipeline.xdel(cls.STREAM, *entry_ids)
+            pipeline.execute()
+
+    @classmethod
+    def apply(cls, bodies: list[bytes]) -> int:
+        """
+        Record a batch of raw webhook bodies; returns how many payments were new.
+
+        Events are deduplicated by id within the batch and against the ledger. Events that
+        cannot be applied (unknown or cancelled bill, more than the amount due, bad payload)
+        are logged and dropped, since redelivering them would not change the outcome.
+        """
+        events = {}
+        for body in bodies:
+            event = cls._parse(body)
+            if event and event["id"] not in events:
+                events[event["id"]] = event
+        ## Redeliveries are already taken off their bills' `due_amount`; checked against it again,
+        ## they would use up the amount due of new events for the same bill.
+        recorded = set(
+            Payment.objects.filter(idempotency_key__in=[cls.KEY_PREFIX + event_id for event_id in events])
+            .values_list("idempotency_key", flat=True)
+        )
+        events = {event_id: event for event_id, event in events.items() if cls.KEY_PREFIX + event_id not in recorded}
+        if not events:
+            return 0
+
+        due_amounts = dict(
+            Bill.objects.filter(id__in={event["bill"] for event in events.values()})
+            .exclude(status=BillStatusChoices.CANCELLED)
+            .values_list("id", "due_amount")
+        )
+        payments = []
+        for event_id, event in events.items():
+            due_amount = due_amounts.get(event["bill"])
+            if due_amount is None:
+                logger.error(f"Webhook event '{event_id}': no open bill '{event['bill']}'.")
+                continue
+            if event["amount"] > due_amount:
+                logger.error(
+                    f"Webhook event '{event_id}': {event['amount']} is more than the amount due on "
+                    f"bill '{event['bill']}' ({due_amount})."
+                )
+                continue
+            due_amounts[event["bill"]] = due_amount - event["amount"]
+            payments.append(
+                (
+                    event["bill"],
+                    event["amount"],
+                    event["method"],
+                    event["reference"],
+                    cls.KEY_PREFIX + event_id,
+                    event["fingerprint"],
+                )
+            )
+
+        inserted, rejected = BulkPaymentWriter.write(payments)
+        for key in sorted(rejected):
+            logger.error(
+                f"Webhook event '{key[len(cls.KEY_PREFIX):]}': its bill was cancelled or paid concurrently; not recorded."
+            )
+        logger.info(
+            f"Recorded {len(inserted)} webhook payment(s) from {len(bodies)} event(s); "
+            f"{len(recorded) + len(payments) - len(inserted) - len(rejected)} were already in the ledger."
+        )
+        return len(inserted)
+
+    @classmethod
+    def _parse(cls, body: bytes) -> dict:
+        try:
+            payload = json.loads(body)
+            event_id = str(payload["id"])
+            if payload.get("type") != cls.EVENT_TYPE:
+                logger.info(f"Ignoring webhook event '{event_id}' of type '{payload.get('type')}'.")
+                return None
+            data = payload["data"]
+            amount = Decimal(str(data["amount"])).quantize(Decimal("0.01"))
+            method = data.get("method") or PaymentMethodChoices.OTHER
+            event = {
+                "id": event_id,
+                "bill": UUID(str(data["bill"])),
+                "amount": amount,
+                "method": method if method in SettlementReconciler.METHODS else PaymentMethodChoices.OTHER,
+                "reference": (str(data.get("reference") or event_id))[:255],
+                "fingerprint": hashlib.sha256(body).hexdigest(),
+            }
+        except (ValueError, TypeError, KeyError, ArithmeticError) as ex:
+            logger.error(f"Unreadable webhook event: {ex}")
+            return None
+        if not event_id or len(event_id) > cls.MAX_EVENT_ID_LENGTH or amount <= 0:
+            logger.error(f"Invalid webhook event '{event_id}'.")
+            return None
+        return event
@@ -0,0 +1,36 @@
+from hashlib import blake2b
+from math import ceil, log
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter of strings: no false negatives, `error_rate` false positives at `capacity`.
+
+    Bits live in a `bytearray`; the `hash_count` bit positions of a value are derived from one
+    BLAKE2b digest by double hashing. Values cannot be removed; rebuild the filter instead.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        self.capacity = capacity
+        self.size = max(8, ceil(-capacity * log(error_rate) / log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * log(2)))
+        self.bits = bytearray(ceil(self.size / 8))
+        self.count = 0
+
+    def _positions(self, value: str):
+        digest = blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        for index in range(self.hash_count):
+            yield (first + index * second) % self.size
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
@@ -0,0 +1,78 @@
+import os
+
+from django.db import connections
+
+from utils import logger
+
+
+class DatabasePoolUtils:
+    """
+    Utilities to inspect how the current worker reuses its database connections.
+    """
+
+    @classmethod
+    def get_stats(cls, alias: str = "default") -> dict:
+        """
+        Return connection reuse metrics for the given database alias in THIS worker process.
+
+        Pools are per-process, so each gunicorn worker reports its own numbers; sample a few
+        times under load to see the spread between workers.
+
+        When the alias runs on a psycopg 3 pool the result contains:
+            - `checkoutWaitMsAvg`: mean time a request waited to get a connection.
+            - `saturation`: share of `maxSize` connections currently checked out.
+            - `waiting`: requests queued for a connection right now.
+        """
+        connection = connections[alias]
+        stats = {
+            "alias": alias,
+            "pid": os.getpid(),
+        }
+
+        pool = getattr(connection, "pool", None)
+        if pool is None:
+            stats.update(
+                {
+                    "mode": "persistent" if connection.settings_dict.get("CONN_MAX_AGE") else "per-request",
+                    "connMaxAge": connection.settings_dict.get("CONN_MAX_AGE"),
+                    "healthChecks": connection.settings_dict.get("CONN_HEALTH_CHECKS"),
+                    "connected": connection.connection is not None,
+                }
+            )
+            return stats
+
+        ## `psycopg_pool` drops counters that are still at zero from `get_stats()`.
+        pool_stats = pool.get_stats()
+        max_size = pool_stats.get("pool_max", pool.max_size)
+        size = pool_stats.get("pool_size", 0)
+        available = pool_stats.get("pool_available", 0)
+        in_use = size - available
+        checkouts = pool_stats.get("requests_num", 0)
+        wait_ms = pool_stats.get("requests_wait_ms", 0)
+
+        stats.update(
+            {
+                "mode": "pool",
+                "minSize": pool_stats.get("pool_min", pool.min_size),
+                "maxSize": max_size,
+                "size": size,
+                "available": available,
+                "inUse": in_use,
+                "waiting": pool_stats.get("requests_waiting", 0),
+                "saturation": round(in_use / max_size, 4) if max_size else 0,
+                "checkouts": checkouts,
+                "queuedCheckouts": pool_stats.get("requests_queued", 0),
+                "checkoutTimeouts": pool_stats.get("requests_errors", 0),
+                "checkoutWaitMsTotal": wait_ms,
+                "checkoutWaitMsAvg": round(wait_ms / checkouts, 3) if checkouts else 0,
+                "connectionsOpened": pool_stats.get("connections_num", 0),
+                "connectionsLost": pool_stats.get("connections_lost", 0),
+                "badReturns": pool_stats.get("returns_bad", 0),
+            }
+        )
+
+        if stats["waiting"]:
+            logger.warning(
+                f"Database pool '{alias}' saturated in worker {stats['pid']}: {stats['waiting']} request(s) waiting for a connection."
+            )
+        return stats
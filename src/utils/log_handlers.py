@@ -0,0 +1,18 @@
+from logging import FileHandler
+from os import makedirs, path
+
+
+class LazyDirectoryFileHandler(FileHandler):
+    """
+    `FileHandler` that opens its file, and creates the parent directory, on the first record
+    instead of while logging is being configured.
+    """
+
+    def __init__(self, filename, mode="a", encoding=None, delay=True, errors=None) -> None:
+        super(LazyDirectoryFileHandler, self).__init__(
+            filename, mode=mode, encoding=encoding, delay=delay, errors=errors
+        )
+
+    def _open(self):
+        makedirs(path.dirname(self.baseFilename), exist_ok=True)
+        return super(LazyDirectoryFileHandler, self)._open()
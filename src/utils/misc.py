@@ -34,4 +34,27 @@ def time_execution(func: Callable[..., Any]) -> Callable[..., Any]:
 
         return result
 
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+def str_to_bool(value: Any, default: bool = False) -> bool:
+    """
+    Parse a boolean flag from an environment variable without `eval()`.
+
+    Accepts `true/false`, `yes/no`, `on/off` and `1/0` in any case; anything else (including
+    `None`) gives `default`.
+
+    Example:
+
+        DEBUG = str_to_bool(environ.get("DEBUG"), default=False)
+    """
+    if isinstance(value, bool):
+        return value
+    if value is None:
+        return default
+
+    cleaned_value = str(value).strip().strip('"').strip("'").lower()
+    if cleaned_value in ("true", "yes", "on", "1"):
+        return True
+    if cleaned_value in ("false", "no", "off", "0"):
+        return False
+    return default
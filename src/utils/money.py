@@ -0,0 +1,93 @@
+from decimal import Decimal, ROUND_HALF_UP
+from math import gcd
+from typing import Iterable
+
+
+class MoneyUtils:
+    """
+    Fixed-point money arithmetic on integer minor units (cents).
+
+    Amounts are plain `int`s of cents and percentages are `int`s of basis points (1/100 of a
+    percent, the precision of every percentage column), so sums and products are exact integer
+    operations. Rounding only happens where a result can have a fraction of a cent, i.e. when
+    applying a ratio, and always rounds half away from zero, like Postgres does when the exact
+    amounts `BillItem.save()` used to compute were stored in the `numeric(32, 2)` columns.
+    Python integers do not overflow, so the 32-digit columns are safe.
+
+    Convert with `to_cents()`/`from_cents()` only when reading from or writing to the database.
+    """
+    MINOR_UNITS: int = 100
+    BASIS_POINTS: int = 10000
+    CENT = Decimal("0.01")
+
+    @classmethod
+    def to_cents(cls, value) -> int:
+        """
+        Cents in an amount given as `Decimal`, `str`, `int` or `float` major units.
+        """
+        if not isinstance(value, Decimal):
+            ## Unsaved model instances still hold the float defaults (`0.00`) of their DecimalFields.
+            value = Decimal(str(value or 0))
+        ## Stored amounts always have whole cents; this is much cheaper than `quantize()`.
+        numerator, denominator = value.as_integer_ratio()
+        if cls.MINOR_UNITS % denominator == 0:
+            return numerator * (cls.MINOR_UNITS // denominator)
+        return int(value.quantize(cls.CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+    @classmethod
+    def from_cents(cls, cents: int) -> Decimal:
+        return Decimal(cents).scaleb(-2)
+
+    @classmethod
+    def to_basis_points(cls, percentage) -> int:
+        return cls.to_cents(percentage)
+
+    @classmethod
+    def divide(cls, numerator: int, denominator: int) -> int:
+        """
+        `numerator / denominator` rounded half away from zero; `denominator` must be positive.
+        """
+        quotient, remainder = divmod(abs(numerator), denominator)
+        if remainder * 2 >= denominator:
+            quotient += 1
+        return quotient if numerator >= 0 else -quotient
+
+    @classmethod
+    def reduce(cls, numerator: int, denominator: int) -> tuple[int, int]:
+        divisor = gcd(numerator, denominator) or 1
+        return numerator // divisor, denominator // divisor
+
+    @classmethod
+    def compound_ratio(cls, basis_points: Iterable[int]) -> tuple[int, int]:
+        """
+        `(numerator, denominator)` of applying every percentage on top of the previous ones.
+        """
+        numerator, denominator = 1, 1
+        for points in basis_points:
+            numerator *= cls.BASIS_POINTS + points
+            denominator *= cls.BASIS_POINTS
+        return cls.reduce(numerator, denominator)
+
+    @classmethod
+    def simple_ratio(cls, basis_points: Iterable[int]) -> tuple[int, int]:
+        """
+        `(numerator, denominator)` of applying every percentage to the base amount.
+        """
+        return cls.reduce(cls.BASIS_POINTS + sum(basis_points), cls.BASIS_POINTS)
+
+    @classmethod
+    def apply_ratio(cls, cents: int, ratio: tuple[int, int], less: int = 0) -> int:
+        """
+        `cents * ratio - less`, rounded to a cent.
+
+        `less` is subtracted before rounding: which way a half cent goes depends on it.
+        """
+        numerator, denominator = ratio
+        return cls.divide(cents * numerator - less * denominator, denominator)
+
+    @classmethod
+    def discount(cls, cents: int, basis_points: int) -> int:
+        """
+        `cents` less `basis_points` of it, rounded to a cent.
+        """
+        return cls.divide(cents * (cls.BASIS_POINTS - basis_points), cls.BASIS_POINTS)
@@ -3,6 +3,7 @@ from secrets import choice
 from socket import socket, AF_INET, SOCK_DGRAM, error
 
 from utils import logger
+from utils.misc import str_to_bool
 
 
 class NetworkUtils:
@@ -11,9 +12,6 @@ class NetworkUtils:
     ENV_KEY: str = "ALLOWED_HOSTS"
     VALUE_SPERATOR: str = ", "
 
-    # (prithoo): Get these environment variable directly from the environment as the `settings` module would not have been loaded yet.
-    DEBUG = getenv("DEBUG", "False")
-    ENV_TYPE = getenv("ENV_TYPE", "PROD").lower()
     SAFE_ENV: str = "dev"
 
     @classmethod
@@ -39,9 +37,13 @@ class NetworkUtils:
         """
         Edits the ALLOWED_HOSTS environment variable to add the current machine's LOCAL IP address.
         """
-        if not cls.DEBUG and not cls.ENV_TYPE == cls.SAFE_ENV:
+        # (prithoo): Get these environment variable directly from the environment as the `settings` module would not have been loaded yet.
+        # Read them here rather than at import so that values loaded from `.env` by `manage.py` are seen.
+        debug = str_to_bool(getenv("DEBUG"), default=False)
+        env_type = getenv("ENV_TYPE", "PROD").lower()
+        if not debug and not env_type == cls.SAFE_ENV:
             logger.info(
-                f"ENVIRONMENT TYPE: {cls.ENV_TYPE}; DEBUG: {cls.DEBUG}")
+                f"ENVIRONMENT TYPE: {env_type}; DEBUG: {debug}")
             logger.warning("This script is only for development purposes.")
             return False
         try: